@@ -1,55 +1,685 @@
 """
 AI Code Reviewer - Backend Application
+
+The app is built by create_app(). Services are created once per app and
+the expensive one-time work (SDK import, tokenizer, lexers, connection
+pools) is done by warm_up(), which production entry points run before
+worker processes are forked; see wsgi.py and gunicorn.conf.py.
 """
 
+import io
 import os
-from flask import Flask, request, jsonify
+import time
+from functools import wraps
+from typing import Optional
+from flask import Blueprint, Flask, Response, current_app, g, has_request_context, request, stream_with_context
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
+from werkzeug.exceptions import RequestEntityTooLarge
 from dotenv import load_dotenv
 from services.code_reviewer import CodeReviewer
 from services.ai_service import AIService
-from utils.validators import validate_code_input
-from utils.response_helpers import create_response
+from services.review_cache import ReviewCache
+from services.findings_store import FindingsStore
+from services.diffing import apply_unified_diff
+from services.job_queue import JobQueue, QueueFullError
+from services.review_history import ReviewHistory
+from services.uploads import check_archive, iter_upload_files
+from services.admission import (AdmissionController, Rejected, BATCH, INTERACTIVE, LANES, client_key,
+                                llm_slot_limit, llm_slots)
+from services.telemetry import (REGISTRY, HTTP_REQUESTS, HTTP_DURATION, LLM_IN_FLIGHT,
+                                collect_timings, stage)
+from utils.validators import validate_code_input, validate_batch_input, validate_diff_input, validate_upload_input
+from utils.response_helpers import create_response, encode_response, format_sse
 
 # Load environment variables
 load_dotenv()
 
-app = Flask(__name__)
-CORS(app)
+# Larger files are reviewed in chunks
+REVIEW_MAX_CODE_LENGTH = int(os.environ.get('REVIEW_MAX_CODE_LENGTH', 2000000))
+
+# Batch review limits
+BATCH_MAX_ITEMS = int(os.environ.get('REVIEW_BATCH_MAX_ITEMS', 50))
+BATCH_CONCURRENCY = int(os.environ.get('REVIEW_BATCH_CONCURRENCY', 4))
+
+# Upload limits; archive entries are reviewed with the batch concurrency
+UPLOAD_MAX_BYTES = int(os.environ.get('REVIEW_UPLOAD_MAX_BYTES', 100 * 1024 * 1024))
+UPLOAD_MAX_FILES = int(os.environ.get('REVIEW_UPLOAD_MAX_FILES', 1000))
+
+# Longest a job status request may wait for the job to finish
+REVIEW_JOB_MAX_WAIT = float(os.environ.get('REVIEW_JOB_MAX_WAIT', 30))
+
+# Largest page of the review history
+HISTORY_MAX_PAGE = int(os.environ.get('REVIEW_HISTORY_MAX_PAGE', 500))
+
+class ApiJSONProvider(DefaultJSONProvider):
+    """
+    JSON provider for API responses
+    
+    Encodes with orjson when it is installed, applies the `fields` query
+    parameter and answers in MessagePack when the Accept header prefers it.
+    Serialization is recorded as a stage.
+    """
+    
+    def response(self, *args, **kwargs):
+        # Indented output for debugging stays on the standard path
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            with stage('serialize'):
+                return super().response(*args, **kwargs)
+        
+        obj = self._prepare_response_obj(args, kwargs)
+        accept = fields = None
+        if has_request_context():
+            accept, fields = request.headers.get('Accept'), request.args.get('fields')
+        with stage('serialize'):
+            body, mimetype = encode_response(obj, accept, fields, self.sort_keys, self.default)
+        response = self._app.response_class(body, mimetype=mimetype)
+        response.vary.add('Accept')
+        return response
+
+class AppServices:
+    """Services shared by every request of an app"""
+    
+    def __init__(self, ai_service: Optional[AIService] = None):
+        """
+        Initialize the services from environment variables
+        
+        Args:
+            ai_service: AI service to use instead of a new AIService (optional)
+        """
+        self.review_cache = ReviewCache.from_env()
+        self.ai_service = ai_service or AIService(cache=self.review_cache)
+        self.review_history = ReviewHistory.from_env()
+        self.findings_store = FindingsStore.from_env()
+        self.code_reviewer = CodeReviewer(self.ai_service, findings_store=self.findings_store,
+                                          history=self.review_history)
+        self.admission = AdmissionController.from_env()
+        # Reviews submitted as background jobs, run in the batch lane
+        self.review_jobs = JobQueue.from_env(self.run_review_job)
+    
+    def run_review_job(self, payload: dict) -> dict:
+        """Review the code of a background job once it holds the LLM slots it needs, if any"""
+        code, language, tier = payload['code'], payload['language'], payload.get('tier')
+        slots = self.code_reviewer.llm_demand(code, language, tier) if self.admission is not None else 0
+        if not slots:
+            # Metrics-only reviews and cache hits make no LLM call
+            return self.code_reviewer.review_code(code, language, tier)
+        with self.admission.hold(BATCH, slots):
+            return self.code_reviewer.review_code(code, language, tier)
+    
+    def warm_up(self) -> None:
+        """Do the one-time work of a first request ahead of time"""
+        self.ai_service.warm_up()
+    
+    def after_fork(self) -> None:
+        """Reopen resources a forked worker process must not share with its parent"""
+        if self.review_cache is not None:
+            self.review_cache.reopen()
+        if self.review_history is not None:
+            self.review_history.reopen()
+    
+    def register_metrics(self) -> None:
+        """Report counters kept by the services when /api/metrics is scraped"""
+        ai_service = self.ai_service
+        review_cache = self.review_cache
+        review_jobs = self.review_jobs
+        review_history = self.review_history
+        LLM_IN_FLIGHT.set_function(lambda: ai_service.in_flight, path="sync")
+        REGISTRY.callback('review_cache_entries', 'Entries in the review cache').set_function(
+            lambda: review_cache.stats()['entries'] if review_cache is not None else None)
+        coalesced = REGISTRY.callback('llm_calls_coalescing_total',
+                                      'Review calls executed or coalesced into one in flight', 'counter', ('outcome',))
+        coalesced.set_function(lambda: ai_service.single_flight.executed if ai_service.single_flight else None,
+                               outcome="executed")
+        coalesced.set_function(lambda: ai_service.single_flight.coalesced if ai_service.single_flight else None,
+                               outcome="coalesced")
+        parsed = REGISTRY.callback('llm_responses_parsed_total', 'AI responses by parse status', 'counter',
+                                   ('status',))
+        for status in ('ok', 'recovered', 'failed'):
+            parsed.set_function(lambda status=status: ai_service.parse_counts[status], status=status)
+        resilience = REGISTRY.callback('llm_call_events_total', 'LLM calls, retries, failures and hedges',
+                                       'counter', ('event',))
+        for event in ai_service.resilience.counts:
+            resilience.set_function(lambda event=event: ai_service.resilience.counts[event], event=event)
+        jobs = REGISTRY.callback('review_jobs', 'Review jobs waiting for or held by a worker', 'gauge', ('state',))
+        for state in ('queued', 'running'):
+            jobs.set_function(lambda state=state: getattr(review_jobs, state), state=state)
+        job_events = REGISTRY.callback('review_jobs_total', 'Review jobs by outcome', 'counter', ('outcome',))
+        for outcome in ('submitted', 'rejected', 'succeeded', 'failed'):
+            job_events.set_function(lambda outcome=outcome: review_jobs.counts[outcome], outcome=outcome)
+        history_rows = REGISTRY.callback('review_history_rows_total', 'Review history rows by outcome', 'counter',
+                                         ('outcome',))
+        for outcome in ('written', 'dropped'):
+            history_rows.set_function(
+                lambda outcome=outcome: getattr(review_history, outcome) if review_history is not None else None,
+                outcome=outcome)
+        REGISTRY.callback('review_history_pending', 'Review history rows waiting to be written').set_function(
+            lambda: review_history.writer_stats()['pending'] if review_history is not None else None)
+        backend_latency = REGISTRY.callback('llm_backend_latency_seconds', 'EWMA latency of LLM calls by backend',
+                                            'gauge', ('backend',))
+        backend_errors = REGISTRY.callback('llm_backend_error_rate', 'EWMA error rate of LLM calls by backend',
+                                           'gauge', ('backend',))
+        backend_in_flight = REGISTRY.callback('llm_backend_in_flight', 'LLM calls in flight by backend',
+                                              'gauge', ('backend',))
+        backend_calls = REGISTRY.callback('llm_backend_calls_total', 'LLM calls by backend and outcome', 'counter',
+                                          ('backend', 'outcome'))
+        backend_circuit = REGISTRY.callback('llm_circuit_open',
+                                            'Whether the circuit breaker of an LLM backend is open (1) or not (0)',
+                                            'gauge', ('backend',))
+        for backend in ai_service.router.backends:
+            backend_latency.set_function(lambda backend=backend: backend.latency, backend=backend.name)
+            backend_errors.set_function(lambda backend=backend: backend.error_rate, backend=backend.name)
+            backend_in_flight.set_function(lambda backend=backend: backend.in_flight, backend=backend.name)
+            backend_circuit.set_function(
+                lambda backend=backend: int(backend.breaker.state != "closed") if backend.breaker else None,
+                backend=backend.name)
+            for outcome in ('succeeded', 'failed', 'rate_limited'):
+                backend_calls.set_function(lambda backend=backend, outcome=outcome: backend.counts[outcome],
+                                           backend=backend.name, outcome=outcome)
+        admission = self.admission
+        if admission is not None:
+            admitted = REGISTRY.callback('admission_requests_total', 'Requests by admission lane and outcome',
+                                         'counter', ('lane', 'outcome'))
+            admission_in_flight = REGISTRY.callback('admission_in_flight', 'LLM slots held by admission lane',
+                                                    'gauge', ('lane',))
+            admission_waiting = REGISTRY.callback('admission_waiting', 'Requests waiting for an LLM slot by lane',
+                                                  'gauge', ('lane',))
+            for lane in LANES:
+                for outcome in admission.counts[lane]:
+                    admitted.set_function(lambda lane=lane, outcome=outcome: admission.counts[lane][outcome],
+                                          lane=lane, outcome=outcome)
+                admission_in_flight.set_function(lambda lane=lane: admission.in_flight[lane], lane=lane)
+                admission_waiting.set_function(lambda lane=lane: admission.waiting(lane), lane=lane)
+
+api = Blueprint('api', __name__, url_prefix='/api')
 
-# Initialize services
-ai_service = AIService()
-code_reviewer = CodeReviewer(ai_service)
+def create_app(warm_up: Optional[bool] = None, ai_service: Optional[AIService] = None) -> Flask:
+    """
+    Build the Flask app and its services
+    
+    Args:
+        warm_up: Whether to warm up the services now (defaults to APP_WARM_UP, false)
+        ai_service: AI service to use instead of a new AIService (optional)
+        
+    Returns:
+        The Flask app; its services are in app.extensions['services']
+    """
+    app = Flask(__name__)
+    app.json = ApiJSONProvider(app)
+    CORS(app)
+    
+    app_services = AppServices(ai_service)
+    app_services.register_metrics()
+    app.extensions['services'] = app_services
+    app.register_blueprint(api)
+    
+    if warm_up is None:
+        warm_up = warm_up_enabled()
+    if warm_up:
+        app_services.warm_up()
+    return app
+
+def warm_up_enabled() -> bool:
+    """Whether APP_WARM_UP asks for services to be warmed up when they are built"""
+    return os.environ.get('APP_WARM_UP', 'false').lower() in ('true', '1')
+
+def services() -> AppServices:
+    """Services of the app handling the current request"""
+    return current_app.extensions['services']
+
+def __getattr__(name):
+    # `app.app` is built on first access, so importing this module stays cheap
+    if name == 'app':
+        globals()['app'] = create_app()
+        return globals()['app']
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def wants_timings() -> bool:
+    """Whether the client asked for per-stage timings in the response"""
+    return request.args.get('timings', 'false').lower() in ('true', '1')
+
+def client_id() -> str:
+    """Client the current request is accounted to by admission control"""
+    return client_key(request.headers.get('X-API-Key'), request.headers.get('Authorization'), request.remote_addr)
+
+def review_demand(data) -> tuple:
+    """
+    Tokens and LLM slots of a review
+    
+    Reviews served without the model, metrics only or from the cache, take
+    neither; others take a token and a slot per chunk reviewed at once.
+    Invalid requests are answered with a 400 and take no slot.
+    """
+    if not validate_code_input(data, REVIEW_MAX_CODE_LENGTH)['valid']:
+        return 1, 0
+    slots = services().code_reviewer.llm_demand(data['code'], data.get('language', 'python'), data.get('tier'))
+    return (1 if slots else 0), slots
+
+def batch_demand(data) -> tuple:
+    """Tokens and LLM slots of a batch review: one token per item, one slot per concurrent item"""
+    items = data.get('items') if isinstance(data, dict) else None
+    count = len(items) if isinstance(items, list) and items else 1
+    concurrency = data.get('concurrency', BATCH_CONCURRENCY) if isinstance(data, dict) else BATCH_CONCURRENCY
+    if not isinstance(concurrency, int) or concurrency < 1:
+        concurrency = BATCH_CONCURRENCY
+    return count, min(count, concurrency, BATCH_CONCURRENCY)
+
+def within_llm_slots(iterable, slots: int):
+    """Iterate a streamed response body with its LLM calls bound to the request's slots"""
+    with llm_slots(slots):
+        yield from iterable
+
+def admitted(lane: str, demand=None):
+    """
+    Pass requests to the view only when admission control admits them
+    
+    Rejected requests get a 429 with Retry-After. The LLM slots are held
+    until the view returns, or until a streamed response is closed, and
+    bound the LLM calls the view and its stream make at once, fan-out
+    included. Clients may move a request into the batch lane with
+    `X-Priority: batch`.
+    
+    Args:
+        lane: Lane of the route, INTERACTIVE or BATCH
+        demand: Function of the JSON body returning (tokens, slots) (optional, one of each)
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            admission = services().admission
+            if admission is None:
+                return view(*args, **kwargs)
+            
+            request_lane = BATCH if request.headers.get('X-Priority', '').lower() == BATCH else lane
+            cost, slots = demand(request.get_json(silent=True)) if demand is not None else (1, 1)
+            try:
+                release, slots = admission.admit(client_id(), request_lane, cost, slots)
+            except Rejected as e:
+                return create_response(False, str(e), {"reason": e.reason, "lane": request_lane}), 429, \
+                    {'Retry-After': str(e.retry_after)}
+            
+            try:
+                with llm_slots(slots):
+                    response = current_app.make_response(view(*args, **kwargs))
+            except BaseException:
+                release()
+                raise
+            if response.is_streamed:
+                response.response = within_llm_slots(response.response, slots)
+                response.call_on_close(release)
+            else:
+                release()
+            return response
+        return wrapper
+    return decorator
 
-@app.route('/api/health', methods=['GET'])
+@api.before_app_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@api.after_app_request
+def record_request_metrics(response):
+    endpoint = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    HTTP_REQUESTS.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+    started = g.get('request_started')
+    if started is not None:
+        HTTP_DURATION.observe(time.perf_counter() - started, endpoint=endpoint)
+    return response
+
+@api.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
     return create_response(True, "Service is running", {"status": "healthy"})
 
-@app.route('/api/review', methods=['POST'])
+@api.route('/review', methods=['POST'])
+@admitted(INTERACTIVE, review_demand)
 def review_code():
     """Review code using AI"""
+    try:
+        with collect_timings(wants_timings()) as timings:
+            data = request.get_json()
+            
+            # Validate input
+            with stage('validate'):
+                validation_result = validate_code_input(data, REVIEW_MAX_CODE_LENGTH)
+            if not validation_result['valid']:
+                return create_response(False, validation_result['message'], None), 400
+            
+            # Extract data
+            code = data['code']
+            language = data.get('language', 'python')
+            
+            # Perform code review
+            review_result = services().code_reviewer.review_code(code, language, data.get('tier'))
+        
+        if timings is not None:
+            review_result["timings"] = timings.as_dict()
+        
+        return create_response(True, "Code review completed", review_result)
+        
+    except Exception as e:
+        return create_response(False, f"Error during code review: {str(e)}", None), 500
+
+@api.route('/review/diff', methods=['POST'])
+@admitted(INTERACTIVE)
+def review_code_diff():
+    """Re-review only what changed since a previously reviewed version"""
+    try:
+        with collect_timings(wants_timings()) as timings:
+            data = request.get_json()
+            
+            with stage('validate'):
+                validation_result = validate_diff_input(data, REVIEW_MAX_CODE_LENGTH)
+            if not validation_result['valid']:
+                return create_response(False, validation_result['message'], None), 400
+            
+            base_code = data['base_code']
+            language = data.get('language', 'python')
+            
+            if 'diff' in data:
+                try:
+                    with stage('apply_diff'):
+                        code = apply_unified_diff(base_code, data['diff'])
+                except ValueError as e:
+                    return create_response(False, str(e), None), 400
+            else:
+                code = data['code']
+            
+            # The new version must be reviewable on its own
+            with stage('validate'):
+                validation_result = validate_code_input({"code": code, "language": language}, REVIEW_MAX_CODE_LENGTH)
+            if not validation_result['valid']:
+                return create_response(False, validation_result['message'], None), 400
+            
+            review_result = services().code_reviewer.review_diff(base_code, code, language)
+        
+        if timings is not None:
+            review_result["timings"] = timings.as_dict()
+        
+        return create_response(True, "Incremental code review completed", review_result)
+        
+    except Exception as e:
+        return create_response(False, f"Error during incremental code review: {str(e)}", None), 500
+
+@api.route('/review/stream', methods=['POST'])
+@admitted(INTERACTIVE, review_demand)
+def review_code_stream():
+    """Review code and stream partial results as Server-Sent Events"""
     try:
         data = request.get_json()
         
         # Validate input
-        validation_result = validate_code_input(data)
+        validation_result = validate_code_input(data, REVIEW_MAX_CODE_LENGTH)
         if not validation_result['valid']:
             return create_response(False, validation_result['message'], None), 400
         
-        # Extract data
         code = data['code']
         language = data.get('language', 'python')
+        tier = data.get('tier')
         
-        # Perform code review
-        review_result = code_reviewer.review_code(code, language)
+    except Exception as e:
+        return create_response(False, f"Error during code review: {str(e)}", None), 500
+    
+    def generate():
+        try:
+            for event, payload in services().code_reviewer.review_code_stream(code, language, tier):
+                if event == 'token':
+                    payload = {"text": payload}
+                elif event == 'field':
+                    name, value = payload
+                    payload = {"name": name, "value": value}
+                yield format_sse(event, payload)
+        except Exception as e:
+            yield format_sse('error', {"message": f"Error during code review: {str(e)}"})
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@api.route('/review/batch', methods=['POST'])
+@admitted(BATCH, batch_demand)
+def review_code_batch():
+    """Review several code items concurrently"""
+    try:
+        data = request.get_json()
         
-        return create_response(True, "Code review completed", review_result)
+        validation_result = validate_batch_input(data, BATCH_MAX_ITEMS)
+        if not validation_result['valid']:
+            return create_response(False, validation_result['message'], None), 400
+        
+        items = data['items']
+        # More workers than granted slots would only wait for them
+        concurrency = min(data.get('concurrency', BATCH_CONCURRENCY), BATCH_CONCURRENCY,
+                          llm_slot_limit() or BATCH_CONCURRENCY)
+        
+        # Invalid items fail on their own, valid ones go to the worker pool
+        results = [None] * len(items)
+        pending = []
+        for index, item in enumerate(items):
+            item_id = item.get('id', index) if isinstance(item, dict) else index
+            item_validation = validate_code_input(item, REVIEW_MAX_CODE_LENGTH) if isinstance(item, dict) else \
+                {"valid": False, "message": "Item must be an object"}
+            if not item_validation['valid']:
+                results[index] = {"id": item_id, "success": False, "error": item_validation['message']}
+                continue
+            pending.append((index, {
+                "id": item_id,
+                "code": item['code'],
+                "language": item.get('language', 'python'),
+                "tier": item.get('tier')
+            }))
+        
+        with collect_timings(wants_timings()) as timings:
+            reviewed = services().code_reviewer.review_batch([item for _, item in pending], concurrency)
+        for (index, _), result in zip(pending, reviewed):
+            results[index] = result
+        
+        succeeded = sum(1 for result in results if result['success'])
+        
+        batch_result = {
+            "results": results,
+            "total": len(results),
+            "succeeded": succeeded,
+            "failed": len(results) - succeeded
+        }
+        if timings is not None:
+            # Stages of all items, summed across the worker pool
+            batch_result["timings"] = timings.as_dict()
+        
+        return create_response(True, "Batch review completed", batch_result)
         
     except Exception as e:
-        return create_response(False, f"Error during code review: {str(e)}", None), 500
+        return create_response(False, f"Error during batch review: {str(e)}", None), 500
+
+def upload_demand(data) -> tuple:
+    """Tokens and LLM slots of an upload: one token up front, one slot per file reviewed at once"""
+    # The form is parsed here, before the view, so the upload limit must already apply
+    request.max_content_length = UPLOAD_MAX_BYTES
+    try:
+        concurrency = request.form.get('concurrency', BATCH_CONCURRENCY, type=int)
+    except RequestEntityTooLarge:
+        # Reported by the view
+        return 1, 0
+    if concurrency is None or concurrency < 1:
+        concurrency = BATCH_CONCURRENCY
+    return 1, min(concurrency, BATCH_CONCURRENCY)
+
+def rate_limited_files(files, client: str):
+    """
+    Take a batch token for every reviewable file after the first
+    
+    The first file is paid for on admission. Files beyond the client's
+    batch rate are skipped instead of reviewed.
+    """
+    admission = services().admission
+    reviewable = 0
+    for file in files:
+        if admission is not None and 'code' in file:
+            reviewable += 1
+            if reviewable > 1:
+                try:
+                    admission.check_rate(client, BATCH)
+                except Rejected as e:
+                    file = {"path": file['path'], "skipped": f"{e} (retry after {e.retry_after}s)"}
+        yield file
+
+@api.route('/review/upload', methods=['POST'])
+@admitted(BATCH, upload_demand)
+def review_code_upload():
+    """Review an uploaded source file or project archive and stream a result per file as Server-Sent Events"""
+    try:
+        # Larger parts of the body are spooled to a temporary file, not held in memory
+        request.max_content_length = UPLOAD_MAX_BYTES
+        upload = request.files.get('file')
+        
+        validation_result = validate_upload_input(upload.filename if upload is not None else None, request.form)
+        if not validation_result['valid']:
+            return create_response(False, validation_result['message'], None), 400
+        
+        archive_error = check_archive(upload.stream, upload.filename)
+        if archive_error is not None:
+            return create_response(False, archive_error, None), 400
+        
+        tier = request.form.get('tier')
+        # More workers than granted slots would only wait for them
+        concurrency = min(request.form.get('concurrency', BATCH_CONCURRENCY, type=int), BATCH_CONCURRENCY,
+                          llm_slot_limit() or BATCH_CONCURRENCY)
+        client = client_id()
+        # Flask closes the request's files when the view returns, before the stream is read
+        stream, upload.stream = upload.stream, io.BytesIO()
+        
+    except RequestEntityTooLarge:
+        return create_response(False, f"Upload is too large (max {UPLOAD_MAX_BYTES:,} bytes)", None), 413
+    except Exception as e:
+        return create_response(False, f"Error during upload review: {str(e)}", None), 500
+    
+    def generate():
+        # Only counts are kept, each result is sent and dropped
+        summary = {"files": 0, "reviewed": 0, "failed": 0, "skipped": 0}
+        score_total = 0.0
+        scored = 0
+        try:
+            files = rate_limited_files(iter_upload_files(stream, upload.filename, UPLOAD_MAX_FILES), client)
+            for result in services().code_reviewer.review_files(files, tier, concurrency):
+                summary["files"] += 1
+                if 'skipped' in result:
+                    summary["skipped"] += 1
+                    yield format_sse('skipped', result)
+                    continue
+                if result['success']:
+                    summary["reviewed"] += 1
+                    score = (result['data'].get('summary') or {}).get('overall_score')
+                    # A file without a numeric score is still reviewed, it is only left out of the average
+                    if isinstance(score, (int, float)) and not isinstance(score, bool):
+                        score_total += score
+                        scored += 1
+                else:
+                    summary["failed"] += 1
+                yield format_sse('file', result)
+            summary["average_score"] = round(score_total / scored, 2) if scored else None
+            yield format_sse('done', summary)
+        except Exception as e:
+            yield format_sse('error', {"message": f"Error during upload review: {str(e)}"})
+        finally:
+            stream.close()
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@api.route('/review/jobs', methods=['POST'])
+@admitted(BATCH, lambda data: (1, 0))
+def submit_review_job():
+    """Queue a code review and return its job id at once"""
+    try:
+        data = request.get_json()
+        
+        validation_result = validate_code_input(data, REVIEW_MAX_CODE_LENGTH)
+        if not validation_result['valid']:
+            return create_response(False, validation_result['message'], None), 400
+        
+        try:
+            job = services().review_jobs.submit({"code": data['code'], "language": data.get('language', 'python'),
+                                                 "tier": data.get('tier')})
+        except QueueFullError as e:
+            return create_response(False, str(e), None), 503, {'Retry-After': '5'}
+        
+        job["status_url"] = f"/api/review/jobs/{job['job_id']}"
+        return create_response(True, "Review job accepted", job), 202, {'Location': job["status_url"]}
+        
+    except Exception as e:
+        return create_response(False, f"Error during job submission: {str(e)}", None), 500
+
+@api.route('/review/jobs/<job_id>', methods=['GET'])
+def get_review_job(job_id):
+    """Get the status and result of a review job, optionally waiting for it to finish"""
+    wait = min(max(request.args.get('wait', 0, type=float), 0), REVIEW_JOB_MAX_WAIT)
+    job = services().review_jobs.get(job_id, wait)
+    if job is None:
+        return create_response(False, "Review job not found or expired", None), 404
+    return create_response(True, f"Review job {job['status']}", job)
+
+def history_filters() -> dict:
+    """Review history filters from the query string"""
+    return {
+        "language": request.args.get('language'),
+        "content_hash": request.args.get('hash'),
+        "kind": request.args.get('kind'),
+        "min_score": request.args.get('min_score', type=float),
+        "max_score": request.args.get('max_score', type=float),
+        "since": request.args.get('since', type=float),
+        "until": request.args.get('until', type=float)
+    }
+
+@api.route('/history', methods=['GET'])
+def list_review_history():
+    """List past reviews, newest first, one page at a time"""
+    review_history = services().review_history
+    if review_history is None:
+        return create_response(False, "Review history is disabled", None), 404
+    
+    try:
+        limit = min(max(request.args.get('limit', 50, type=int), 1), HISTORY_MAX_PAGE)
+        entries, next_cursor = review_history.query(history_filters(), limit, request.args.get('cursor', type=int))
+        return create_response(True, "Review history retrieved", {
+            "entries": entries,
+            "count": len(entries),
+            "next_cursor": next_cursor
+        })
+    
+    except Exception as e:
+        return create_response(False, f"Error during history query: {str(e)}", None), 500
+
+@api.route('/history/stats', methods=['GET'])
+def get_review_history_stats():
+    """Aggregate past reviews per language"""
+    review_history = services().review_history
+    if review_history is None:
+        return create_response(False, "Review history is disabled", None), 404
+    
+    try:
+        return create_response(True, "Review history statistics retrieved", review_history.stats(history_filters()))
+    
+    except Exception as e:
+        return create_response(False, f"Error during history query: {str(e)}", None), 500
+
+@api.route('/history/<int:entry_id>', methods=['GET'])
+def get_review_history_entry(entry_id):
+    """Get a single past review"""
+    review_history = services().review_history
+    if review_history is None:
+        return create_response(False, "Review history is disabled", None), 404
+    
+    entry = review_history.get(entry_id)
+    if entry is None:
+        return create_response(False, "History entry not found", None), 404
+    return create_response(True, "History entry retrieved", entry)
 
-@app.route('/api/languages', methods=['GET'])
+@api.route('/languages', methods=['GET'])
 def get_supported_languages():
     """Get list of supported programming languages"""
     languages = [
@@ -67,7 +697,7 @@ def get_supported_languages():
     
     return create_response(True, "Supported languages retrieved", {"languages": languages})
 
-@app.route('/api/analyze', methods=['POST'])
+@api.route('/analyze', methods=['POST'])
 def analyze_code():
     """Analyze code complexity and metrics"""
     try:
@@ -80,18 +710,153 @@ def analyze_code():
         language = data.get('language', 'python')
         
         # Analyze code metrics
-        analysis_result = code_reviewer.analyze_code_metrics(code, language)
+        analysis_result = services().code_reviewer.analyze_code_metrics(code, language)
         
         return create_response(True, "Code analysis completed", analysis_result)
         
     except Exception as e:
         return create_response(False, f"Error during code analysis: {str(e)}", None), 500
 
-@app.errorhandler(404)
+def require_admin(view):
+    """Require the X-Admin-Token header when ADMIN_TOKEN is configured"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        admin_token = os.environ.get('ADMIN_TOKEN')
+        if admin_token and request.headers.get('X-Admin-Token') != admin_token:
+            return create_response(False, "Admin token required", None), 403
+        return view(*args, **kwargs)
+    return wrapper
+
+@api.route('/admin/cache', methods=['GET'])
+@require_admin
+def get_review_cache():
+    """Inspect review cache statistics and entries"""
+    review_cache = services().review_cache
+    if review_cache is None:
+        return create_response(False, "Review cache is disabled", None), 404
+    
+    limit = request.args.get('limit', 100, type=int)
+    
+    return create_response(True, "Review cache retrieved", {
+        "stats": review_cache.stats(),
+        "entries": review_cache.entries(limit)
+    })
+
+@api.route('/admin/cache', methods=['DELETE'])
+@require_admin
+def clear_review_cache():
+    """Invalidate every review cache entry"""
+    review_cache = services().review_cache
+    if review_cache is None:
+        return create_response(False, "Review cache is disabled", None), 404
+    
+    removed = review_cache.clear()
+    
+    return create_response(True, "Review cache cleared", {"removed": removed})
+
+@api.route('/admin/cache/<key>', methods=['GET'])
+@require_admin
+def get_review_cache_entry(key):
+    """Inspect a single review cache entry"""
+    review_cache = services().review_cache
+    if review_cache is None:
+        return create_response(False, "Review cache is disabled", None), 404
+    
+    entry = review_cache.get_entry(key)
+    if entry is None:
+        return create_response(False, "Cache entry not found", None), 404
+    
+    return create_response(True, "Cache entry retrieved", entry)
+
+@api.route('/admin/cache/<key>', methods=['DELETE'])
+@require_admin
+def invalidate_review_cache_entry(key):
+    """Invalidate a single review cache entry"""
+    review_cache = services().review_cache
+    if review_cache is None:
+        return create_response(False, "Review cache is disabled", None), 404
+    
+    if not review_cache.invalidate(key):
+        return create_response(False, "Cache entry not found", None), 404
+    
+    return create_response(True, "Cache entry invalidated", {"key": key})
+
+@api.route('/admin/coalescing', methods=['GET'])
+@require_admin
+def get_coalescing_stats():
+    """Inspect how many identical in-flight reviews shared one API call"""
+    single_flight = services().ai_service.single_flight
+    if single_flight is None:
+        return create_response(False, "Review coalescing is disabled", None), 404
+    
+    return create_response(True, "Coalescing statistics retrieved", single_flight.stats())
+
+@api.route('/admin/parsing', methods=['GET'])
+@require_admin
+def get_parsing_stats():
+    """Inspect how often AI responses could not be parsed completely"""
+    ai_service = services().ai_service
+    with ai_service._parse_lock:
+        counts = dict(ai_service.parse_counts)
+    
+    return create_response(True, "Parsing statistics retrieved", counts)
+
+@api.route('/admin/resilience', methods=['GET'])
+@require_admin
+def get_resilience_stats():
+    """Inspect retries, hedged requests and short-circuited LLM calls"""
+    return create_response(True, "Resilience statistics retrieved", services().ai_service.resilience.stats())
+
+@api.route('/admin/backends', methods=['GET'])
+@require_admin
+def get_backend_stats():
+    """Inspect the observed health of every LLM backend and how calls are routed"""
+    router = services().ai_service.router
+    return create_response(True, "Backend statistics retrieved", {
+        "strategy": router.strategy,
+        "backends": router.stats()
+    })
+
+@api.route('/admin/tiers', methods=['GET'])
+@require_admin
+def get_review_tier_stats():
+    """Get the review tier thresholds, the share of reviews per tier and their latency"""
+    return create_response(True, "Review tier statistics retrieved", services().code_reviewer.tiers.stats())
+
+@api.route('/admin/admission', methods=['GET'])
+@require_admin
+def get_admission_stats():
+    """Get admission control slots, queues and outcomes per lane"""
+    admission = services().admission
+    if admission is None:
+        return create_response(False, "Admission control is disabled", None), 404
+    return create_response(True, "Admission statistics retrieved", admission.stats())
+
+@api.route('/admin/jobs', methods=['GET'])
+@require_admin
+def get_review_job_stats():
+    """Inspect the review job queue"""
+    return create_response(True, "Review job statistics retrieved", services().review_jobs.stats())
+
+@api.route('/admin/history', methods=['GET'])
+@require_admin
+def get_review_history_writer_stats():
+    """Inspect the review history writer"""
+    review_history = services().review_history
+    if review_history is None:
+        return create_response(False, "Review history is disabled", None), 404
+    return create_response(True, "Review history writer statistics retrieved", review_history.writer_stats())
+
+@api.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Expose request, stage, cache and LLM metrics in the Prometheus text format"""
+    return Response(REGISTRY.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@api.app_errorhandler(404)
 def not_found(error):
     return create_response(False, "Endpoint not found", None), 404
 
-@app.errorhandler(500)
+@api.app_errorhandler(500)
 def internal_error(error):
     return create_response(False, "Internal server error", None), 500
 
@@ -102,4 +867,4 @@ if __name__ == '__main__':
     print(f"🚀 Starting AI Code Reviewer backend on port {port}")
     print(f"📝 API Documentation: http://localhost:{port}/api/health")
     
-    app.run(host='0.0.0.0', port=port, debug=debug) 
\ No newline at end of file
+    create_app(warm_up=True).run(host='0.0.0.0', port=port, debug=debug)
@@ -0,0 +1,194 @@
+"""
+ASGI entry point with an async review path
+
+POST /api/review is served on the event loop by AsyncAIService, so a
+single process keeps hundreds of LLM calls in flight without tying up a
+worker thread per call. Every other route is forwarded to the Flask app.
+
+Run with:
+    uvicorn asgi:app --host 0.0.0.0 --port 5000
+or, with the app loaded before workers are forked:
+    SERVER_MODE=asgi gunicorn -c gunicorn.conf.py
+"""
+
+import asyncio
+import json
+import time
+from typing import Optional
+from urllib.parse import parse_qs
+from asgiref.wsgi import WsgiToAsgi
+from app import REVIEW_MAX_CODE_LENGTH, create_app, warm_up_enabled
+from services.admission import BATCH, INTERACTIVE, Rejected, client_key, llm_slots
+from services.async_ai_service import AsyncAIService
+from services.code_reviewer import CodeReviewer
+from services.telemetry import HTTP_DURATION, HTTP_REQUESTS, LLM_IN_FLIGHT, collect_timings, stage
+from utils.validators import validate_code_input
+from utils.response_helpers import create_response, encode_response
+
+flask_app = create_app(warm_up=False)
+app_services = flask_app.extensions['services']
+ai_service = app_services.ai_service
+
+async_ai_service = AsyncAIService(cache=app_services.review_cache)
+# Share coalescing counters, parse counters and backend health and circuits with the Flask routes
+async_ai_service.single_flight = ai_service.single_flight
+async_ai_service.resilience = ai_service.resilience
+async_ai_service.router = ai_service.router
+async_ai_service.parse_counts = ai_service.parse_counts
+async_ai_service._parse_lock = ai_service._parse_lock
+# Share stored findings so a diff review can reuse what either path reviewed
+async_code_reviewer = CodeReviewer(async_ai_service, findings_store=app_services.findings_store,
+                                   history=app_services.review_history)
+LLM_IN_FLIGHT.set_function(lambda: async_ai_service.in_flight, path="async")
+
+def warm_up():
+    """Do the one-time work of a first request for both review paths; cheap when already done"""
+    app_services.warm_up()
+    async_ai_service.warm_up()
+
+def after_fork():
+    """Reopen resources a forked worker must not share with its parent"""
+    app_services.after_fork()
+
+if warm_up_enabled():
+    warm_up()
+
+wsgi_app = WsgiToAsgi(flask_app)
+
+async def review_code(scope, receive, send):
+    """Review code using AI without holding a worker thread"""
+    release = None
+    try:
+        query = _query(scope)
+        with collect_timings(query.get('timings', 'false').lower() in ('true', '1')) as timings:
+            data = _parse_json(await _read_body(receive))
+
+            # Validate input
+            with stage('validate'):
+                validation_result = validate_code_input(data, REVIEW_MAX_CODE_LENGTH)
+            if not validation_result['valid']:
+                return await _send_json(send, scope, create_response(False, validation_result['message'], None), 400)
+
+            code = data['code']
+            language = data.get('language', 'python')
+
+            # Admitted like the Flask routes, so LLM calls on both paths share the global cap
+            headers = _headers(scope)
+            lane = BATCH if headers.get('x-priority', '').lower() == BATCH else INTERACTIVE
+            try:
+                release, slots = await _admit(headers, scope, lane,
+                                              async_code_reviewer.llm_demand(code, language, data.get('tier')))
+            except Rejected as e:
+                return await _send_json(send, scope, create_response(False, str(e), {"reason": e.reason, "lane": lane}),
+                                        429, {'retry-after': str(e.retry_after)})
+
+            with llm_slots(slots):
+                review_result = await async_code_reviewer.review_code_async(code, language, data.get('tier'))
+
+        if timings is not None:
+            review_result["timings"] = timings.as_dict()
+
+        return await _send_json(send, scope, create_response(True, "Code review completed", review_result))
+
+    except Exception as e:
+        return await _send_json(send, scope, create_response(False, f"Error during code review: {str(e)}", None), 500)
+    finally:
+        if release is not None:
+            release()
+
+async def _admit(headers: dict, scope, lane: str, slots: int):
+    """Admit a request, waiting for its slots on a thread rather than on the event loop"""
+    admission = app_services.admission
+    if admission is None:
+        return (lambda: None), 0
+    client = client_key(headers.get('x-api-key'), headers.get('authorization'), (scope.get('client') or (None,))[0])
+    # Reviews served without the model take neither a token nor a slot
+    admit = asyncio.ensure_future(asyncio.to_thread(admission.admit, client, lane, 1 if slots else 0, slots))
+    try:
+        return await asyncio.shield(admit)
+    except asyncio.CancelledError:
+        # Slots granted after the client went away are given back at once
+        admit.add_done_callback(lambda task: task.cancelled() or task.exception() or task.result()[0]())
+        raise
+
+ASYNC_ROUTES = {
+    ('POST', '/api/review'): review_code
+}
+
+async def app(scope, receive, send):
+    """ASGI application"""
+    if scope['type'] == 'lifespan':
+        await _lifespan(receive, send)
+        return
+
+    if scope['type'] == 'http':
+        handler = ASYNC_ROUTES.get((scope['method'], scope['path']))
+        if handler is not None:
+            started = time.perf_counter()
+            status = await handler(scope, receive, send)
+            HTTP_REQUESTS.inc(endpoint=scope['path'], method=scope['method'], status=status)
+            HTTP_DURATION.observe(time.perf_counter() - started, endpoint=scope['path'])
+            return
+
+    await wsgi_app(scope, receive, send)
+
+async def _lifespan(receive, send):
+    """Handle server startup and shutdown"""
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            # Done here at the latest, so no request pays for it
+            warm_up()
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await async_ai_service.aclose()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+async def _read_body(receive) -> bytes:
+    """Read the full request body"""
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body'):
+            return b''.join(chunks)
+
+def _parse_json(body: bytes):
+    """Decode a JSON request body, or None if it is not valid JSON"""
+    try:
+        return json.loads(body) if body else None
+    except ValueError:
+        return None
+
+def _headers(scope) -> dict:
+    """Request headers by lower-case name"""
+    return {name.decode('latin-1'): value.decode('latin-1') for name, value in scope.get('headers', [])}
+
+def _query(scope) -> dict:
+    """Last value of every query parameter"""
+    query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+    return {name: values[-1] for name, values in query.items()}
+
+async def _send_json(send, scope, payload, status: int = 200, headers: Optional[dict] = None) -> int:
+    """
+    Send a response with the same encoding and CORS policy as the Flask app and return its status
+    
+    The `fields` query parameter and the Accept header are honoured like
+    in the Flask app's JSON provider.
+    """
+    accept = _headers(scope).get('accept')
+    with stage('serialize'):
+        body, mimetype = encode_response(payload, accept, _query(scope).get('fields'))
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [
+            (b'content-type', mimetype.encode('ascii')),
+            (b'content-length', str(len(body)).encode('ascii')),
+            (b'vary', b'Accept'),
+            (b'access-control-allow-origin', b'*')
+        ] + [(name.encode('latin-1'), value.encode('latin-1')) for name, value in (headers or {}).items()]
+    })
+    await send({'type': 'http.response.body', 'body': body})
+    return status
@@ -0,0 +1,160 @@
+"""
+Benchmark admission control: interactive users during a CI burst
+
+Serves the Flask app on a fixed pool of worker threads, like a gunicorn
+gthread worker, in front of a slow local LLM stub. One client (a CI
+pipeline, in the batch lane unless --no-ci-batch) keeps many review
+requests open at once while a few
+interactive users send a review every second and a monitor polls
+/api/analyze and /api/languages. Runs once without and once with
+admission control and reports what each kind of client saw.
+
+Usage:
+    python benchmarks/bench_admission.py [--threads 8] [--ci-concurrency 32] [--no-ci-batch]
+                                         [--users 2] [--duration 20] [--latency 1.0]
+"""
+
+import argparse
+import logging
+import os
+import statistics
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.llm_stub import StubConfig, StubStats, start_stub
+
+ANALYZE_CODE = "def f(x):\n    return x * 2\n" * 20
+
+
+def serve(flask_app, threads: int) -> str:
+    """Serve the app on a pool of `threads` worker threads and return its URL"""
+    from werkzeug.serving import BaseWSGIServer
+
+    class PooledServer(BaseWSGIServer):
+        pool = ThreadPoolExecutor(max_workers=threads)
+
+        def process_request(self, request, client_address):
+            self.pool.submit(self.handle, request, client_address)
+
+        def handle(self, request, client_address):
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+
+    server = PooledServer('127.0.0.1', 0, flask_app)
+    server.request_queue_size = 1024
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}"
+
+
+def summarize(latencies: List[float], statuses: Counter) -> str:
+    if not latencies:
+        return f"no responses  {dict(statuses)}"
+    latencies = sorted(latencies)
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    return (f"p50 {statistics.median(latencies) * 1000:7.0f} ms  p95 {p95 * 1000:7.0f} ms  "
+            + "  ".join(f"{status}={count}" for status, count in sorted(statuses.items(), key=str)))
+
+
+def run(admission: bool, args) -> Dict[str, str]:
+    import httpx
+
+    os.environ['ADMISSION_ENABLED'] = 'true' if admission else 'false'
+    import app
+    url = serve(app.create_app(warm_up=True), args.threads)
+
+    stop = time.monotonic() + args.duration
+    results = {name: ([], Counter()) for name in ("ci review", "interactive review", "analyze", "languages")}
+    lock = threading.Lock()
+    counter = iter(range(10 ** 9))
+
+    def call(name: str, method: str, path: str, key: str, headers=None, **kwargs):
+        started = time.perf_counter()
+        try:
+            with httpx.Client(timeout=args.client_timeout) as client:
+                response = client.request(method, url + path, headers=dict(headers or {}, **{'X-API-Key': key}),
+                                          **kwargs)
+            status = response.status_code
+        except httpx.TimeoutException:
+            status, response = "timeout", None
+        except httpx.HTTPError:
+            status, response = "error", None
+        with lock:
+            latencies, statuses = results[name]
+            statuses[status] += 1
+            if status == 200:
+                latencies.append(time.perf_counter() - started)
+        return response
+
+    ci_headers = {'X-Priority': 'batch'} if args.ci_batch else {}
+
+    def ci():
+        while time.monotonic() < stop:
+            response = call("ci review", 'POST', '/api/review', 'ci-pipeline', ci_headers,
+                            json={"code": f"x = {next(counter)}\n", "language": "python"})
+            if response is not None and response.status_code == 429:
+                # A well-behaved client, up to a point
+                time.sleep(min(float(response.headers.get('Retry-After', 1)), 2.0))
+
+    def user(index: int):
+        while time.monotonic() < stop:
+            started = time.monotonic()
+            call("interactive review", 'POST', '/api/review', f'user-{index}',
+                 json={"code": f"y = {next(counter)}\n", "language": "python"})
+            time.sleep(max(0.0, 1.0 - (time.monotonic() - started)))
+
+    def monitor():
+        while time.monotonic() < stop:
+            call("analyze", 'POST', '/api/analyze', 'monitor', json={"code": ANALYZE_CODE, "language": "python"})
+            call("languages", 'GET', '/api/languages', 'monitor')
+            time.sleep(0.2)
+
+    workers = [threading.Thread(target=ci) for _ in range(args.ci_concurrency)]
+    workers += [threading.Thread(target=user, args=(index,)) for index in range(args.users)]
+    workers.append(threading.Thread(target=monitor))
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return {name: summarize(*result) for name, result in results.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--threads', type=int, default=8, help='Worker threads of the app server')
+    parser.add_argument('--ci-concurrency', type=int, default=32, help='Requests the CI client keeps open')
+    parser.add_argument('--ci-batch', action=argparse.BooleanOptionalAction, default=True,
+                        help='Whether the CI client marks its requests with X-Priority: batch')
+    parser.add_argument('--users', type=int, default=2, help='Interactive users, one review per second each')
+    parser.add_argument('--duration', type=float, default=20.0)
+    parser.add_argument('--latency', type=float, default=1.0, help='Seconds per LLM call')
+    parser.add_argument('--client-timeout', type=float, default=15.0)
+    parser.add_argument('--mode', choices=('off', 'on', 'both'), default='both')
+    args = parser.parse_args()
+
+    # Must be set before the app creates its services
+    os.environ['OPENAI_BASE_URL'] = start_stub(StubConfig(latency=str(args.latency)), StubStats())
+    os.environ['OPENAI_API_KEY'] = 'stub'
+    os.environ['REVIEW_CACHE_ENABLED'] = 'false'
+    os.environ.pop('REVIEW_HISTORY_DB', None)
+    os.environ['REVIEW_DEFAULT_TIER'] = 'full'
+    os.environ['GUNICORN_THREADS'] = str(args.threads)
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+
+    for admission in {'off': (False,), 'on': (True,), 'both': (False, True)}[args.mode]:
+        print(f"admission {'on' if admission else 'off'}:")
+        for name, summary in run(admission, args).items():
+            print(f"  {name:<20}{summary}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+Load test AsyncAIService against a local OpenAI-compatible stub
+
+Starts the stub chat-completions server (benchmarks/llm_stub.py)
+in-process, or uses --base-url, fires many concurrent reviews and reports
+wall time, throughput and the peak number of requests the stub saw in
+flight at once. The stub's latency distribution and fault injection
+options are accepted as well.
+
+Usage:
+    python benchmarks/bench_async_reviews.py [--requests 500] [--latency 0.5]
+                                             [--error-rate 0.05] [--rate-limit 100]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.llm_stub import StubStats, add_stub_arguments, config_from_args, start_stub
+
+
+async def run(requests: int, max_in_flight: int) -> float:
+    from services.async_ai_service import AsyncAIService
+
+    service = AsyncAIService(max_in_flight=max_in_flight)
+    start = time.perf_counter()
+    results = await asyncio.gather(*[
+        service.review_code_async(f"def f{i}():\n    return {i}\n", 'python')
+        for i in range(requests)
+    ])
+    elapsed = time.perf_counter() - start
+    await service.aclose()
+
+    failed = [r for r in results if r.get('score') != 8]
+    if failed:
+        print(f"⚠️  {len(failed)} reviews fell back to mock responses")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--max-in-flight', type=int, default=256)
+    parser.add_argument('--base-url', help='Use an existing OpenAI-compatible server')
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+
+    stats = StubStats()
+    config = config_from_args(args)
+    base_url = args.base_url or start_stub(config, stats)
+    os.environ['OPENAI_BASE_URL'] = base_url
+    os.environ.setdefault('OPENAI_API_KEY', 'stub-key')
+
+    elapsed = asyncio.run(run(args.requests, args.max_in_flight))
+
+    print(f"requests:        {args.requests}")
+    print(f"wall time:       {elapsed:.2f}s")
+    print(f"throughput:      {args.requests / elapsed:.1f} reviews/s")
+    if not args.base_url:
+        print(f"peak in flight:  {stats.peak} (limit {args.max_in_flight})")
+        print(f"serial estimate: {args.requests * config.latency.mean:.1f}s")
+        print(f"stub saw:        {stats.requests} requests, {stats.errors} errors, "
+              f"{stats.timeouts} timeouts, {stats.rate_limited} rate limited")
+
+
+if __name__ == '__main__':
+    main()
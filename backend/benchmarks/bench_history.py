@@ -0,0 +1,96 @@
+"""
+Benchmark the review history: request-path cost, write throughput and queries
+
+Measures what a review pays to be recorded, how fast the background
+writer stores rows compared with one commit per row, and the latency of
+paginated queries on a populated database.
+
+Usage:
+    python benchmarks/bench_history.py [--rows 100000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import generate_code, measure
+from services.review_history import ReviewHistory
+
+LANGUAGES = ('python', 'javascript', 'java', 'go', 'rust')
+
+
+def make_result(score: float) -> dict:
+    return {
+        "ai_review": {"model": "gpt-3.5-turbo", "cache": {"status": "miss"}},
+        "metrics": {"total_lines": 120},
+        "summary": {"overall_score": score, "quality_level": "Good", "complexity": 12,
+                    "main_issues": 3, "improvements_needed": 2}
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100000, help='Rows in the database for the query benchmark')
+    args = parser.parse_args()
+
+    code = generate_code('python', 4000)
+    results = [make_result(round(random.uniform(1, 10), 1)) for _ in range(100)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        history = ReviewHistory(os.path.join(directory, 'history.db'), max_pending=args.rows + 1)
+
+        # Cost on the request path: a queue put
+        record = measure(lambda: history.record(code, 'python', results[0], timings={"ai_review": 1.0}),
+                         repeat=3, min_time=0.1)
+        history.flush(60)
+        print(f"record() per review:       {record['min'] * 1e6:8.2f} us")
+
+        # Background writer throughput
+        started = time.perf_counter()
+        for index in range(args.rows):
+            history.record(code, LANGUAGES[index % len(LANGUAGES)], results[index % len(results)], duration=0.5)
+        history.flush(600)
+        elapsed = time.perf_counter() - started
+        print(f"batched writes:            {args.rows / elapsed:8.0f} rows/s "
+              f"({history.writer_stats()['batches']} transactions)")
+
+        # The same rows, committed one at a time
+        single = ReviewHistory(os.path.join(directory, 'single.db'), batch_size=1)
+        rows = [ReviewHistory._row(time.time(), code, 'python', results[0], 'review', 0.5, None)
+                for _ in range(min(args.rows, 2000))]
+        db = single._connect()
+        started = time.perf_counter()
+        for row in rows:
+            with db:
+                db.execute("INSERT INTO reviews (created_at, content_hash, language, kind, score, quality_level, "
+                           "total_lines, complexity, main_issues, improvements_needed, model, cache, duration_ms, "
+                           "timings) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", row)
+        elapsed = time.perf_counter() - started
+        print(f"one commit per row:        {len(rows) / elapsed:8.0f} rows/s")
+
+        # Paginated queries on the populated database
+        _, cursor = history.query(limit=50)
+        for _ in range(args.rows // 100):
+            _, deep = history.query(limit=50, cursor=cursor)
+            cursor = deep or cursor
+        queries = {
+            "newest page": lambda: history.query(limit=50),
+            "deep page": lambda: history.query(limit=50, cursor=cursor),
+            "by language": lambda: history.query({"language": "go"}, limit=50),
+            "by hash": lambda: history.query({"content_hash": "0" * 64}, limit=50),
+            "score range": lambda: history.query({"min_score": 9.5}, limit=50),
+            "recent hour": lambda: history.query({"since": time.time() - 3600}, limit=50),
+            "stats": lambda: history.stats(),
+        }
+        print(f"\nqueries on {history.writer_stats()['written']} rows:")
+        for name, query in queries.items():
+            print(f"  {name:<22}{measure(query, repeat=3, min_time=0.1)['min'] * 1000:8.3f} ms")
+
+
+if __name__ == '__main__':
+    main()
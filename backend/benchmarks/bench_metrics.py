@@ -0,0 +1,131 @@
+"""
+Benchmark the counter-based metrics engine against the previous multi-pass implementation
+
+The engine skips comments and string literals, so its counts differ from
+the substring counts of the old implementation by design; the metrics that
+differ are listed per row. Python syntax-tree metrics are benchmarked
+separately in bench_python_ast.py.
+
+Usage:
+    python benchmarks/bench_metrics.py [--sizes 10000,1000000,10000000]
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import LANGUAGES, generate_code, measure, throughput_mb_s
+from services import metrics_engine
+
+
+def legacy_metrics(code: str, language: str) -> dict:
+    """The multi-pass implementation the metrics engine replaced, kept as a baseline"""
+    lines = code.split('\n')
+    non_empty_lines = [line for line in lines if line.strip()]
+    metrics = {
+        "total_lines": len(lines),
+        "code_lines": len(non_empty_lines),
+        "comment_lines": len([line for line in lines if line.strip().startswith('#') or line.strip().startswith('//')]),
+        "blank_lines": len([line for line in lines if not line.strip()]),
+        "characters": len(code),
+        "words": len(code.split())
+    }
+    if language == 'python':
+        metrics.update({
+            "functions": code.count('def '),
+            "classes": code.count('class '),
+            "imports": code.count('import ') + code.count('from '),
+            "docstrings": code.count('"""') // 2 + code.count("'''") // 2,
+            "type_hints": code.count(': ') - code.count('def ') - code.count('class '),
+            "exceptions": code.count('except ') + code.count('raise '),
+            "async_functions": code.count('async def '),
+            "list_comprehensions": code.count('[') - code.count(']') + code.count('for ') // 2
+        })
+    elif language in ['javascript', 'typescript']:
+        metrics.update({
+            "functions": code.count('function ') + code.count('=>'),
+            "classes": code.count('class '),
+            "imports": code.count('import ') + code.count('require('),
+            "exports": code.count('export '),
+            "const_declarations": code.count('const '),
+            "let_declarations": code.count('let '),
+            "var_declarations": code.count('var '),
+            "async_functions": code.count('async '),
+            "arrow_functions": code.count('=>'),
+            "template_literals": code.count('`')
+        })
+    elif language == 'java':
+        metrics.update({
+            "methods": code.count('public ') + code.count('private ') + code.count('protected '),
+            "classes": code.count('class '),
+            "interfaces": code.count('interface '),
+            "imports": code.count('import '),
+            "packages": code.count('package '),
+            "annotations": code.count('@'),
+            "try_blocks": code.count('try {'),
+            "catch_blocks": code.count('catch '),
+            "finally_blocks": code.count('finally {'),
+            "static_methods": code.count('static ')
+        })
+    else:
+        metrics.update({
+            "functions": code.count('function ') + code.count('def ') + code.count('func '),
+            "classes": code.count('class '),
+            "comments": code.count('//') + code.count('/*') + code.count('#'),
+            "strings": code.count('"') // 2 + code.count("'") // 2,
+            "numbers": len([word for word in code.split() if word.replace('.', '').replace('-', '').isdigit()]),
+            "variables": code.count('var ') + code.count('let ') + code.count('const ') + code.count('int ') + code.count('string ')
+        })
+    lines = code.split('\n')
+    non_empty = [line for line in lines if line.strip()]
+    complexity_score = 0
+    if len(non_empty) > 50:
+        complexity_score += 2
+    if len(non_empty) > 100:
+        complexity_score += 2
+    function_count = code.count('def ') + code.count('function ') + code.count('class ')
+    complexity_score += min(3, function_count)
+    metrics.update({
+        "lines_of_code": len(lines),
+        "non_empty_lines": len(non_empty),
+        "complexity_score": min(10, complexity_score),
+        "function_count": function_count
+    })
+    return metrics
+
+
+def counter_metrics(code: str, language: str) -> dict:
+    return metrics_engine.build_metrics(metrics_engine.scan_code(code, language))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default='10000,1000000,10000000',
+                        help='Comma separated input sizes in characters')
+    parser.add_argument('--languages', default=','.join(LANGUAGES))
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    languages = args.languages.split(',')
+
+    print(f"{'language':<12}{'size':>12}{'legacy MB/s':>14}{'engine MB/s':>14}{'speedup':>10}  differing metrics")
+    for language in languages:
+        for size in sizes:
+            code = generate_code(language, size)
+            expected = legacy_metrics(code, language)
+            actual = counter_metrics(code, language)
+            differing = [key for key, value in expected.items() if actual.get(key) != value]
+
+            legacy = measure(lambda: legacy_metrics(code, language), repeat=3)
+            engine = measure(lambda: counter_metrics(code, language), repeat=3)
+            print(f"{language:<12}{size:>12}"
+                  f"{throughput_mb_s(size, legacy['min']):>14.1f}"
+                  f"{throughput_mb_s(size, engine['min']):>14.1f}"
+                  f"{legacy['min'] / engine['min']:>9.2f}x"
+                  f"  {', '.join(differing) or '-'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Benchmark review extraction from AI responses against the previous greedy regex
+
+Usage:
+    python benchmarks/bench_parse.py [--size 8000]
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import measure
+from services.ai_service import REVIEW_FIELDS
+from services.json_stream import extract_object
+
+
+def legacy_extract(response: str):
+    """The greedy regex extraction the parser replaced, kept as a baseline"""
+    try:
+        json_match = re.search(r'\{.*\}', response, re.DOTALL)
+        if not json_match:
+            return None
+        return json.loads(json_match.group())
+    except Exception:
+        return None
+
+
+def extract(response: str):
+    return extract_object(response, REVIEW_FIELDS)[0] or None
+
+
+def make_review(size: int) -> str:
+    """A well-formed review of roughly `size` characters"""
+    items = []
+    while sum(len(item) + 4 for item in items) < size:
+        index = len(items)
+        items.append(f"Item {index}: handle the {{edge}} case in \\\"parse_{index}\\\" [see line {index * 7}]")
+    third = len(items) // 3
+    return (
+        '{"score": 7, "quality_assessment": "Readable, with a few risky spots", '
+        f'"issues": {json.dumps(items[:third])}, "performance": "Fine for small inputs", '
+        f'"security": {json.dumps(items[third:2 * third])}, "best_practices": [], '
+        f'"improvements": {json.dumps(items[2 * third:])}}}'
+    )
+
+
+def make_cases(size: int) -> dict:
+    review = make_review(size)
+    return {
+        "clean": review,
+        "fenced with prose": f"Here is my review:\n```json\n{review}\n```\nLet me know if {{anything}} is unclear.",
+        "trailing braces": review + "\n\nNote: a dict like {'a': 1} or a block like { x } is fine." * 20,
+        "truncated": review[:int(len(review) * 0.8)],
+        "unclosed braces": "Looking at the code {" * (size // 21),
+        "example before": 'Use a config like {"debug": true} here.\n' + review,
+        "no json": "The code looks fine overall. " * (size // 29)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--size', type=int, default=8000, help='Approximate response size in characters')
+    args = parser.parse_args()
+
+    print(f"{'case':<20}{'chars':>8}{'legacy ms':>12}{'fields':>8}{'parser ms':>12}{'fields':>8}")
+    for name, response in make_cases(args.size).items():
+        legacy = measure(lambda: legacy_extract(response), repeat=3)
+        engine = measure(lambda: extract(response), repeat=3)
+        legacy_fields = len(legacy_extract(response) or {})
+        engine_fields = len(extract(response) or {})
+        print(f"{name:<20}{len(response):>8}"
+              f"{legacy['min'] * 1000:>12.3f}{legacy_fields:>8}"
+              f"{engine['min'] * 1000:>12.3f}{engine_fields:>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Benchmark syntax-tree Python metrics against the substring counters
+
+Reports the cost of a cold parse and of a cache hit next to the counter
+scan, then compares the counts of both approaches on code whose strings
+and comments contain keywords.
+
+Usage:
+    python benchmarks/bench_python_ast.py [--sizes 1000,10000,100000]
+"""
+
+import argparse
+import ast
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import generate_code, measure, throughput_mb_s
+from services import metrics_engine, python_analyzer
+
+# Keywords in strings, comments and docstrings fool the substring counters
+TRICKY_CODE = '''"""Helpers; see "def main" and "class Config" in the docs"""
+import re  # import os is not needed here
+
+TEMPLATE = """
+def generated():
+    return [x for x in items]
+"""
+
+
+class Parser:
+    # class-level cache, def-free
+    pattern = re.compile(r"[a-z]+\\[\\d+\\]")
+
+    def parse(self, text: str) -> list:
+        values = [int(part) for part in text.split(",") if part]
+        if not values or values[0] < 0:
+            raise ValueError("expected positive values, e.g. [1, 2]")
+        return values
+'''
+
+COMPARED_KEYS = ('functions', 'classes', 'imports', 'docstrings', 'type_hints', 'exceptions',
+                 'list_comprehensions', 'function_count')
+
+
+def counter_metrics(code: str) -> dict:
+    return metrics_engine.build_metrics(metrics_engine.scan_code(code, 'python'))
+
+
+def cold_analysis(code: str) -> dict:
+    """Parse and analyze without the cache"""
+    return python_analyzer.ParsedSource(ast.parse(code)).analysis()
+
+
+def valid_python(size: int) -> str:
+    """Generated Python code of about `size` characters that parses"""
+    code = generate_code('python', size + 1000)
+    return code[:code.rfind('\n\n', 0, size) + 1] or code
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default='1000,10000,100000', help='Comma separated input sizes in characters')
+    args = parser.parse_args()
+
+    print(f"{'size':>10}{'counters MB/s':>16}{'ast cold MB/s':>16}{'ast cached MB/s':>18}")
+    for size in (int(size) for size in args.sizes.split(',')):
+        code = valid_python(size)
+        counters = measure(lambda: counter_metrics(code), repeat=3)
+        cold = measure(lambda: cold_analysis(code), repeat=3)
+        python_analyzer.analyze(code)
+        cached = measure(lambda: python_analyzer.analyze(code), repeat=3)
+        print(f"{len(code):>10}"
+              f"{throughput_mb_s(len(code), counters['min']):>16.1f}"
+              f"{throughput_mb_s(len(code), cold['min']):>16.1f}"
+              f"{throughput_mb_s(len(code), cached['min']):>18.1f}")
+
+    counted = counter_metrics(TRICKY_CODE)
+    parsed = metrics_engine.analyze(TRICKY_CODE, 'python')
+    print(f"\n{'metric':<22}{'counters':>10}{'ast':>8}")
+    for key in COMPARED_KEYS:
+        print(f"{key:<22}{counted[key]:>10}{parsed[key]:>8}")
+    print(f"{'max_complexity':<22}{'-':>10}{parsed['max_complexity']:>8}")
+
+
+if __name__ == '__main__':
+    main()
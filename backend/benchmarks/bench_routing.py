@@ -0,0 +1,121 @@
+"""
+Benchmark LLM backend routing against local stub servers
+
+Starts one OpenAI-compatible stub per backend, routes concurrent reviews
+between them and reports, per phase, how traffic was split and the
+latency clients saw. In the middle phase the fastest backend is degraded
+(slow and failing); the router should move traffic away from it and back
+once it recovers. Each strategy is run against fresh stubs.
+
+Usage:
+    python benchmarks/bench_routing.py [--requests 400] [--concurrency 32]
+                                       [--strategies latency,round_robin]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from collections import Counter
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.llm_stub import LatencyDistribution, StubConfig, StubStats, start_stub
+
+# name: (latency spec, error rate, requests per second, 0 for no limit)
+BACKENDS = {
+    "fast": ("lognormal:0.04,0.3", 0.0, 0),
+    "medium": ("lognormal:0.12,0.3", 0.0, 0),
+    "limited": ("lognormal:0.04,0.3", 0.0, 40),
+    "flaky": ("lognormal:0.04,0.3", 0.3, 0),
+}
+PHASES = ("steady", "fast degraded", "recovered")
+
+
+async def run_phase(service, requests: int, concurrency: int, offset: int) -> Dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    served: Counter = Counter()
+
+    async def one(index: int):
+        async with semaphore:
+            started = time.perf_counter()
+            # Distinct code per request, so nothing is coalesced
+            review = await service.review_code_async(f"x = {offset + index}\n", "python")
+            latencies.append(time.perf_counter() - started)
+            served[review.get("backend", "failed")] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(index) for index in range(requests)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "served": dict(served),
+        "p50_ms": round(statistics.median(latencies) * 1000, 1),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95)] * 1000, 1),
+        "throughput": round(requests / elapsed, 1)
+    }
+
+
+def run_strategy(strategy: str, args) -> List[Dict]:
+    configs = {}
+    backends = []
+    for name, (latency, error_rate, rate_limit) in BACKENDS.items():
+        configs[name] = StubConfig(latency=latency, error_rate=error_rate, rate_limit=rate_limit, seed=1)
+        backends.append({"name": name, "base_url": start_stub(configs[name], StubStats()), "api_key": "stub"})
+    os.environ['LLM_BACKENDS'] = json.dumps(backends)
+    os.environ['LLM_ROUTER_STRATEGY'] = strategy
+
+    from services.async_ai_service import AsyncAIService
+    service = AsyncAIService()
+
+    async def main():
+        results = []
+        for index, phase in enumerate(PHASES):
+            if phase == "fast degraded":
+                configs["fast"].latency = LatencyDistribution("lognormal:0.6,0.3", configs["fast"].rng)
+                configs["fast"].error_rate = 0.5
+            elif phase == "recovered":
+                configs["fast"].latency = LatencyDistribution(BACKENDS["fast"][0], configs["fast"].rng)
+                configs["fast"].error_rate = 0.0
+                # Give the router's observations time to fade
+                await asyncio.sleep(args.recovery)
+            result = await run_phase(service, args.requests, args.concurrency, index * args.requests)
+            results.append(dict(result, strategy=strategy, phase=phase))
+            print(f"{strategy:<13}{phase:<15}{result['p50_ms']:>8.1f}{result['p95_ms']:>9.1f}"
+                  f"{result['throughput']:>8.1f}  " +
+                  "  ".join(f"{name}={result['served'].get(name, 0)}" for name in list(BACKENDS) + ["failed"]),
+                  flush=True)
+        await service.aclose()
+        return results
+
+    return asyncio.run(main())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=400, help='Reviews per phase')
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--strategies', default='latency,round_robin')
+    parser.add_argument('--recovery', type=float, default=5.0,
+                        help='Seconds the degraded backend is left alone before the last phase')
+    args = parser.parse_args()
+
+    # Must be set before the service reads them
+    os.environ['OPENAI_API_KEY'] = 'stub'
+    os.environ['REVIEW_CACHE_ENABLED'] = 'false'
+    os.environ['LLM_BREAKER_FAILURE_THRESHOLD'] = '0'
+    os.environ.setdefault('LLM_ROUTER_DECAY', '5')
+    os.environ.setdefault('LLM_RETRY_BASE_DELAY', '0.05')
+
+    print(f"{'strategy':<13}{'phase':<15}{'p50 ms':>8}{'p95 ms':>9}{'req/s':>8}  served by")
+    for strategy in args.strategies.split(','):
+        run_strategy(strategy, args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+Benchmark response encoding: size and encode time per format
+
+Review payloads are produced by the real review path with a fake model
+client, then encoded the way Flask's default provider did (stdlib json,
+sorted keys), with orjson, with MessagePack and with field selections
+that leave out the raw AI response and the metrics.
+
+Usage:
+    python benchmarks/bench_serialization.py [--sizes 2000,8000] [--batch 10]
+"""
+
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Must be set before the app creates its services
+os.environ.pop('OPENAI_API_KEY', None)
+os.environ['REVIEW_CACHE_ENABLED'] = 'false'
+os.environ.pop('REVIEW_HISTORY_DB', None)
+os.environ['REVIEW_DEFAULT_TIER'] = 'full'
+
+from benchmarks.bench_parse import make_review
+from benchmarks.bench_suite import FakeChatClient
+from benchmarks.common import generate_code, measure
+from utils import response_helpers
+from utils.response_helpers import create_response, encode_response
+
+FIELDS = '-ai_review.ai_response,-metrics'
+
+
+def legacy_encode(payload) -> bytes:
+    """What Flask's DefaultJSONProvider sent before, kept as a baseline"""
+    return json.dumps(payload, sort_keys=True, separators=(',', ':')).encode('utf-8')
+
+
+def make_payloads(app_module, sizes, batch: int):
+    """Yield (name, payload) of review and batch responses with AI responses of the given sizes"""
+    flask_app = app_module.create_app(warm_up=False)
+    app_services = flask_app.extensions['services']
+    code = generate_code('python', 4000)
+    for size in sizes:
+        app_services.ai_service.client = FakeChatClient(make_review(size))
+        app_services.ai_service.api_key = 'fake'
+        review = app_services.code_reviewer.review_code(code, 'python')
+        yield f"review {size}", create_response(True, "Code review completed", review)
+        results = [{"id": index, "success": True, "data": review} for index in range(batch)]
+        yield f"batch {batch}x{size}", create_response(True, "Batch review completed", {
+            "results": results, "total": batch, "succeeded": batch, "failed": 0})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default='2000,8000', help='Comma-separated AI response sizes in characters')
+    parser.add_argument('--batch', type=int, default=10, help='Items per batch response')
+    args = parser.parse_args()
+
+    import app
+    sizes = [int(size) for size in args.sizes.split(',')]
+    fields = FIELDS.replace('-', '-results.data.')
+    encoders = {
+        "json (before)": lambda payload, fields: legacy_encode(payload),
+        "orjson": lambda payload, fields: encode_response(payload, sort_keys=True)[0],
+        "orjson unsorted": lambda payload, fields: encode_response(payload)[0],
+        "msgpack": lambda payload, fields: encode_response(payload, 'application/msgpack')[0],
+        "orjson fields": lambda payload, fields: encode_response(payload, fields=fields, sort_keys=True)[0],
+        "msgpack fields": lambda payload, fields: encode_response(payload, 'application/msgpack', fields)[0],
+    }
+    if response_helpers.orjson is None:
+        print("⚠️  orjson is not installed; the orjson rows use the standard json module")
+    if response_helpers.msgpack is None:
+        print("⚠️  msgpack is not installed; the msgpack rows are JSON")
+
+    print(f"{'payload':<16}{'encoder':<18}{'bytes':>10}{'vs before':>11}{'encode us':>11}{'speedup':>9}")
+    for name, payload in make_payloads(app, sizes, args.batch):
+        selection = fields if name.startswith('batch') else FIELDS
+        baseline_size = baseline_time = None
+        for encoder, encode in encoders.items():
+            size = len(encode(payload, selection))
+            seconds = measure(lambda: encode(payload, selection), repeat=3, min_time=0.1)['min']
+            if baseline_size is None:
+                baseline_size, baseline_time = size, seconds
+            print(f"{name:<16}{encoder:<18}{size:>10}{size / baseline_size:>10.0%} "
+                  f"{seconds * 1e6:>10.1f}{baseline_time / seconds:>8.1f}x")
+        print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,174 @@
+"""
+Benchmark cold start: import time and time to the first request
+
+Every sample runs in a fresh interpreter, which imports the app, builds it,
+optionally warms it up and serves a first and a second review. Reviews go
+to the local LLM stub, so the first request includes everything a real one
+pays for on first use: the OpenAI SDK import, client construction, the
+tokenizer and the connection pools. The sync path is driven through the
+Flask test client and the async path through the ASGI app.
+
+Results are written as JSON; pass a previous file with --compare to list
+phases that got slower.
+
+Usage:
+    python benchmarks/bench_startup.py [-o startup.json] [--compare baseline.json]
+                                       [--samples 5] [--paths sync,async]
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_suite import git_commit
+from benchmarks.common import BACKEND_DIR
+from benchmarks.llm_stub import StubConfig, StubStats, start_stub
+
+PATHS = ('sync', 'async')
+PHASES = ('import_ms', 'create_ms', 'warm_up_ms', 'first_request_ms', 'second_request_ms', 'time_to_first_ms')
+
+# Runs in the child interpreter; prints one JSON object of phase durations
+CHILD_SCRIPT = r'''
+import asyncio, json, sys, time
+started = time.perf_counter()
+path, warm = sys.argv[1], sys.argv[2] == "warm"
+body = json.dumps({"code": "def add(a, b):\n    return a + b\n", "language": "python"}).encode()
+
+if path == "sync":
+    import app
+    imported = time.perf_counter()
+    flask_app = app.create_app(warm_up=False)
+    created = time.perf_counter()
+    if warm:
+        flask_app.extensions["services"].warm_up()
+    warmed = time.perf_counter()
+    client = flask_app.test_client()
+
+    def request():
+        response = client.post("/api/review", data=body, content_type="application/json")
+        assert response.status_code == 200, response.status_code
+else:
+    import asgi
+    imported = created = time.perf_counter()
+    if warm:
+        asgi.warm_up()
+    warmed = time.perf_counter()
+    loop = asyncio.new_event_loop()
+
+    def request():
+        messages = [{"type": "http.request", "body": body, "more_body": False}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {"type": "http", "method": "POST", "path": "/api/review", "query_string": b"", "headers": []}
+        loop.run_until_complete(asgi.app(scope, receive, send))
+        assert sent[0]["status"] == 200, sent[0]["status"]
+
+first = time.perf_counter()
+request()
+second = time.perf_counter()
+request()
+finished = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "create_ms": (created - imported) * 1000,
+    "warm_up_ms": (warmed - created) * 1000,
+    "first_request_ms": (second - first) * 1000,
+    "second_request_ms": (finished - second) * 1000,
+    "time_to_first_ms": (second - started) * 1000
+}))
+'''
+
+
+def run_sample(path: str, warm: bool, env: Dict[str, str]) -> Dict[str, float]:
+    output = subprocess.run([sys.executable, '-c', CHILD_SCRIPT, path, 'warm' if warm else 'cold'],
+                            cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def run(args) -> Dict:
+    base_url = start_stub(StubConfig(latency='0'), StubStats())
+    env = dict(os.environ, OPENAI_API_KEY='stub', OPENAI_BASE_URL=base_url, REVIEW_CACHE_ENABLED='false',
+               REVIEW_DEFAULT_TIER='full', APP_WARM_UP='false')
+    env.pop('REVIEW_HISTORY_DB', None)
+
+    results: List[Dict] = []
+    for path in args.paths.split(','):
+        if path not in PATHS:
+            raise SystemExit(f"Unknown path {path!r}, expected one of {', '.join(PATHS)}")
+        for warm in (False, True):
+            samples = [run_sample(path, warm, env) for _ in range(args.samples)]
+            result = {"path": path, "warm_up": warm}
+            result.update({phase: round(statistics.median(sample[phase] for sample in samples), 2)
+                           for phase in PHASES})
+            results.append(result)
+            print(f"{path:<7}{'warm' if warm else 'cold':<6}" + ''.join(f"{result[phase]:>15.1f}" for phase in PHASES),
+                  flush=True)
+
+    return {
+        "commit": git_commit(),
+        "timestamp": time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "samples": args.samples,
+        "results": results
+    }
+
+
+def compare(current: Dict, baseline: Dict, threshold: float) -> int:
+    """Print phases whose median grew by more than `threshold`, return their number"""
+    previous = {(r["path"], r["warm_up"]): r for r in baseline["results"]}
+    regressions = 0
+    print(f"\nCompared with {baseline.get('commit') or 'baseline'} (median ms):")
+    for result in current["results"]:
+        before = previous.get((result["path"], result["warm_up"]))
+        if before is None:
+            continue
+        for phase in ('import_ms', 'time_to_first_ms', 'first_request_ms'):
+            # Phases of a few milliseconds are noise
+            if before[phase] >= 5 and result[phase] / before[phase] > 1 + threshold:
+                regressions += 1
+                print(f"  slower {result[phase] / before[phase]:5.2f}x  {result['path']} "
+                      f"{'warm' if result['warm_up'] else 'cold'} {phase}")
+    print(f"  {regressions} regression(s) above {threshold:.0%}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('-o', '--output', default='startup_results.json', help='JSON file to write')
+    parser.add_argument('--compare', help='Previous results file to compare against')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='Relative slowdown reported as a regression (default 0.2)')
+    parser.add_argument('--samples', type=int, default=5, help='Fresh interpreters per row')
+    parser.add_argument('--paths', default=','.join(PATHS))
+    args = parser.parse_args()
+
+    print(f"{'path':<7}{'mode':<6}" + ''.join(f"{phase[:-3]:>15}" for phase in PHASES))
+    report = run(args)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nWrote {len(report['results'])} results to {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if compare(report, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,203 @@
+"""
+In-process benchmark suite for the review and analyze paths
+
+Drives the Flask app through its test client and the services directly,
+over generated inputs from 100 characters up to the maximum review size in
+every supported language. AI calls never leave the process: reviews use
+the deterministic mock review, or with --backend fake a stand-in client
+that returns a canned completion, so prompt building, the resilience layer
+and response parsing are exercised as well. The review cache is disabled
+so every request does the full work.
+
+Results are written as JSON; pass a previous file with --compare to list
+cells that got slower.
+
+Usage:
+    python benchmarks/bench_suite.py [-o results.json] [--compare baseline.json]
+                                     [--targets review,analyze,metrics,parse]
+                                     [--sizes 100,1000,10000,100000,max]
+                                     [--backend mock|fake] [--fake-latency 0]
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Must be set before the app creates its services
+os.environ.pop('OPENAI_API_KEY', None)
+os.environ['REVIEW_CACHE_ENABLED'] = 'false'
+os.environ.pop('REVIEW_HISTORY_DB', None)
+os.environ['ADMISSION_ENABLED'] = 'false'
+os.environ['REVIEW_DEFAULT_TIER'] = 'full'
+
+from benchmarks.llm_stub import REVIEW_JSON
+from benchmarks.bench_parse import make_review
+from benchmarks.common import BACKEND_DIR, LANGUAGES, generate_code, measure, throughput_mb_s
+from services.prompt_compactor import CHARS_PER_TOKEN
+
+TARGETS = ('review', 'analyze', 'metrics', 'parse')
+
+
+class FakeChatClient:
+    """Stand-in for the OpenAI client that answers every completion with a canned review"""
+
+    def __init__(self, content: str = REVIEW_JSON, latency: float = 0.0):
+        self.content = content
+        self.latency = latency
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **kwargs):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=self.content))],
+            usage=SimpleNamespace(prompt_tokens=100, completion_tokens=50)
+        )
+
+
+def git_commit() -> Optional[str]:
+    """Commit the benchmark ran against, if the tree is a git checkout"""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def make_cases(target: str, app_module, flask_app, sizes: List[str], languages: List[str]):
+    """Yield (language, size, callable) for one target"""
+    client = flask_app.test_client()
+    app_services = flask_app.extensions['services']
+    max_code = app_module.REVIEW_MAX_CODE_LENGTH
+    # The largest response the service asks the model for
+    max_response = int(app_services.ai_service.max_output_tokens * CHARS_PER_TOKEN)
+
+    def post(path: str, payload: Dict) -> Callable[[], None]:
+        body = json.dumps(payload)
+
+        def call():
+            response = client.post(path, data=body, content_type='application/json')
+            assert response.status_code == 200, response.get_data(as_text=True)[:200]
+        return call
+
+    if target == 'parse':
+        for size in sizes:
+            size = max_response if size == 'max' else int(size)
+            response = make_review(size)
+            yield 'any', len(response), \
+                lambda response=response: app_services.ai_service._parse_ai_response(response, '', 'python')
+        return
+
+    for language in languages:
+        for size in sizes:
+            size = max_code if size == 'max' else int(size)
+            code = generate_code(language, size)
+            if target == 'review':
+                yield language, size, post('/api/review', {"code": code, "language": language})
+            elif target == 'analyze':
+                yield language, size, post('/api/analyze', {"code": code, "language": language})
+            else:
+                yield language, size, \
+                    lambda code=code, language=language: app_services.code_reviewer.analyze_code_metrics(code, language)
+
+
+def run(args) -> Dict:
+    import app as app_module
+
+    flask_app = app_module.create_app(warm_up=True)
+    if args.backend == 'fake':
+        ai_service = flask_app.extensions['services'].ai_service
+        ai_service.api_key = 'fake'
+        ai_service.client = FakeChatClient(latency=args.fake_latency)
+
+    sizes = args.sizes.split(',')
+    languages = args.languages.split(',')
+    results = []
+    for target in args.targets.split(','):
+        if target not in TARGETS:
+            raise SystemExit(f"Unknown target {target!r}, expected one of {', '.join(TARGETS)}")
+        for language, size, func in make_cases(target, app_module, flask_app, sizes, languages):
+            func()  # warm up
+            timing = measure(func, repeat=args.repeat, min_time=args.min_time)
+            result = {
+                "target": target,
+                "language": language,
+                "size": size,
+                "latency_ms": {key: round(timing[key] * 1000, 4) for key in ("min", "median", "mean")},
+                "ops_per_s": round(1 / timing["median"], 1),
+                "throughput_mb_s": round(throughput_mb_s(size, timing["median"]), 2),
+                "loops": timing["loops"]
+            }
+            results.append(result)
+            print(f"{target:<9}{language:<12}{size:>10}{result['latency_ms']['median']:>14.3f}"
+                  f"{result['ops_per_s']:>12.1f}{result['throughput_mb_s']:>10.2f}", flush=True)
+
+    return {
+        "commit": git_commit(),
+        "timestamp": time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "backend": args.backend,
+        "results": results
+    }
+
+
+def compare(current: Dict, baseline: Dict, threshold: float) -> int:
+    """Print cells whose median latency grew by more than `threshold`, return their number"""
+    previous = {(r["target"], r["language"], r["size"]): r for r in baseline["results"]}
+    regressions = 0
+    print(f"\nCompared with {baseline.get('commit') or 'baseline'} (median latency):")
+    for result in current["results"]:
+        before = previous.get((result["target"], result["language"], result["size"]))
+        if before is None:
+            continue
+        ratio = result["latency_ms"]["median"] / before["latency_ms"]["median"]
+        if ratio > 1 + threshold:
+            regressions += 1
+            print(f"  slower {ratio:5.2f}x  {result['target']} {result['language']} {result['size']}")
+    print(f"  {regressions} regression(s) above {threshold:.0%}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('-o', '--output', default='bench_results.json', help='JSON file to write')
+    parser.add_argument('--compare', help='Previous results file to compare against')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='Relative slowdown reported as a regression (default 0.1)')
+    parser.add_argument('--targets', default=','.join(TARGETS))
+    parser.add_argument('--sizes', default='100,1000,10000,100000,max',
+                        help='Comma separated input sizes in characters; "max" is the largest accepted size')
+    parser.add_argument('--languages', default=','.join(LANGUAGES))
+    parser.add_argument('--backend', choices=('mock', 'fake'), default='mock',
+                        help='mock: no API key; fake: canned completions through the API path')
+    parser.add_argument('--fake-latency', type=float, default=0.0, help='Seconds the fake backend sleeps per call')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--min-time', type=float, default=0.2, help='Minimum seconds per sample')
+    args = parser.parse_args()
+
+    print(f"{'target':<9}{'language':<12}{'size':>10}{'median ms':>14}{'ops/s':>12}{'MB/s':>10}")
+    report = run(args)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nWrote {len(report['results'])} results to {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if compare(report, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
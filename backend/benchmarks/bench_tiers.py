@@ -0,0 +1,111 @@
+"""
+Benchmark review tiers against a local LLM stub
+
+Reviews a mix of small snippets, medium and large Python files once with
+every review on the full tier, as before tiers existed, and once with the
+tier chosen from the local metrics. The stub answers the full model slowly
+and the light model quickly. Reports, per input size, the tier the
+reviews got and their latency, and overall the LLM calls and tokens spent.
+
+Usage:
+    python benchmarks/bench_tiers.py [--requests 120] [--concurrency 8]
+                                     [--full-latency 1.2] [--light-latency 0.35]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import SNIPPETS
+from benchmarks.llm_stub import StubConfig, StubStats, start_stub
+
+FULL_MODEL = 'full-model'
+LIGHT_MODEL = 'light-model'
+
+SNIPPET = '''def scale_{index}(values, factor):
+    return [value * factor for value in values]
+'''
+
+# Share of each input size in the mix and the copies of the inventory module it holds
+SIZES = {"snippet": (0.5, 0), "medium": (0.3, 2), "large": (0.2, 8)}
+
+
+def make_corpus(requests: int) -> List[Tuple[str, str]]:
+    """(size, code) pairs, distinct per request so nothing is coalesced"""
+    corpus = []
+    for size, (share, copies) in SIZES.items():
+        for _ in range(round(requests * share)):
+            index = len(corpus)
+            if copies:
+                code = ''.join(SNIPPETS['python'].replace('Inventory', f'Inventory{index}_{copy}')
+                               for copy in range(copies))
+            else:
+                code = SNIPPET.format(index=index)
+            corpus.append((size, code))
+    return corpus
+
+
+def run(reviewer, corpus: List[Tuple[str, str]], tier: str, concurrency: int, stats: StubStats) -> None:
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    tiers: Dict[str, Counter] = defaultdict(Counter)
+    tokens = 0
+    calls = stats.requests
+
+    def one(item: Tuple[str, str]):
+        size, code = item
+        started = time.perf_counter()
+        result = reviewer.review_code(code, 'python', tier)
+        return size, time.perf_counter() - started, result
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for size, elapsed, result in pool.map(one, corpus):
+            latencies[size].append(elapsed)
+            tiers[size][result["tier"]["selected"]] += 1
+            usage = result["ai_review"].get("tokens") or {}
+            tokens += (usage.get("prompt") or 0) + (usage.get("completion") or 0)
+    elapsed = time.perf_counter() - started
+
+    print(f"tier={tier}:")
+    for size in SIZES:
+        print(f"  {size:<9}p50 {statistics.median(latencies[size]) * 1000:7.0f} ms  "
+              + "  ".join(f"{name}={count}" for name, count in sorted(tiers[size].items())))
+    print(f"  {'total':<9}{elapsed:6.1f} s  LLM calls {stats.requests - calls}  tokens {tokens}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=120)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--full-latency', default='1.2', help='Latency spec of the full model')
+    parser.add_argument('--light-latency', default='0.35', help='Latency spec of the light model')
+    args = parser.parse_args()
+
+    stats = StubStats()
+    # Must be set before the service reads them
+    os.environ['OPENAI_BASE_URL'] = start_stub(
+        StubConfig(latency=args.full_latency, model_latency={LIGHT_MODEL: args.light_latency}), stats)
+    os.environ['OPENAI_API_KEY'] = 'stub'
+    os.environ['OPENAI_MODEL'] = FULL_MODEL
+    os.environ['REVIEW_LIGHT_MODEL'] = LIGHT_MODEL
+    os.environ['REVIEW_CACHE_ENABLED'] = 'false'
+    os.environ['REVIEW_COALESCING_ENABLED'] = 'false'
+
+    from services.ai_service import AIService
+    from services.code_reviewer import CodeReviewer
+    reviewer = CodeReviewer(AIService())
+
+    corpus = make_corpus(args.requests)
+    for tier in ('full', 'auto'):
+        run(reviewer, corpus, tier, args.concurrency, stats)
+
+
+if __name__ == '__main__':
+    main()
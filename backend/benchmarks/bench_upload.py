@@ -0,0 +1,101 @@
+"""
+Benchmark reviewing uploaded project archives
+
+Builds zip and tar.gz archives of generated source files on disk and
+reviews them the way /api/review/upload does: entries are read one at a
+time and reviewed on a bounded worker pool as they arrive. For comparison
+the same archive is also reviewed after reading every entry into memory
+first. Reports the peak memory traced by tracemalloc, the time to the
+first result and the total time. Reviews use the metrics tier by default
+so the numbers show the upload path rather than the model.
+
+Usage:
+    python benchmarks/bench_upload.py [--files 2000] [--file-size 4000] [--tier metrics]
+"""
+
+import argparse
+import io
+import os
+import sys
+import tarfile
+import tempfile
+import time
+import tracemalloc
+import zipfile
+from typing import Dict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Must be set before the services are imported
+os.environ.pop('OPENAI_API_KEY', None)
+os.environ['REVIEW_CACHE_ENABLED'] = 'false'
+
+from benchmarks.common import generate_code
+from services.ai_service import AIService
+from services.code_reviewer import CodeReviewer
+from services.uploads import iter_upload_files
+
+
+def build_archive(path: str, files: int, file_size: int) -> int:
+    """Write an archive of distinct Python files and return their total size in bytes"""
+    base = generate_code('python', file_size)
+    total = 0
+    if path.endswith('.zip'):
+        archive = zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED)
+        add = archive.writestr
+    else:
+        archive = tarfile.open(path, 'w:gz')
+
+        def add(name, data):
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+    with archive:
+        for index in range(files):
+            data = f"# module {index}\n{base}".encode('utf-8')
+            total += len(data)
+            add(f"project/pkg{index % 50}/module{index}.py", data)
+    return total
+
+
+def run(reviewer: CodeReviewer, path: str, tier: str, eager: bool) -> Dict[str, float]:
+    tracemalloc.start()
+    started = time.perf_counter()
+    first = None
+    reviewed = 0
+    with open(path, 'rb') as stream:
+        files = iter_upload_files(stream, os.path.basename(path), max_files=10 ** 6)
+        if eager:
+            files = list(files)
+        for result in reviewer.review_files(files, tier):
+            if first is None:
+                first = time.perf_counter() - started
+            reviewed += result.get('success', False)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"reviewed": reviewed, "peak_mb": peak / 2 ** 20, "first_ms": first * 1000, "total_s": elapsed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--files', type=int, default=2000)
+    parser.add_argument('--file-size', type=int, default=4000, help='Characters per file')
+    parser.add_argument('--tier', default='metrics')
+    args = parser.parse_args()
+
+    reviewer = CodeReviewer(AIService())
+    print(f"{'archive':<9}{'mode':<11}{'files':>7}{'peak MB':>10}{'first ms':>10}{'total s':>9}")
+    with tempfile.TemporaryDirectory() as directory:
+        for name in ('project.zip', 'project.tar.gz'):
+            path = os.path.join(directory, name)
+            size = build_archive(path, args.files, args.file_size)
+            for eager in (True, False):
+                result = run(reviewer, path, args.tier, eager)
+                print(f"{name.split('.', 1)[1]:<9}{'read all' if eager else 'streaming':<11}{result['reviewed']:>7}"
+                      f"{result['peak_mb']:>10.1f}{result['first_ms']:>10.1f}{result['total_s']:>9.2f}")
+            print(f"  {size / 2 ** 20:.0f} MB of source, {os.path.getsize(path) / 2 ** 20:.1f} MB archive")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,302 @@
+"""
+Shared helpers for the benchmark scripts
+"""
+
+import os
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+# Representative snippets, repeated to reach the requested input size
+SNIPPETS = {
+    'python': '''# Inventory helpers
+import json
+from typing import Dict, List
+
+class Inventory:
+    """Track items in stock"""
+
+    def __init__(self, items: Dict[str, int]):
+        self.items = items
+
+    def restock(self, name: str, amount: int) -> None:
+        if amount <= 0:
+            raise ValueError("amount must be positive")
+        self.items[name] = self.items.get(name, 0) + amount
+
+    async def export(self) -> str:
+        try:
+            return json.dumps([k for k in self.items if self.items[k] > 0])
+        except TypeError as e:
+            raise RuntimeError(str(e))
+
+''',
+    'javascript': '''// Inventory helpers
+const fs = require('fs');
+import { format } from './format';
+
+export class Inventory {
+  constructor(items) {
+    this.items = items;
+  }
+
+  restock(name, amount) {
+    if (amount <= 0) {
+      throw new Error(`amount must be positive: ${amount}`);
+    }
+    let current = this.items[name] || 0;
+    this.items[name] = current + amount;
+  }
+
+  async save(path) {
+    var data = Object.keys(this.items).filter((k) => this.items[k] > 0);
+    return fs.promises.writeFile(path, format(data));
+  }
+}
+
+function total(inv) { return Object.values(inv.items).reduce((a, b) => a + b, 0); }
+
+''',
+    'typescript': '''// Inventory helpers
+import { format } from './format';
+
+export interface Item { name: string; amount: number; }
+
+export class Inventory {
+  private items: Map<string, number> = new Map();
+
+  restock(name: string, amount: number): void {
+    if (amount <= 0) {
+      throw new Error(`amount must be positive: ${amount}`);
+    }
+    const current = this.items.get(name) ?? 0;
+    this.items.set(name, current + amount);
+  }
+
+  async save(): Promise<string> {
+    let names = [...this.items.keys()].filter((k) => (this.items.get(k) ?? 0) > 0);
+    return format(names);
+  }
+}
+
+''',
+    'java': '''// Inventory helpers
+package com.example.inventory;
+
+import java.util.HashMap;
+import java.util.Map;
+
+public class Inventory {
+    private final Map<String, Integer> items = new HashMap<>();
+
+    @Override
+    public String toString() {
+        return items.toString();
+    }
+
+    public void restock(String name, int amount) {
+        try {
+            if (amount <= 0) {
+                throw new IllegalArgumentException("amount must be positive");
+            }
+            items.merge(name, amount, Integer::sum);
+        } catch (IllegalArgumentException e) {
+            System.err.println(e.getMessage());
+        } finally {
+            audit(name);
+        }
+    }
+
+    private static void audit(String name) { }
+}
+
+''',
+    'cpp': '''// Inventory helpers
+#include <map>
+#include <string>
+
+/* Track items in stock */
+class Inventory {
+public:
+    void restock(const std::string& name, int amount) {
+        if (amount <= 0) {
+            throw std::invalid_argument("amount must be positive");
+        }
+        items_[name] += amount;
+    }
+
+    int total() const {
+        int sum = 0;
+        for (const auto& kv : items_) sum += kv.second;
+        return sum;
+    }
+
+private:
+    std::map<std::string, int> items_;
+};
+
+''',
+    'csharp': '''// Inventory helpers
+using System;
+using System.Collections.Generic;
+
+namespace Example.Inventory
+{
+    /* Track items in stock */
+    public class Inventory
+    {
+        private readonly Dictionary<string, int> items = new Dictionary<string, int>();
+
+        public void Restock(string name, int amount)
+        {
+            if (amount <= 0)
+            {
+                throw new ArgumentException(@"amount must be positive");
+            }
+            items[name] = items.TryGetValue(name, out var current) ? current + amount : amount;
+        }
+    }
+}
+
+''',
+    'go': '''// Inventory helpers
+package inventory
+
+import (
+	"errors"
+	"fmt"
+)
+
+/* Inventory tracks items in stock */
+type Inventory struct {
+	items map[string]int
+}
+
+func (inv *Inventory) Restock(name string, amount int) error {
+	if amount <= 0 {
+		return errors.New("amount must be positive")
+	}
+	inv.items[name] += amount
+	return nil
+}
+
+func (inv *Inventory) String() string { return fmt.Sprintf(`%v`, inv.items) }
+
+''',
+    'rust': '''// Inventory helpers
+use std::collections::HashMap;
+
+/* Track items in stock */
+pub struct Inventory {
+    items: HashMap<String, i32>,
+}
+
+impl Inventory {
+    pub fn restock(&mut self, name: &str, amount: i32) -> Result<(), String> {
+        if amount <= 0 {
+            return Err(String::from("amount must be positive"));
+        }
+        *self.items.entry(name.to_string()).or_insert(0) += amount;
+        Ok(())
+    }
+
+    pub fn describe(&self) -> String { format!(r#"{:?}"#, self.items) }
+}
+
+''',
+    'php': '''<?php
+// Inventory helpers
+namespace Example;
+
+/* Track items in stock */
+class Inventory
+{
+    private array $items = [];
+
+    public function restock(string $name, int $amount): void
+    {
+        if ($amount <= 0) {
+            throw new \\InvalidArgumentException("amount must be positive");
+        }
+        $this->items[$name] = ($this->items[$name] ?? 0) + $amount;
+    }
+
+    # Human readable listing
+    public function describe(): string { return implode(', ', array_keys($this->items)); }
+}
+
+''',
+    'ruby': '''# Inventory helpers
+require 'json'
+
+class Inventory
+  def initialize(items = {})
+    @items = items
+  end
+
+  def restock(name, amount)
+    raise ArgumentError, "amount must be positive" if amount <= 0
+    @items[name] = @items.fetch(name, 0) + amount
+  end
+
+  def to_json(*args)
+    @items.select { |_k, v| v.positive? }.to_json(*args)
+  end
+end
+
+'''
+}
+
+LANGUAGES = list(SNIPPETS)
+
+
+def generate_code(language: str, size: int) -> str:
+    """Generate roughly `size` characters of code in the given language"""
+    snippet = SNIPPETS[language]
+    repeats = size // len(snippet) + 1
+    return (snippet * repeats)[:size]
+
+
+def measure(func: Callable[[], object], repeat: int = 5, min_time: float = 0.2) -> Dict[str, float]:
+    """
+    Time a callable
+
+    Each sample runs the callable enough times to last at least `min_time`
+    seconds, so short operations are not dominated by timer resolution.
+
+    Returns:
+        Dictionary with per-call min/median/mean latency in seconds
+    """
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or loops >= 1 << 20:
+            break
+        loops *= 2
+
+    samples: List[float] = [elapsed / loops]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        samples.append((time.perf_counter() - start) / loops)
+
+    return {
+        "min": min(samples),
+        "median": statistics.median(samples),
+        "mean": statistics.mean(samples),
+        "loops": loops
+    }
+
+
+def throughput_mb_s(size: int, seconds: float) -> float:
+    """Convert a per-call latency into MB/s for an input of `size` characters"""
+    return size / seconds / 1e6 if seconds > 0 else float('inf')
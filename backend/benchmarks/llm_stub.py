@@ -0,0 +1,372 @@
+"""
+OpenAI-compatible chat-completions stand-in for offline load testing
+
+Answers POST /v1/chat/completions with a canned review, with or without
+token streaming, after a latency drawn from a configurable distribution.
+Errors, hanging requests and rate limiting (429 with Retry-After) can be
+injected, so concurrency, connection pooling, retries and the circuit
+breaker can be exercised without network access. GET /stats returns what
+the stub has seen so far.
+
+Point the service at it:
+    OPENAI_BASE_URL=http://127.0.0.1:8001/v1 OPENAI_API_KEY=stub python app.py
+
+Usage:
+    python benchmarks/llm_stub.py [--port 8001] [--latency lognormal:0.8,0.5]
+                                  [--token-delay 0.01] [--error-rate 0.02]
+                                  [--timeout-rate 0.01] [--rate-limit 20]
+                                  [--model-latency gpt-4o-mini=lognormal:0.3,0.3]
+
+Latency specs: a number of seconds, fixed:S, uniform:LOW,HIGH,
+normal:MEAN,STDDEV, lognormal:MEDIAN,SIGMA or exponential:MEAN.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import re
+import socket
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.prompt_compactor import CHARS_PER_TOKEN, estimate_tokens
+
+REVIEW_JSON = json.dumps({
+    "score": 8,
+    "quality_assessment": "Stub review",
+    "issues": [],
+    "performance": "Stub",
+    "security": [],
+    "best_practices": [],
+    "improvements": []
+})
+
+# Characters per streamed chunk, about one token
+_CHUNK = re.compile(r'.{1,4}', re.DOTALL)
+
+
+class LatencyDistribution:
+    """Random latency in seconds, parsed from a spec like "lognormal:0.8,0.5" """
+
+    def __init__(self, spec: str, rng: Optional[random.Random] = None):
+        self.spec = spec
+        self.rng = rng or random.Random()
+        kind, _, params = spec.partition(':')
+        if not params:
+            kind, params = 'fixed', kind
+        try:
+            values = [float(value) for value in params.split(',')]
+        except ValueError:
+            raise ValueError(f"Invalid latency spec {spec!r}")
+
+        samplers: Dict[str, Tuple[int, Callable[[], float], float]] = {
+            'fixed': (1, lambda: values[0], values[0]),
+            'uniform': (2, lambda: self.rng.uniform(values[0], values[1]), sum(values[:2]) / 2),
+            'normal': (2, lambda: self.rng.gauss(values[0], values[1]), values[0]),
+            'lognormal': (2, lambda: values[0] * math.exp(self.rng.gauss(0, values[1])),
+                          values[0] * math.exp(values[1] ** 2 / 2) if len(values) > 1 else 0.0),
+            'exponential': (1, lambda: self.rng.expovariate(1 / values[0]) if values[0] > 0 else 0.0, values[0]),
+        }
+        if kind not in samplers or len(values) != samplers[kind][0]:
+            raise ValueError(f"Invalid latency spec {spec!r}")
+        _, self._sample, self.mean = samplers[kind]
+
+    def sample(self) -> float:
+        return max(0.0, self._sample())
+
+
+class StubConfig:
+    def __init__(self, latency: str = '0.5', token_delay: float = 0.0, error_rate: float = 0.0,
+                 error_status: int = 500, timeout_rate: float = 0.0, hang: float = 300.0,
+                 rate_limit: float = 0.0, burst: Optional[int] = None, content: str = REVIEW_JSON,
+                 seed: Optional[int] = None, model_latency: Optional[Dict[str, str]] = None):
+        """
+        Configure the stub's behavior
+
+        Args:
+            latency: Latency spec of the time to the first byte
+            token_delay: Seconds between streamed chunks
+            error_rate: Fraction of requests answered with `error_status`
+            error_status: HTTP status of injected errors
+            timeout_rate: Fraction of requests that hang for `hang` seconds
+            hang: Seconds a hanging request waits before giving up with 504
+            rate_limit: Requests per second before 429 responses, 0 for no limit
+            burst: Requests allowed at once under the rate limit (default: one second's worth)
+            content: Completion text returned for every request
+            seed: Seed of the random generator, for reproducible runs
+            model_latency: Latency specs of specific models, which take the place of `latency` for them
+        """
+        self.rng = random.Random(seed)
+        self.latency = LatencyDistribution(latency, self.rng)
+        self.model_latency = {model: LatencyDistribution(spec, self.rng)
+                              for model, spec in (model_latency or {}).items()}
+        self.token_delay = token_delay
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.timeout_rate = timeout_rate
+        self.hang = hang
+        self.rate_limit = rate_limit
+        self.burst = burst if burst is not None else max(1, int(math.ceil(rate_limit)))
+        self.content = content
+
+
+class StubStats:
+    def __init__(self):
+        self.requests = 0
+        self.in_flight = 0
+        self.peak = 0
+        self.streamed = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.rate_limited = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return dict(vars(self))
+
+
+class _RateLimiter:
+    """Token bucket; the event loop is single threaded so no lock is needed"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def acquire(self) -> float:
+        """Take a token and return 0, or return the seconds until one is available"""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def headers(self) -> List[Tuple[bytes, bytes]]:
+        """OpenAI-style rate limit headers"""
+        reset = max(0.0, (1 - self.tokens) / self.rate)
+        return [
+            (b'x-ratelimit-limit-requests', str(self.burst).encode('ascii')),
+            (b'x-ratelimit-remaining-requests', str(int(self.tokens)).encode('ascii')),
+            (b'x-ratelimit-reset-requests', f"{reset:.3f}s".encode('ascii'))
+        ]
+
+
+def make_stub_app(config: StubConfig, stats: StubStats):
+    """Build the stub as an ASGI application"""
+    limiter = _RateLimiter(config.rate_limit, config.burst) if config.rate_limit > 0 else None
+
+    async def app(scope, receive, send):
+        if scope['type'] == 'lifespan':
+            while True:
+                message = await receive()
+                await send({'type': message['type'] + '.complete'})
+                if message['type'] == 'lifespan.shutdown':
+                    return
+        if scope['type'] != 'http':
+            return
+
+        path, method = scope['path'], scope['method']
+        if method == 'GET' and path == '/stats':
+            await _send_json(send, 200, stats.as_dict())
+        elif method == 'GET' and path.endswith('/models'):
+            await _send_json(send, 200, {"object": "list", "data": [{"id": "stub", "object": "model"}]})
+        elif method == 'POST' and path.endswith('/chat/completions'):
+            await _completion(scope, receive, send)
+        else:
+            await _send_json(send, 404, _error("Not found", "invalid_request_error"))
+
+    async def _completion(scope, receive, send):
+        body = b''
+        while True:
+            message = await receive()
+            body += message.get('body', b'')
+            if not message.get('more_body'):
+                break
+        try:
+            request = json.loads(body)
+        except ValueError:
+            await _send_json(send, 400, _error("Invalid JSON body", "invalid_request_error"))
+            return
+
+        stats.requests += 1
+        headers = []
+        if limiter is not None:
+            wait = limiter.acquire()
+            headers = limiter.headers()
+            if wait > 0:
+                stats.rate_limited += 1
+                headers += [(b'retry-after', str(math.ceil(wait)).encode('ascii')),
+                            (b'retry-after-ms', str(int(wait * 1000)).encode('ascii'))]
+                await _send_json(send, 429, _error("Rate limit reached", "rate_limit_exceeded"), headers)
+                return
+
+        stats.in_flight += 1
+        stats.peak = max(stats.peak, stats.in_flight)
+        try:
+            roll = config.rng.random()
+            if roll < config.timeout_rate:
+                stats.timeouts += 1
+                if await _wait_for_disconnect(receive, config.hang):
+                    return
+                await _send_json(send, 504, _error("Upstream timed out", "timeout"), headers)
+                return
+
+            await asyncio.sleep(config.model_latency.get(request.get('model'), config.latency).sample())
+            if roll < config.timeout_rate + config.error_rate:
+                stats.errors += 1
+                await _send_json(send, config.error_status, _error("Injected failure", "server_error"), headers)
+                return
+
+            content, finish_reason = _limit_content(config.content, request.get('max_tokens'))
+            usage = {
+                "prompt_tokens": estimate_tokens(' '.join(str(m.get('content', ''))
+                                                          for m in request.get('messages', []))),
+                "completion_tokens": estimate_tokens(content)
+            }
+            usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+            model = request.get('model', 'stub')
+
+            if request.get('stream'):
+                stats.streamed += 1
+                await _stream(send, headers, model, content, finish_reason)
+            else:
+                await _send_json(send, 200, {
+                    "id": "chatcmpl-stub",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{"index": 0, "finish_reason": finish_reason,
+                                 "message": {"role": "assistant", "content": content}}],
+                    "usage": usage
+                }, headers)
+        finally:
+            stats.in_flight -= 1
+
+    async def _stream(send, headers, model: str, content: str, finish_reason: str):
+        await send({'type': 'http.response.start', 'status': 200,
+                    'headers': [(b'content-type', b'text/event-stream'), (b'cache-control', b'no-cache')] + headers})
+        created = int(time.time())
+
+        def chunk(delta: Dict, finish: Optional[str] = None) -> Dict:
+            return {'type': 'http.response.body', 'more_body': True, 'body': b'data: ' + json.dumps({
+                "id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": created, "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish}]
+            }).encode('utf-8') + b'\n\n'}
+
+        await send(chunk({"role": "assistant", "content": ""}))
+        for piece in _CHUNK.findall(content):
+            if config.token_delay:
+                await asyncio.sleep(config.token_delay)
+            await send(chunk({"content": piece}))
+        await send(chunk({}, finish_reason))
+        await send({'type': 'http.response.body', 'body': b'data: [DONE]\n\n'})
+
+    return app
+
+
+def _limit_content(content: str, max_tokens: Optional[int]) -> Tuple[str, str]:
+    """Cut the completion to about max_tokens, as the API does"""
+    if max_tokens and estimate_tokens(content) > max_tokens:
+        return content[:int(max_tokens * CHARS_PER_TOKEN)], "length"
+    return content, "stop"
+
+
+def _error(message: str, error_type: str) -> Dict:
+    return {"error": {"message": message, "type": error_type, "param": None, "code": error_type}}
+
+
+async def _wait_for_disconnect(receive, timeout: float) -> bool:
+    """Wait until the client goes away; False if `timeout` passes first"""
+    try:
+        await asyncio.wait_for(_disconnected(receive), timeout)
+        return True
+    except asyncio.TimeoutError:
+        return False
+
+
+async def _disconnected(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+async def _send_json(send, status: int, payload: Dict, headers: Optional[List[Tuple[bytes, bytes]]] = None):
+    body = json.dumps(payload).encode('utf-8')
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(b'content-type', b'application/json'),
+                            (b'content-length', str(len(body)).encode('ascii'))] + (headers or [])})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+def start_stub(config: StubConfig, stats: StubStats, host: str = '127.0.0.1', port: int = 0) -> str:
+    """Serve the stub in a background thread and return its base URL; port 0 picks a free port"""
+    import uvicorn
+
+    if not port:
+        with socket.socket() as sock:
+            sock.bind((host, 0))
+            port = sock.getsockname()[1]
+
+    server = uvicorn.Server(uvicorn.Config(make_stub_app(config, stats), host=host, port=port,
+                                           log_level='warning', backlog=4096))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return f"http://{host}:{port}/v1"
+
+
+def config_from_args(args: argparse.Namespace) -> StubConfig:
+    return StubConfig(
+        latency=args.latency, token_delay=args.token_delay, error_rate=args.error_rate,
+        error_status=args.error_status, timeout_rate=args.timeout_rate, hang=args.hang,
+        rate_limit=args.rate_limit, burst=args.burst, seed=args.seed,
+        model_latency=dict(item.split('=', 1) for item in args.model_latency)
+    )
+
+
+def add_stub_arguments(parser: argparse.ArgumentParser, default_latency: str = '0.5') -> None:
+    """Add the stub's behavior options to a command line parser"""
+    group = parser.add_argument_group('stub behavior')
+    group.add_argument('--latency', default=default_latency, help='Latency spec of the time to first byte')
+    group.add_argument('--model-latency', action='append', default=[], metavar='MODEL=SPEC',
+                       help='Latency spec of one model, e.g. gpt-4o-mini=lognormal:0.3,0.3 (repeatable)')
+    group.add_argument('--token-delay', type=float, default=0.0, help='Seconds between streamed chunks')
+    group.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests that fail')
+    group.add_argument('--error-status', type=int, default=500, help='HTTP status of injected failures')
+    group.add_argument('--timeout-rate', type=float, default=0.0, help='Fraction of requests that hang')
+    group.add_argument('--hang', type=float, default=300.0, help='Seconds a hanging request waits')
+    group.add_argument('--rate-limit', type=float, default=0.0, help='Requests per second before 429, 0 for none')
+    group.add_argument('--burst', type=int, help='Requests allowed at once under the rate limit')
+    group.add_argument('--seed', type=int, help='Random seed for reproducible runs')
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8001)
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+
+    try:
+        config = config_from_args(args)
+    except ValueError as e:
+        parser.error(str(e))
+
+    print(f"🧪 OpenAI-compatible stub on http://{args.host}:{args.port}/v1 "
+          f"(latency {args.latency}, mean {config.latency.mean:.3f}s)")
+    uvicorn.run(make_stub_app(config, StubStats()), host=args.host, port=args.port,
+                log_level='warning', backlog=4096)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,37 @@
+"""
+Gunicorn configuration
+
+The app is imported and warmed up once in the master process and workers
+are forked from it, so they start with the SDK, tokenizer and compiled
+lexers already loaded and share those pages copy-on-write.
+
+    gunicorn -c gunicorn.conf.py                    # Flask app on threaded workers
+    SERVER_MODE=asgi gunicorn -c gunicorn.conf.py   # async review path on uvicorn workers
+"""
+
+import os
+import sys
+
+os.environ.setdefault('APP_WARM_UP', 'true')
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+# The job store, admission limits and in-memory cache live in each process:
+# with several workers a job polled on another worker is not found and every
+# client gets the per-process limits once per worker. Scale with threads, or
+# raise WEB_CONCURRENCY only behind a load balancer with sticky sessions.
+workers = int(os.environ.get('WEB_CONCURRENCY', '1'))
+preload_app = True
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '120'))
+
+if os.environ.get('SERVER_MODE', 'wsgi') == 'asgi':
+    wsgi_app = 'asgi:app'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+else:
+    wsgi_app = 'wsgi:app'
+    worker_class = 'gthread'
+    threads = int(os.environ.get('GUNICORN_THREADS', '8'))
+
+
+def post_fork(server, worker):
+    """Let the worker reopen what it must not share with the master"""
+    sys.modules[wsgi_app.split(':')[0]].after_fork()
@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+AI Code Reviewer - Repository scanner
+
+Walk a directory tree and review every supported source file in-process,
+writing one JSON result per line. Metrics run in a process pool, AI reviews
+in a bounded thread pool, and an interrupted run picks up where it stopped
+with --resume.
+
+Usage:
+    python scan.py path/to/repo -o results.jsonl
+    python scan.py path/to/repo -o results.jsonl --resume
+    python scan.py path/to/repo --metrics-only > metrics.jsonl
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from typing import Dict, Iterator, List, Optional, TextIO, Tuple
+from dotenv import load_dotenv
+from services.code_reviewer import CodeReviewer
+from services.ai_service import AIService
+from services.review_cache import ReviewCache
+from utils.validators import (EXCLUDED_DIRECTORIES, MAX_FILE_SIZE, is_supported_filename, language_for_filename,
+                              validate_file_upload)
+
+DEFAULT_EXCLUDES = EXCLUDED_DIRECTORIES
+
+# (path, relative path, size, mtime_ns)
+FileEntry = Tuple[str, str, int, int]
+
+# Set in every metrics worker process by _init_worker
+_worker_reviewer: Optional[CodeReviewer] = None
+
+
+def _init_worker() -> None:
+    global _worker_reviewer
+    # Metrics never call the AI service
+    _worker_reviewer = CodeReviewer(None)
+
+
+def _read_source(path: str, rel_path: str) -> Tuple[Optional[str], Optional[str]]:
+    """Read a file and apply the upload rules, returning (code, skip reason)"""
+    # A file over the limit is never read into memory
+    if os.stat(path).st_size > MAX_FILE_SIZE:
+        return None, "File too large (max 1MB)"
+    with open(path, 'rb') as f:
+        data = f.read(MAX_FILE_SIZE + 1)
+    validation = validate_file_upload(data, rel_path)
+    if not validation["valid"]:
+        return None, validation["message"]
+    try:
+        return data.decode('utf-8'), None
+    except UnicodeDecodeError:
+        return None, "File is not UTF-8 text"
+
+
+def _fallback_reason(ai_review: Dict) -> Optional[str]:
+    """Why an AI review is only a stand-in for a real one, None if it is real"""
+    chunks = ai_review.get("chunks", [])
+    if any(chunk.get("error") for chunk in chunks):
+        return "AI review of a chunk failed"
+    if ai_review.get("fallback") or any(chunk.get("fallback") for chunk in chunks):
+        return "AI service unavailable, got a placeholder review"
+    statuses = [ai_review.get("cache", {}).get("status")] + [chunk.get("cache") for chunk in chunks]
+    if "bypass" in statuses:
+        return "AI response could not be parsed completely"
+    return None
+
+
+def _analyze_batch(batch: List[FileEntry]) -> List[Dict]:
+    """Compute metrics for a batch of files inside a worker process"""
+    records = []
+    for path, rel_path, size, mtime_ns in batch:
+        record = {"path": rel_path, "language": language_for_filename(rel_path),
+                  "size": size, "mtime_ns": mtime_ns}
+        try:
+            code, reason = _read_source(path, rel_path)
+            if code is None:
+                record.update(status="skipped", reason=reason)
+            else:
+                record.update(status="ok", metrics=_worker_reviewer.analyze_code_metrics(code, record["language"]))
+        except Exception as e:
+            record.update(status="error", error=f"Error during analysis: {str(e)}")
+        records.append(record)
+    return records
+
+
+def iter_source_files(root: str, excludes: Tuple[str, ...] = DEFAULT_EXCLUDES) -> Iterator[FileEntry]:
+    """
+    Walk a directory tree and yield every file with a reviewable extension
+
+    Args:
+        root: Directory to scan
+        excludes: Directory names that are not descended into
+
+    Yields:
+        Tuples of (path, path relative to root, size, mtime_ns)
+    """
+    # Relative paths are built alongside, os.path.relpath costs more than the stat
+    stack = [(root, '')]
+    while stack:
+        directory, prefix = stack.pop()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name not in excludes:
+                            stack.append((entry.path, prefix + entry.name + os.sep))
+                    elif is_supported_filename(entry.name) and entry.is_file(follow_symlinks=False):
+                        stat = entry.stat(follow_symlinks=False)
+                        yield entry.path, prefix + entry.name, stat.st_size, stat.st_mtime_ns
+        except OSError as e:
+            print(f"⚠️  Cannot read directory {directory}: {e}", file=sys.stderr)
+
+
+def load_completed(output_path: str, mode: str) -> Dict[str, Tuple[int, int]]:
+    """
+    Collect files already finished by an earlier run from its JSONL output
+
+    Errors are retried, and so are files that changed since they were
+    scanned. A line cut off by an interrupted write is ignored.
+
+    Args:
+        output_path: JSONL file written by the earlier run
+        mode: Scan mode of this run ("review" or "metrics")
+
+    Returns:
+        Dictionary mapping relative path to the (size, mtime_ns) it was scanned at
+    """
+    completed = {}
+    if not os.path.exists(output_path):
+        return completed
+    with open(output_path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get("status") == "skipped" or (
+                    record.get("status") == "ok" and (mode == "metrics" or record.get("mode") == "review")):
+                completed[record["path"]] = (record.get("size"), record.get("mtime_ns"))
+            else:
+                completed.pop(record.get("path"), None)
+    return completed
+
+
+class RepoScanner:
+    def __init__(self, code_reviewer: Optional[CodeReviewer], workers: Optional[int] = None,
+                 concurrency: int = 8, batch_size: int = 64):
+        """
+        Initialize the repository scanner
+
+        Args:
+            code_reviewer: Reviewer for AI reviews, None to compute metrics only
+            workers: Metrics worker processes (defaults to the CPU count)
+            concurrency: Maximum number of files under AI review at once
+            batch_size: Files per metrics task, amortizing inter-process overhead
+        """
+        self.code_reviewer = code_reviewer
+        self.workers = workers or os.cpu_count() or 1
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.mode = "review" if code_reviewer is not None else "metrics"
+        self.stats = {"ok": 0, "skipped": 0, "error": 0, "resumed": 0}
+
+    def scan(self, files: Iterator[FileEntry], out: TextIO,
+             completed: Optional[Dict[str, Tuple[int, int]]] = None) -> Dict:
+        """
+        Scan files and write one JSON record per file to `out`
+
+        Metrics batches are only scheduled while the AI stage keeps up, so
+        memory stays bounded no matter how many files the tree holds.
+
+        Args:
+            files: Files from iter_source_files
+            out: Text stream receiving JSONL records
+            completed: Files to skip, from load_completed
+
+        Returns:
+            Counts of written records by status, plus resumed and elapsed time
+        """
+        started = time.perf_counter()
+        batches = self._iter_batches(files, completed or {})
+        backlog = deque()
+        max_backlog = self.concurrency * 4
+        metric_futures = {}
+        review_futures = set()
+        exhausted = False
+
+        processes = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+        threads = ThreadPoolExecutor(max_workers=self.concurrency)
+        try:
+            while True:
+                # Keep every worker busy unless reviews are falling behind
+                while (not exhausted and len(metric_futures) < self.workers * 2
+                       and len(backlog) < max_backlog):
+                    batch = next(batches, None)
+                    if batch is None:
+                        exhausted = True
+                    else:
+                        metric_futures[processes.submit(_analyze_batch, batch)] = batch
+
+                while backlog and len(review_futures) < self.concurrency:
+                    review_futures.add(threads.submit(self._review, *backlog.popleft()))
+
+                if not metric_futures and not review_futures:
+                    break
+
+                done, _ = wait(review_futures.union(metric_futures), return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future in metric_futures:
+                        batch = metric_futures.pop(future)
+                        for record, entry in zip(future.result(), batch):
+                            if record["status"] == "ok" and self.code_reviewer is not None:
+                                backlog.append((record, entry[0]))
+                            else:
+                                self._write(out, record)
+                    else:
+                        review_futures.discard(future)
+                        self._write(out, future.result())
+                out.flush()
+        finally:
+            threads.shutdown(wait=False, cancel_futures=True)
+            processes.shutdown(wait=False, cancel_futures=True)
+
+        return dict(self.stats, elapsed=round(time.perf_counter() - started, 3))
+
+    def _iter_batches(self, files: Iterator[FileEntry],
+                      completed: Dict[str, Tuple[int, int]]) -> Iterator[List[FileEntry]]:
+        batch = []
+        for entry in files:
+            if completed.get(entry[1]) == (entry[2], entry[3]):
+                self.stats["resumed"] += 1
+                continue
+            batch.append(entry)
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def _review(self, record: Dict, path: str) -> Dict:
+        """Run the AI review of one file on a pool thread"""
+        try:
+            code, reason = _read_source(path, record["path"])
+            if code is None:
+                record.update(status="skipped", reason=reason)
+                record.pop("metrics", None)
+                return record
+            result = self.code_reviewer.review_code(code, record["language"])
+            record["ai_review"] = result["ai_review"]
+            record["summary"] = result["summary"]
+            reason = _fallback_reason(result["ai_review"])
+            if reason is not None:
+                # Recorded as an error so --resume reviews the file again
+                record.update(status="error", error=reason)
+        except Exception as e:
+            record.update(status="error", error=f"Error during code review: {str(e)}")
+        return record
+
+    def _write(self, out: TextIO, record: Dict) -> None:
+        record["mode"] = self.mode
+        out.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self.stats[record["status"]] += 1
+
+
+def _open_output(output_path: Optional[str], resume: bool) -> TextIO:
+    if output_path is None:
+        return sys.stdout
+    if resume and os.path.exists(output_path) and os.path.getsize(output_path):
+        with open(output_path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            cut_off = f.read(1) != b'\n'
+        out = open(output_path, 'a', encoding='utf-8')
+        if cut_off:
+            # Terminate the record an interrupted run was writing
+            out.write('\n')
+        return out
+    return open(output_path, 'w', encoding='utf-8')
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Review every supported source file in a directory tree")
+    parser.add_argument('root', help="Directory to scan")
+    parser.add_argument('-o', '--output', help="JSONL output file (default: stdout)")
+    parser.add_argument('--resume', action='store_true',
+                        help="Skip files already finished in the output file and append to it")
+    parser.add_argument('--metrics-only', action='store_true', help="Compute metrics without AI reviews")
+    parser.add_argument('--workers', type=int, default=int(os.getenv('SCAN_WORKERS', '0')) or None,
+                        help="Metrics worker processes (default: CPU count)")
+    parser.add_argument('--concurrency', type=int, default=int(os.getenv('SCAN_REVIEW_CONCURRENCY', '8')),
+                        help="Files under AI review at once (default: 8)")
+    parser.add_argument('--batch-size', type=int, default=int(os.getenv('SCAN_BATCH_SIZE', '64')),
+                        help="Files per metrics task (default: 64)")
+    parser.add_argument('--exclude', action='append', default=[],
+                        help="Additional directory name to skip, may be repeated")
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.root):
+        parser.error(f"Not a directory: {args.root}")
+    if args.resume and not args.output:
+        parser.error("--resume requires --output")
+
+    load_dotenv()
+
+    code_reviewer = None
+    if not args.metrics_only:
+        code_reviewer = CodeReviewer(AIService(cache=ReviewCache.from_env()))
+    scanner = RepoScanner(code_reviewer, workers=args.workers,
+                          concurrency=args.concurrency, batch_size=args.batch_size)
+
+    completed = load_completed(args.output, scanner.mode) if args.resume else {}
+    files = iter_source_files(args.root, DEFAULT_EXCLUDES + tuple(args.exclude))
+
+    out = _open_output(args.output, args.resume)
+    try:
+        stats = scanner.scan(files, out, completed)
+    except KeyboardInterrupt:
+        out.flush()
+        print("\n⚠️  Scan interrupted, rerun with --resume to continue", file=sys.stderr)
+        return 130
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    scanned = stats["ok"] + stats["skipped"] + stats["error"]
+    rate = scanned / stats["elapsed"] if stats["elapsed"] else 0.0
+    print(f"✅ Scanned {scanned} files in {stats['elapsed']:.1f}s ({rate:.0f} files/s): "
+          f"{stats['ok']} ok, {stats['skipped']} skipped, {stats['error']} errors, "
+          f"{stats['resumed']} already done", file=sys.stderr)
+    return 1 if stats["error"] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,454 @@
+"""
+Admission control for routes that call the LLM
+"""
+
+import asyncio
+import contextvars
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Callable, Deque, Dict, Iterator, Optional, Tuple
+
+# Priority lanes, highest first
+INTERACTIVE = "interactive"
+BATCH = "batch"
+LANES = (INTERACTIVE, BATCH)
+
+
+# Slots of the request being served, shared with the worker threads and tasks it copies its context to
+_request_slots: contextvars.ContextVar = contextvars.ContextVar('llm_slots', default=None)
+
+
+class _SlotBudget:
+    """The LLM slots a request holds, taken by one LLM call at a time"""
+
+    def __init__(self, slots: int):
+        self.slots = slots
+        self.semaphore = threading.BoundedSemaphore(slots)
+        self.async_semaphore: Optional[asyncio.Semaphore] = None
+
+
+@contextmanager
+def llm_slots(slots: Optional[int]) -> Iterator[None]:
+    """
+    Let the code in this block make at most `slots` LLM calls at once
+
+    The limit covers worker threads started with a copy of the current
+    context and tasks created inside the block. Nested fan-out (batch
+    items, chunks of one file) so stays within the slots admission control
+    granted the request. None or 0 leaves calls unlimited.
+    """
+    if not slots:
+        yield
+        return
+    token = _request_slots.set(_SlotBudget(slots))
+    try:
+        yield
+    finally:
+        _request_slots.reset(token)
+
+
+def llm_slot_limit() -> Optional[int]:
+    """Slots set by the enclosing llm_slots(), None when calls are unlimited"""
+    budget = _request_slots.get()
+    return budget.slots if budget is not None else None
+
+
+@contextmanager
+def llm_call() -> Iterator[None]:
+    """Hold one of the request's slots for the duration of an LLM call"""
+    budget = _request_slots.get()
+    if budget is None:
+        yield
+        return
+    with budget.semaphore:
+        yield
+
+
+@asynccontextmanager
+async def llm_call_async() -> AsyncIterator[None]:
+    """Coroutine version of llm_call() for the event loop"""
+    budget = _request_slots.get()
+    if budget is None:
+        yield
+        return
+    if budget.async_semaphore is None:
+        budget.async_semaphore = asyncio.Semaphore(budget.slots)
+    async with budget.async_semaphore:
+        yield
+
+
+def spare_llm_call() -> Optional[Callable[[], None]]:
+    """
+    Take one more of the request's slots for an extra LLM call, without waiting
+
+    Returns:
+        Function releasing the slot, None when every slot is in use
+    """
+    budget = _request_slots.get()
+    if budget is None:
+        return _no_slot
+    if not budget.semaphore.acquire(blocking=False):
+        return None
+    return budget.semaphore.release
+
+
+async def spare_llm_call_async() -> Optional[Callable[[], None]]:
+    """Coroutine version of spare_llm_call() for the event loop"""
+    budget = _request_slots.get()
+    if budget is None:
+        return _no_slot
+    if budget.async_semaphore is None:
+        budget.async_semaphore = asyncio.Semaphore(budget.slots)
+    if budget.async_semaphore.locked():
+        return None
+    # A free permit without waiters is taken at once
+    await budget.async_semaphore.acquire()
+    return budget.async_semaphore.release
+
+
+def _no_slot() -> None:
+    pass
+
+
+class Rejected(Exception):
+    """Raised when a request is not admitted; the client should retry after `retry_after` seconds"""
+
+    def __init__(self, message: str, retry_after: int, reason: str):
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+def client_key(api_key: Optional[str], authorization: Optional[str], address: Optional[str]) -> str:
+    """
+    Client a request is accounted to: its API key if it sent one, else its address
+
+    Args:
+        api_key: X-API-Key header (optional)
+        authorization: Authorization header, used when it carries a bearer token (optional)
+        address: Remote address of the connection
+    """
+    if not api_key and authorization and authorization.lower().startswith('bearer '):
+        api_key = authorization[7:].strip()
+    return f"key:{api_key}" if api_key else f"ip:{address or 'unknown'}"
+
+
+class _Waiter:
+    __slots__ = ('slots', 'granted', 'event')
+
+    def __init__(self, slots: int):
+        self.slots = slots
+        self.granted = False
+        self.event = threading.Event()
+
+
+class AdmissionController:
+    def __init__(self, max_in_flight: int = 4, batch_max_in_flight: int = 2,
+                 max_queued: Optional[Dict[str, int]] = None, max_wait: Optional[Dict[str, float]] = None,
+                 rates: Optional[Dict[str, Tuple[float, float]]] = None, client_max_in_flight: int = 2,
+                 max_clients: int = 10000):
+        """
+        Initialize admission control
+
+        A request first takes tokens from its client's bucket in its lane,
+        then LLM slots out of a global cap. Without a free slot it waits in
+        its lane's queue; interactive requests are always granted before
+        batch ones, and batch traffic never holds more than its share of
+        the slots, so a burst of batch work leaves room for interactive
+        users. No single client may hold or wait for more than
+        `client_max_in_flight` requests at once. A request finding its lane's queue full, or waiting longer
+        than the lane allows, is rejected at once with a Retry-After
+        instead of holding a worker until it times out.
+
+        Args:
+            max_in_flight: LLM slots shared by all lanes
+            batch_max_in_flight: Slots the batch lane may hold at the same time
+            max_queued: Requests per lane allowed to wait for a slot
+            max_wait: Seconds per lane a request may wait for a slot
+            rates: Per-client (tokens per second, burst) per lane, a rate of 0 for no limit
+            client_max_in_flight: Requests a client may have admitted or waiting at once, 0 for no limit
+            max_clients: Client buckets kept, least recently used dropped first
+        """
+        self.max_in_flight = max_in_flight
+        self.batch_max_in_flight = min(batch_max_in_flight, max_in_flight)
+        self.max_queued = dict({INTERACTIVE: 2, BATCH: 1}, **(max_queued or {}))
+        self.max_wait = dict({INTERACTIVE: 10.0, BATCH: 30.0}, **(max_wait or {}))
+        self.rates = dict({INTERACTIVE: (1.0, 10.0), BATCH: (2.0, 100.0)}, **(rates or {}))
+        self.client_max_in_flight = client_max_in_flight
+        self.max_clients = max_clients
+
+        self._lock = threading.Lock()
+        self._buckets: "OrderedDict[Tuple[str, str], list]" = OrderedDict()
+        self._waiters: Dict[str, Deque[_Waiter]] = {lane: deque() for lane in LANES}
+        self._client_requests: Dict[str, int] = {}
+        # Seconds a slot is held, as a moving average, for Retry-After estimates
+        self._hold_time = 1.0
+
+        self.in_flight = {lane: 0 for lane in LANES}
+        self.counts = {lane: {"admitted": 0, "rate_limited": 0, "concurrency_limited": 0, "shed": 0,
+                               "timed_out": 0} for lane in LANES}
+
+    @classmethod
+    def from_env(cls) -> Optional['AdmissionController']:
+        """
+        Build admission control from environment variables, or None when disabled
+
+        Waiting requests hold a worker thread, so the defaults keep slots
+        and queues below GUNICORN_THREADS and leave threads free for routes
+        that don't call the LLM.
+        """
+        if os.getenv('ADMISSION_ENABLED', 'true').lower() in ('0', 'false', 'no'):
+            return None
+
+        threads = int(os.getenv('GUNICORN_THREADS', '8'))
+        max_in_flight = int(os.getenv('ADMISSION_MAX_IN_FLIGHT', str(max(1, threads // 2))))
+        queued = str(max(1, threads // 8))
+        return cls(
+            max_in_flight=max_in_flight,
+            batch_max_in_flight=int(os.getenv('ADMISSION_BATCH_MAX_IN_FLIGHT', str(max(1, max_in_flight // 2)))),
+            max_queued={
+                INTERACTIVE: int(os.getenv('ADMISSION_INTERACTIVE_QUEUE', queued)),
+                BATCH: int(os.getenv('ADMISSION_BATCH_QUEUE', queued))
+            },
+            max_wait={
+                INTERACTIVE: float(os.getenv('ADMISSION_INTERACTIVE_MAX_WAIT', '10')),
+                BATCH: float(os.getenv('ADMISSION_BATCH_MAX_WAIT', '30'))
+            },
+            rates={
+                INTERACTIVE: (float(os.getenv('ADMISSION_INTERACTIVE_RATE', '1')),
+                              float(os.getenv('ADMISSION_INTERACTIVE_BURST', '10'))),
+                BATCH: (float(os.getenv('ADMISSION_BATCH_RATE', '2')),
+                        float(os.getenv('ADMISSION_BATCH_BURST', '100')))
+            },
+            client_max_in_flight=int(os.getenv('ADMISSION_CLIENT_MAX_IN_FLIGHT', str(max(1, max_in_flight // 2)))),
+            max_clients=int(os.getenv('ADMISSION_MAX_CLIENTS', '10000'))
+        )
+
+    def admit(self, client: str, lane: str, cost: float = 1, slots: int = 1) -> Tuple[Callable[[], None], int]:
+        """
+        Admit a request
+
+        Args:
+            client: Key of the client, see client_key()
+            lane: INTERACTIVE or BATCH
+            cost: Tokens taken from the client's bucket, e.g. the items of a batch
+            slots: LLM slots held while the request runs, 0 to only check the rate
+
+        Returns:
+            Function releasing the slots, calling it more than once is harmless, and the
+            number of slots granted; LLM calls of the request go through llm_slots() with it
+
+        Raises:
+            Rejected: If the client is over its rate or its concurrency, or no slot became free in time
+        """
+        self.check_rate(client, lane, cost)
+        if slots <= 0:
+            return (lambda: None), 0
+        try:
+            self._enter(client, lane)
+        except Rejected:
+            self._refund(client, lane, cost)
+            raise
+        try:
+            slots = self.acquire(lane, slots, self.max_wait[lane])
+        except Rejected:
+            # A shed request does not count against the client's rate
+            self._leave(client)
+            self._refund(client, lane, cost)
+            raise
+        started = time.monotonic()
+        released = []
+
+        def release():
+            if not released:
+                released.append(True)
+                self._leave(client)
+                self.release(lane, slots, time.monotonic() - started)
+        return release, slots
+
+    def check_rate(self, client: str, lane: str, cost: float = 1) -> None:
+        """
+        Take `cost` tokens from the client's bucket in the lane
+
+        Raises:
+            Rejected: If the bucket holds fewer tokens
+        """
+        rate, burst = self.rates[lane]
+        if rate <= 0:
+            return
+        # A full bucket always admits the largest request
+        cost = min(cost, burst)
+        now = time.monotonic()
+        with self._lock:
+            key = (lane, client)
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [burst, now]
+                if len(self._buckets) > self.max_clients:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+                bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+                bucket[1] = now
+            if bucket[0] < cost:
+                self.counts[lane]["rate_limited"] += 1
+                raise Rejected(f"Rate limit exceeded for {lane} requests",
+                               math.ceil((cost - bucket[0]) / rate), "rate_limited")
+            bucket[0] -= cost
+
+    def acquire(self, lane: str, slots: int = 1, timeout: Optional[float] = None, bounded: bool = True) -> int:
+        """
+        Take LLM slots in a lane, waiting behind requests queued before and in higher lanes
+
+        Args:
+            lane: INTERACTIVE or BATCH
+            slots: Slots wanted, capped at what the lane may hold
+            timeout: Longest wait in seconds, None to wait as long as it takes
+            bounded: Whether to shed the request when the lane's queue is full
+
+        Returns:
+            The number of slots taken; pass it to release()
+
+        Raises:
+            Rejected: If the queue is full or the wait timed out
+        """
+        slots = max(1, min(slots, self._lane_limit(lane)))
+        with self._lock:
+            if not self._queued_ahead(lane) and self._fits(lane, slots):
+                self._take(lane, slots)
+                return slots
+            if bounded and len(self._waiters[lane]) >= self.max_queued[lane]:
+                self.counts[lane]["shed"] += 1
+                raise Rejected(f"Too many {lane} requests in progress", self._retry_after(lane), "shed")
+            waiter = _Waiter(slots)
+            self._waiters[lane].append(waiter)
+
+        if waiter.event.wait(timeout):
+            return slots
+        with self._lock:
+            # Granted between the timeout and taking the lock
+            if waiter.granted:
+                return slots
+            self._waiters[lane].remove(waiter)
+            self.counts[lane]["timed_out"] += 1
+            # The request may have been holding back smaller ones behind it
+            self._grant()
+            raise Rejected(f"Timed out waiting for capacity for {lane} requests", self._retry_after(lane),
+                           "timed_out")
+
+    def release(self, lane: str, slots: int, held: Optional[float] = None) -> None:
+        """
+        Give back slots taken by acquire()
+
+        Args:
+            lane: Lane the slots were taken in
+            slots: Number returned by acquire()
+            held: Seconds the slots were held, for Retry-After estimates (optional)
+        """
+        with self._lock:
+            self.in_flight[lane] -= slots
+            if held is not None:
+                self._hold_time += 0.1 * (held - self._hold_time)
+            self._grant()
+
+    @contextmanager
+    def hold(self, lane: str, slots: int = 1) -> Iterator[None]:
+        """Hold slots for the duration of a block, waiting without a limit; for work already queued elsewhere"""
+        slots = self.acquire(lane, slots, bounded=False)
+        started = time.monotonic()
+        try:
+            with llm_slots(slots):
+                yield
+        finally:
+            self.release(lane, slots, time.monotonic() - started)
+
+    def waiting(self, lane: str) -> int:
+        """Requests waiting for a slot in the lane"""
+        return len(self._waiters[lane])
+
+    def stats(self) -> Dict[str, Any]:
+        """Slots, queues and outcomes per lane"""
+        with self._lock:
+            return {
+                "max_in_flight": self.max_in_flight,
+                "client_max_in_flight": self.client_max_in_flight,
+                "in_flight": sum(self.in_flight.values()),
+                "clients": len(self._buckets),
+                "hold_time_ms": round(self._hold_time * 1000, 1),
+                "lanes": {
+                    lane: dict(
+                        self.counts[lane],
+                        in_flight=self.in_flight[lane],
+                        max_in_flight=self._lane_limit(lane),
+                        waiting=len(self._waiters[lane]),
+                        max_queued=self.max_queued[lane],
+                        rate=self.rates[lane][0],
+                        burst=self.rates[lane][1]
+                    )
+                    for lane in LANES
+                }
+            }
+
+    def _enter(self, client: str, lane: str) -> None:
+        """Count a request of the client, unless it already has as many as it may"""
+        with self._lock:
+            requests = self._client_requests.get(client, 0)
+            if self.client_max_in_flight and requests >= self.client_max_in_flight:
+                self.counts[lane]["concurrency_limited"] += 1
+                raise Rejected(f"Too many concurrent requests from this client (limit {self.client_max_in_flight})",
+                               max(1, math.ceil(self._hold_time)), "concurrency_limited")
+            self._client_requests[client] = requests + 1
+
+    def _leave(self, client: str) -> None:
+        with self._lock:
+            requests = self._client_requests.pop(client) - 1
+            if requests:
+                self._client_requests[client] = requests
+
+    def _refund(self, client: str, lane: str, cost: float) -> None:
+        """Give back tokens taken by check_rate()"""
+        rate, burst = self.rates[lane]
+        if rate <= 0:
+            return
+        with self._lock:
+            bucket = self._buckets.get((lane, client))
+            if bucket is not None:
+                bucket[0] = min(burst, bucket[0] + min(cost, burst))
+
+    def _lane_limit(self, lane: str) -> int:
+        return self.batch_max_in_flight if lane == BATCH else self.max_in_flight
+
+    def _fits(self, lane: str, slots: int) -> bool:
+        """Whether the lane may take the slots now (lock held)"""
+        return sum(self.in_flight.values()) + slots <= self.max_in_flight and \
+            self.in_flight[lane] + slots <= self._lane_limit(lane)
+
+    def _queued_ahead(self, lane: str) -> bool:
+        """Whether requests in this or a higher lane are already waiting (lock held)"""
+        return any(self._waiters[other] for other in LANES[:LANES.index(lane) + 1])
+
+    def _take(self, lane: str, slots: int) -> None:
+        self.in_flight[lane] += slots
+        self.counts[lane]["admitted"] += 1
+
+    def _grant(self) -> None:
+        """Hand free slots to waiting requests, highest lane first, in arrival order (lock held)"""
+        for lane in LANES:
+            waiters = self._waiters[lane]
+            while waiters and self._fits(lane, waiters[0].slots):
+                waiter = waiters.popleft()
+                self._take(lane, waiter.slots)
+                waiter.granted = True
+                waiter.event.set()
+            if waiters:
+                # Lower lanes don't overtake a request still waiting here
+                return
+
+    def _retry_after(self, lane: str) -> int:
+        """Seconds until the requests waiting in and above the lane have likely been served (lock held)"""
+        waiting = sum(waiter.slots for other in LANES[:LANES.index(lane) + 1] for waiter in self._waiters[other])
+        return max(1, math.ceil((waiting + 1) * self._hold_time / self._lane_limit(lane)))
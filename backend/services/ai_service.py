@@ -2,56 +2,462 @@
 AI Service for code review and analysis
 """
 
+import copy
 import os
-import openai
-from typing import Dict, List, Optional
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Tuple
+from .admission import llm_call
+from .review_cache import ReviewCache
+from .json_stream import IncrementalJSONParser, extract_object
+from .single_flight import SingleFlight
+from .prompt_compactor import compact_code, estimate_tokens
+from .resilience import ResilientCaller
+from .llm_router import LLMBackend, LLMRouter
+from .telemetry import LLM_TOKENS, MOCK_REVIEWS, REVIEWS, stage
+from .metrics_engine import analyze_complexity
+from . import lexer, python_analyzer
+
+if TYPE_CHECKING:
+    import httpx
+
+# Bump whenever _create_review_prompt or compact_code changes so cached reviews are not reused
+PROMPT_TEMPLATE_VERSION = "6"
+
+# Top-level fields of a structured review, in the order the prompt asks for them
+REVIEW_FIELDS = ("score", "quality_assessment", "issues", "performance",
+                 "security", "best_practices", "improvements")
+
+DEFAULT_BASE_URL = "https://api.openai.com/v1"
+
+SYSTEM_PROMPT = "You are an expert code reviewer. Provide detailed, constructive feedback on code quality, best practices, and potential improvements."
 
 class AIService:
-    def __init__(self):
-        """Initialize AI service with OpenAI API"""
+    def __init__(self, cache: Optional[ReviewCache] = None):
+        """
+        Initialize AI service with OpenAI API
+
+        Args:
+            cache: Review cache consulted before calling the API (optional)
+        """
         self.api_key = os.getenv('OPENAI_API_KEY')
-        if self.api_key:
-            openai.api_key = self.api_key
-        else:
+        self.base_url = os.getenv('OPENAI_BASE_URL') or DEFAULT_BASE_URL
+        self.model = os.getenv('OPENAI_MODEL', 'gpt-3.5-turbo')
+        # Prompts that don't fit the default model's context go to the long context model
+        self.context_tokens = int(os.getenv('OPENAI_MODEL_CONTEXT_TOKENS', '4096'))
+        self.long_context_model = os.getenv('OPENAI_LONG_CONTEXT_MODEL')
+        self.min_output_tokens = int(os.getenv('OPENAI_MIN_TOKENS', '500'))
+        self.max_output_tokens = int(os.getenv('OPENAI_MAX_TOKENS', '1000'))
+        # Light tier reviews: a smaller model if there is one, and a shorter answer
+        self.light_model = os.getenv('REVIEW_LIGHT_MODEL')
+        self.light_max_tokens = int(os.getenv('REVIEW_LIGHT_MAX_TOKENS', '300'))
+        # Outcomes of extracting the review from model output
+        self.parse_counts = {"ok": 0, "recovered": 0, "failed": 0}
+        self._parse_lock = threading.Lock()
+        self.temperature = float(os.getenv('OPENAI_TEMPERATURE', '0.3'))
+        self.timeout = float(os.getenv('OPENAI_TIMEOUT', '60'))
+        self.max_connections = int(os.getenv('LLM_POOL_MAX_CONNECTIONS', '100'))
+        self.keepalive_expiry = float(os.getenv('LLM_POOL_KEEPALIVE_EXPIRY', '30'))
+        self.cache = cache
+        self.resilience = ResilientCaller.from_env(self.timeout)
+        # Endpoints and models calls are routed between; one unless LLM_BACKENDS lists several
+        self.router = LLMRouter.from_env(self.base_url, self.api_key, self._json_mode_enabled)
+        self.api_key = self.api_key or next((b.api_key for b in self.router.backends if b.api_key), None)
+        if all(backend.context_tokens for backend in self.router.backends):
+            # Requests are sized for the largest context; smaller ones are routed around
+            self.context_tokens = max(backend.context_tokens for backend in self.router.backends)
+        self.in_flight = 0
+        self._in_flight_lock = threading.Lock()
+        # Identical reviews requested concurrently share one API call
+        self.single_flight = None
+        if os.getenv('REVIEW_COALESCING_ENABLED', 'true').lower() != 'false':
+            self.single_flight = SingleFlight()
+        # The OpenAI SDK takes a large share of startup time; it is imported
+        # and the clients built on first use or in warm_up()
+        self._clients: Dict[str, Any] = {}
+        self._client_lock = threading.Lock()
+        self._ssl = None
+        if not self.api_key:
             print("⚠️  Warning: OPENAI_API_KEY not found. Using mock responses.")
     
-    def review_code(self, code: str, language: str) -> Dict:
+    @property
+    def client(self) -> Any:
+        """OpenAI client of the primary backend, created on first use; None without an API key"""
+        return self._client_for(self.router.primary)
+    
+    @client.setter
+    def client(self, client: Any) -> None:
+        self._clients[self.router.primary.name] = client
+    
+    def _client_for(self, backend: LLMBackend) -> Any:
+        """OpenAI client of a backend, created on first use; None without an API key"""
+        client = self._clients.get(backend.name)
+        if client is None and backend.api_key:
+            with self._client_lock:
+                client = self._clients.get(backend.name)
+                if client is None:
+                    import httpx
+                    import openai
+                    client = self._clients[backend.name] = openai.OpenAI(
+                        api_key=backend.api_key,
+                        base_url=backend.base_url,
+                        timeout=self.timeout,
+                        # Retries are handled by self.resilience
+                        max_retries=0,
+                        http_client=httpx.Client(
+                            limits=self._pool_limits(),
+                            verify=self._ssl_context(),
+                            # Rate limit budgets are read off every response, errors included
+                            event_hooks={'response': [
+                                lambda response, backend=backend: self.router.observe_headers(backend, response.headers)
+                            ]}
+                        )
+                    )
+        return client
+    
+    def warm_up(self) -> None:
+        """
+        Do the one-time work of a first request ahead of time
+        
+        Imports the SDK and builds the client, loads the tokenizer and
+        compiles the per-language lexers, so the first review does not pay
+        for them. Called before worker processes are forked, the work is
+        shared by all workers.
+        """
+        for backend in self.router.backends:
+            self._client_for(backend)
+        estimate_tokens("warm up")
+        for language in lexer.LANGUAGES:
+            lexer.lex("", language)
+    
+    def review_code(self, code: str, language: str, light: bool = False) -> Dict:
         """
         Review code using AI and return analysis results
         
         Args:
             code: Source code to review
             language: Programming language
+            light: Whether to ask the light model for a brief review
             
         Returns:
             Dictionary containing review results
         """
+        with stage('prompt'):
+            plan = self._plan_request(code, language, light)
         if not self.api_key:
-            return self._get_mock_review(code, language)
+            return self._with_tokens(self._with_cache_status(self._get_mock_review(code, language), "bypass"), plan)
+        
+        with stage('cache_lookup'):
+            cache_key, cached = self._lookup_cache(plan, language)
+        if cached is not None:
+            return self._with_tokens(cached, plan)
+        
+        if self.single_flight is None:
+            return self._request_review(plan, code, language, cache_key)
         
+        review, _ = self.single_flight.do(self._flight_key(plan, language, cache_key),
+                                          lambda: self._request_review(plan, code, language, cache_key))
+        # Every caller gets its own copy of the shared review
+        return copy.deepcopy(review)
+    
+    def _request_review(self, plan: Dict, code: str, language: str, cache_key: Optional[str]) -> Dict:
+        """Call the API for a review that is neither cached nor in flight"""
+        request = self._chat_request(plan)
+        tried: List[str] = []
         try:
-            prompt = self._create_review_prompt(code, language)
-            
-            response = openai.ChatCompletion.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "You are an expert code reviewer. Provide detailed, constructive feedback on code quality, best practices, and potential improvements."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=1000,
-                temperature=0.3
-            )
-            
+            # Waits while the request's other LLM calls hold all of its admission slots
+            with llm_call(), stage('llm'):
+                backend, response = self.resilience.call(
+                    lambda timeout: self._create_completion(request, plan, tried, timeout))
             ai_response = response.choices[0].message.content
             
-            return self._parse_ai_response(ai_response, code, language)
+        except Exception as e:
+            print(f"Error calling OpenAI API: {e}")
+            return self._with_tokens(self._with_cache_status(self._get_mock_review(code, language), "bypass"), plan)
+        
+        plan = self._served_plan(plan, backend)
+        with stage('parse'):
+            review = self._finish_review(ai_response, code, language, cache_key, plan["model"])
+        usage = response.usage
+        return self._with_tokens(review, plan, usage.prompt_tokens if usage else None,
+                                 usage.completion_tokens if usage else None)
+    
+    def _create_completion(self, request: Dict, plan: Dict, tried: List[str], timeout: float,
+                           **options) -> Tuple[LLMBackend, Any]:
+        """
+        Send one chat completion request to the backend the router picks, counted as in flight
+        
+        Backends in `tried` already failed this call and are only picked
+        again when no other one is left; the chosen one is added to it.
+        """
+        backend = self.router.select(plan["tokens"]["estimated_prompt"] + plan["max_tokens"], tried)
+        tried.append(backend.name)
+        with self._in_flight_lock:
+            self.in_flight += 1
+        started = time.monotonic()
+        try:
+            response = self._client_for(backend).chat.completions.create(
+                timeout=timeout, **options, **self._backend_request(request, backend, plan["tier"] == "light"))
+        except Exception as e:
+            self.router.finish(backend, time.monotonic() - started, e)
+            raise
+        finally:
+            with self._in_flight_lock:
+                self.in_flight -= 1
+        self.router.finish(backend, time.monotonic() - started)
+        return backend, response
+    
+    def stream_review(self, code: str, language: str, light: bool = False) -> Iterator[Tuple[str, Any]]:
+        """
+        Review code using AI and yield results while the model is writing
+        
+        Args:
+            code: Source code to review
+            language: Programming language
+            light: Whether to ask the light model for a brief review
+            
+        Yields:
+            ("token", text) for every streamed chunk of the completion,
+            ("field", (name, value)) as soon as a top-level field of the JSON
+            review is complete, and finally ("review", review) with the same
+            dictionary review_code returns
+        """
+        with stage('prompt'):
+            plan = self._plan_request(code, language, light)
+        if not self.api_key:
+            yield from self._replay_review(
+                self._with_tokens(self._with_cache_status(self._get_mock_review(code, language), "bypass"), plan))
+            return
+        
+        with stage('cache_lookup'):
+            cache_key, cached = self._lookup_cache(plan, language)
+        if cached is not None:
+            yield from self._replay_review(self._with_tokens(cached, plan))
+            return
+        
+        parser = IncrementalJSONParser()
+        chunks = []
+        try:
+            # Only opening the stream is retried, tokens already sent cannot be taken back
+            request = self._chat_request(plan)
+            tried: List[str] = []
+            # The admission slot is held until the stream is read to the end
+            with llm_call():
+                with stage('llm'):
+                    backend, stream = self.resilience.call(
+                        lambda timeout: self._create_completion(request, plan, tried, timeout, stream=True),
+                        hedge=False)
+                for chunk in stream:
+                    if not chunk.choices or not chunk.choices[0].delta.content:
+                        continue
+                    text = chunk.choices[0].delta.content
+                    chunks.append(text)
+                    yield "token", text
+                    for field in parser.feed(text):
+                        yield "field", field
+            for field in parser.finish():
+                yield "field", field
             
         except Exception as e:
             print(f"Error calling OpenAI API: {e}")
-            return self._get_mock_review(code, language)
+            yield "review", self._with_tokens(self._with_cache_status(self._get_mock_review(code, language), "bypass"), plan)
+            return
+        
+        # Streamed completions carry no usage, only the estimate is reported
+        plan = self._served_plan(plan, backend)
+        with stage('parse'):
+            review = self._finish_review(''.join(chunks), code, language, cache_key, plan["model"], parser)
+        yield "review", self._with_tokens(review, plan)
     
-    def _create_review_prompt(self, code: str, language: str) -> str:
-        """Create a prompt for code review"""
+    def _replay_review(self, review: Dict) -> Iterator[Tuple[str, Any]]:
+        """Yield the events of stream_review for an already complete review"""
+        for name in REVIEW_FIELDS:
+            if name in review:
+                yield "field", (name, review[name])
+        yield "review", review
+    
+    def _ssl_context(self) -> Any:
+        """SSL context shared by every client; loading the CA bundle dominates building a client"""
+        if self._ssl is None:
+            import httpx
+            self._ssl = httpx.create_ssl_context()
+        return self._ssl
+    
+    def _pool_limits(self, max_connections: Optional[int] = None) -> 'httpx.Limits':
+        """Connection pool limits shared by the sync and async clients"""
+        import httpx
+        max_connections = max_connections or self.max_connections
+        return httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            keepalive_expiry=self.keepalive_expiry
+        )
+    
+    def _plan_request(self, code: str, language: str, light: bool = False) -> Dict:
+        """
+        Compact the code, build the prompt and size the request from its token count
+        
+        Args:
+            code: Source code to review
+            language: Programming language
+            light: Whether to plan a brief review by the light model
+            
+        Returns:
+            Dictionary with the compacted code, prompt, model, max_tokens, token
+            estimates, tier and the prompt version the cache is keyed on
+        """
+        compacted = compact_code(code, language)
+        # The parse tree is shared with the metrics and the chunker through its cache
+        hotspots = python_analyzer.hotspots(compacted) if language == 'python' else []
+        prompt = self._create_review_prompt(compacted, language, hotspots, brief=light)
+        prompt_tokens = estimate_tokens(SYSTEM_PROMPT) + estimate_tokens(prompt)
+        code_tokens = estimate_tokens(code) if compacted != code else None
+        
+        # Longer code gets more findings, short snippets need less room
+        max_tokens = min(self.max_output_tokens, max(self.min_output_tokens, prompt_tokens // 2))
+        model = self.model
+        if prompt_tokens + max_tokens > self.context_tokens:
+            if self.long_context_model:
+                model = self.long_context_model
+            else:
+                max_tokens = max(self.min_output_tokens, self.context_tokens - prompt_tokens)
+        elif light:
+            model = self.light_model or model
+            max_tokens = min(max_tokens, self.light_max_tokens)
+        
+        if code_tokens is None:
+            saved = 0
+        else:
+            saved = max(0, code_tokens - estimate_tokens(compacted))
+        return {
+            "code": compacted,
+            "prompt": prompt,
+            "model": model,
+            "max_tokens": max_tokens,
+            "tokens": {
+                "estimated_prompt": prompt_tokens,
+                "estimated_saved": saved,
+                "max_completion": max_tokens
+            },
+            "tier": "light" if light else "full",
+            # Brief reviews are cached apart from full ones of the same model
+            "version": PROMPT_TEMPLATE_VERSION + ("-light" if light else "")
+        }
+    
+    def _chat_request(self, plan: Dict) -> Dict:
+        """Build the chat completion request for a review"""
+        request = {
+            "model": plan["model"],
+            "messages": [
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": plan["prompt"]}
+            ],
+            "max_tokens": plan["max_tokens"],
+            "temperature": self.temperature
+        }
+        return request
+    
+    @staticmethod
+    def _backend_request(request: Dict, backend: LLMBackend, light: bool = False) -> Dict:
+        """Adapt a chat completion request to the backend's model and JSON mode"""
+        model = backend.model_for(light)
+        if model is None and not backend.json_mode:
+            return request
+        request = dict(request)
+        if model is not None:
+            request["model"] = model
+        if backend.json_mode:
+            # The prompt asks for JSON, which JSON mode requires
+            request["response_format"] = {"type": "json_object"}
+        return request
+    
+    @staticmethod
+    def _served_plan(plan: Dict, backend: LLMBackend) -> Dict:
+        """The plan with the model the backend actually served, and the backend's name"""
+        return dict(plan, model=backend.model_for(plan["tier"] == "light") or plan["model"], backend=backend.name)
+    
+    @staticmethod
+    def _json_mode_enabled(setting: str, base_url: str) -> bool:
+        """Resolve a JSON mode setting; "auto" enables it only for the OpenAI API itself"""
+        setting = setting.lower()
+        if setting == 'auto':
+            return base_url.rstrip('/') == DEFAULT_BASE_URL
+        return setting == 'true'
+    
+    def _with_tokens(self, review: Dict, plan: Dict, prompt_tokens: Optional[int] = None,
+                     completion_tokens: Optional[int] = None) -> Dict:
+        """Attach token counts to a review; usage is None when no API call was made"""
+        review["model"] = plan["model"]
+        if "backend" in plan:
+            review["backend"] = plan["backend"]
+        review["tokens"] = dict(plan["tokens"], prompt=prompt_tokens, completion=completion_tokens)
+        if prompt_tokens:
+            LLM_TOKENS.inc(prompt_tokens, kind="prompt")
+        if completion_tokens:
+            LLM_TOKENS.inc(completion_tokens, kind="completion")
+        return review
+    
+    def is_cached(self, code: str, language: str, light: bool = False) -> bool:
+        """Whether review_code would answer from the cache, without counting a hit or a miss"""
+        if self.cache is None or not self.api_key:
+            return False
+        plan = self._plan_request(code, language, light)
+        return self.cache.contains(
+            self.cache.make_key(plan["code"], language, plan["model"], plan["version"], self.temperature))
+    
+    def _lookup_cache(self, plan: Dict, language: str) -> Tuple[Optional[str], Optional[Dict]]:
+        """Return the cache key of a review and the cached review, if any"""
+        if self.cache is None:
+            return None, None
+        
+        # Keyed on the compacted code, whitespace-only edits still hit
+        cache_key = self.cache.make_key(plan["code"], language, plan["model"], plan["version"], self.temperature)
+        cached = self.cache.get(cache_key)
+        if cached is None:
+            return cache_key, None
+        
+        review, tier = cached
+        return cache_key, self._with_cache_status(review, "hit", tier, cache_key)
+    
+    def _flight_key(self, plan: Dict, language: str, cache_key: Optional[str]) -> str:
+        """Identity of a review request for coalescing, the cache key when there is one"""
+        return cache_key or ReviewCache.make_key(plan["code"], language, plan["model"], plan["version"],
+                                                 self.temperature)
+    
+    def _finish_review(self, ai_response: str, code: str, language: str, cache_key: Optional[str],
+                       model: str, parser: Optional[IncrementalJSONParser] = None) -> Dict:
+        """Parse an AI response and store the review in the cache"""
+        review = self._extract_review(ai_response, parser)
+        status = review["parse"]["status"]
+        with self._parse_lock:
+            self.parse_counts[status] += 1
+        if status != "ok":
+            # Keep what the model wrote, but let the next request retry the API
+            return self._with_cache_status(review, "bypass")
+        
+        if self.cache is not None:
+            self.cache.set(cache_key, review, language, model)
+        
+        return self._with_cache_status(review, "miss", key=cache_key)
+    
+    def _with_cache_status(self, review: Dict, status: str, tier: Optional[str] = None,
+                           key: Optional[str] = None) -> Dict:
+        """Attach cache status to a review when the cache is enabled"""
+        REVIEWS.inc(cache_status=status)
+        if self.cache is not None:
+            review["cache"] = {"status": status, "tier": tier, "key": key}
+        return review
+    
+    def _create_review_prompt(self, code: str, language: str, hotspots: Optional[List[Dict]] = None,
+                              brief: bool = False) -> str:
+        """Create a prompt for code review, pointing out the most complex functions if given"""
+        focus = ""
+        if hotspots:
+            focus = "\nFunctions with high cyclomatic complexity, worth a closer look:\n" + "".join(
+                f"- {spot['name']} (line {spot['line']}): complexity {spot['complexity']}, "
+                f"nesting depth {spot['nesting_depth']}\n" for spot in hotspots)
+        if brief:
+            focus += "\nKeep the review brief: at most three entries per list and one sentence per text field.\n"
         return f"""
 Please review the following {language} code and provide:
 
@@ -67,51 +473,71 @@ Code to review:
 ```{language}
 {code}
 ```
+{focus}
+Start every issue, security concern and improvement with the line of the code above it refers to, counting from 1.
 
 Please format your response as JSON with the following structure:
 {{
     "score": <number>,
     "quality_assessment": "<text>",
-    "issues": ["<issue1>", "<issue2>"],
+    "issues": ["Line <n>: <issue1>", "Line <n>: <issue2>"],
     "performance": "<text>",
-    "security": ["<concern1>", "<concern2>"],
+    "security": ["Line <n>: <concern1>", "Line <n>: <concern2>"],
     "best_practices": ["<practice1>", "<practice2>"],
-    "improvements": ["<improvement1>", "<improvement2>"]
+    "improvements": ["Line <n>: <improvement1>", "Line <n>: <improvement2>"]
 }}
 """
     
     def _parse_ai_response(self, response: str, code: str, language: str) -> Dict:
         """Parse AI response and extract structured data"""
-        try:
-            # Try to extract JSON from response
-            import json
-            import re
-            
-            # Find JSON in the response
-            json_match = re.search(r'\{.*\}', response, re.DOTALL)
-            if json_match:
-                parsed = json.loads(json_match.group())
-            else:
-                # Fallback to mock response
-                return self._get_mock_review(code, language)
-            
-            return {
-                "score": parsed.get("score", 7),
-                "quality_assessment": parsed.get("quality_assessment", "Code quality analysis"),
-                "issues": parsed.get("issues", []),
-                "performance": parsed.get("performance", "Performance analysis"),
-                "security": parsed.get("security", []),
-                "best_practices": parsed.get("best_practices", []),
-                "improvements": parsed.get("improvements", []),
-                "ai_response": response
-            }
+        return self._extract_review(response)
+    
+    def _extract_review(self, response: str, parser: Optional[IncrementalJSONParser] = None) -> Dict:
+        """
+        Extract structured review data from an AI response
+        
+        The first JSON object in the response is decoded in one linear pass,
+        skipping prose around it. Output cut off mid-object keeps every field
+        that was complete. Fields the model did not deliver get defaults, and
+        a response without any JSON is kept as the quality assessment.
+        
+        Args:
+            response: Text of the AI response
+            parser: Parser that already consumed the whole response (optional)
             
-        except Exception as e:
-            print(f"Error parsing AI response: {e}")
-            return self._get_mock_review(code, language)
+        Returns:
+            Review dictionary with a "parse" block: status "ok", "recovered" or "failed"
+        """
+        if parser is not None and parser.fields:
+            parsed, complete, errors = parser.fields, not parser.truncated and not parser.errors, parser.errors
+        else:
+            parsed, complete, errors = extract_object(response, REVIEW_FIELDS)
+        
+        if not parsed:
+            status = "failed"
+        elif not complete:
+            status = "recovered"
+        else:
+            status = "ok"
+        if status != "ok":
+            print(f"Error parsing AI response: {status}, {errors or 'no complete JSON object'}")
+        
+        return {
+            "score": parsed.get("score", 7),
+            "quality_assessment": parsed.get("quality_assessment", response.strip() if status == "failed"
+                                             else "Code quality analysis"),
+            "issues": parsed.get("issues", []),
+            "performance": parsed.get("performance", "Performance analysis"),
+            "security": parsed.get("security", []),
+            "best_practices": parsed.get("best_practices", []),
+            "improvements": parsed.get("improvements", []),
+            "parse": {"status": status, "errors": errors},
+            "ai_response": response
+        }
     
     def _get_mock_review(self, code: str, language: str) -> Dict:
         """Get mock review response when API is not available"""
+        MOCK_REVIEWS.inc()
         lines = len(code.split('\n'))
         complexity = min(10, max(1, lines // 10))
         
@@ -137,28 +563,10 @@ Please format your response as JSON with the following structure:
                 "Consider breaking large functions",
                 "Add error handling"
             ],
-            "ai_response": "Mock response - API key not configured"
+            "ai_response": "Mock response - API key not configured",
+            "fallback": True
         }
     
     def analyze_complexity(self, code: str, language: str) -> Dict:
         """Analyze code complexity metrics"""
-        lines = code.split('\n')
-        non_empty_lines = [line for line in lines if line.strip()]
-        
-        # Simple complexity analysis
-        complexity_score = 0
-        if len(non_empty_lines) > 50:
-            complexity_score += 2
-        if len(non_empty_lines) > 100:
-            complexity_score += 2
-        
-        # Count functions/classes (simple heuristic)
-        function_count = code.count('def ') + code.count('function ') + code.count('class ')
-        complexity_score += min(3, function_count)
-        
-        return {
-            "lines_of_code": len(lines),
-            "non_empty_lines": len(non_empty_lines),
-            "complexity_score": min(10, complexity_score),
-            "function_count": function_count
-        } 
\ No newline at end of file
+        return analyze_complexity(code, language)
\ No newline at end of file
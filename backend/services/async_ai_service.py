@@ -0,0 +1,168 @@
+"""
+Asyncio AI Service with pooled HTTP connections
+"""
+
+import asyncio
+import copy
+import itertools
+import os
+import time
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Tuple
+from .admission import llm_call_async
+from .ai_service import AIService
+from .llm_router import LLMBackend
+from .review_cache import ReviewCache
+from .telemetry import stage
+
+if TYPE_CHECKING:
+    import httpx
+
+class AsyncAIService(AIService):
+    def __init__(self, cache: Optional[ReviewCache] = None, max_in_flight: Optional[int] = None):
+        """
+        Initialize async AI service
+
+        Requests go straight to the OpenAI-compatible /chat/completions
+        endpoint on a pooled httpx client; the SDK's per-request model
+        transformation costs more CPU than the HTTP round trip itself when
+        hundreds of calls are in flight. The clients and semaphore are created
+        on first use or in warm_up(); neither binds to an event loop before
+        its first request.
+
+        Args:
+            cache: Review cache consulted before calling the API (optional)
+            max_in_flight: Maximum concurrent LLM calls (defaults to LLM_MAX_IN_FLIGHT)
+        """
+        super().__init__(cache)
+        self.max_in_flight = max_in_flight or int(os.getenv('LLM_MAX_IN_FLIGHT', '256'))
+        # One pooled connection per in-flight call avoids queueing on the pool
+        self.max_connections = max(self.max_connections, self.max_in_flight)
+        # httpcore scans every connection of a pool on each request event, so
+        # the connections are spread over several small pools
+        self.pool_shards = max(1, int(os.getenv('LLM_POOL_SHARDS', '16')))
+        self.in_flight = 0
+        # Sharded pools per backend name
+        self._async_clients: Dict[str, List['httpx.AsyncClient']] = {}
+        self._client_cycles: Dict[str, Iterator['httpx.AsyncClient']] = {}
+        self._semaphore = None
+
+    async def review_code_async(self, code: str, language: str, light: bool = False) -> Dict:
+        """
+        Review code using AI without blocking the event loop
+
+        Args:
+            code: Source code to review
+            language: Programming language
+            light: Whether to ask the light model for a brief review
+
+        Returns:
+            Dictionary containing review results
+        """
+        with stage('prompt'):
+            plan = self._plan_request(code, language, light)
+        if not self.api_key:
+            return self._with_tokens(self._with_cache_status(self._get_mock_review(code, language), "bypass"), plan)
+
+        with stage('cache_lookup'):
+            cache_key, cached = self._lookup_cache(plan, language)
+        if cached is not None:
+            return self._with_tokens(cached, plan)
+
+        if self.single_flight is None:
+            return await self._request_review_async(plan, code, language, cache_key)
+
+        review, _ = await self.single_flight.do_async(
+            self._flight_key(plan, language, cache_key),
+            lambda: self._request_review_async(plan, code, language, cache_key))
+        return copy.deepcopy(review)
+
+    async def _request_review_async(self, plan: Dict, code: str, language: str,
+                                    cache_key: Optional[str]) -> Dict:
+        """Call the API for a review that is neither cached nor in flight"""
+        request = self._chat_request(plan)
+        tried: List[str] = []
+        try:
+            async with llm_call_async():
+                with stage('llm'):
+                    backend, body = await self.resilience.call_async(
+                        lambda timeout: self._post_completion(request, plan, tried, timeout))
+            ai_response = body['choices'][0]['message']['content']
+
+        except Exception as e:
+            print(f"Error calling OpenAI API: {e}")
+            return self._with_tokens(self._with_cache_status(self._get_mock_review(code, language), "bypass"), plan)
+
+        plan = self._served_plan(plan, backend)
+        with stage('parse'):
+            review = self._finish_review(ai_response, code, language, cache_key, plan["model"])
+        usage = body.get('usage') or {}
+        return self._with_tokens(review, plan, usage.get('prompt_tokens'), usage.get('completion_tokens'))
+
+    async def _post_completion(self, request: Dict, plan: Dict, tried: List[str],
+                               timeout: float) -> Tuple[LLMBackend, Dict]:
+        """Send one chat completion request to the backend the router picks and return the decoded body"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        async with self._semaphore:
+            # Picked once a slot is free, so the choice reflects the latest observations
+            backend = self.router.select(plan["tokens"]["estimated_prompt"] + plan["max_tokens"], tried)
+            tried.append(backend.name)
+            client = self._get_async_client(backend)
+            self.in_flight += 1
+            started = time.monotonic()
+            try:
+                response = await client.post('/chat/completions', json=self._backend_request(request, backend, plan["tier"] == "light"),
+                                             timeout=timeout)
+                response.raise_for_status()
+            except BaseException as e:
+                # Cancelled hedges included, so the backend is not left counted as in flight
+                self.router.finish(backend, time.monotonic() - started, e)
+                raise
+            finally:
+                self.in_flight -= 1
+        self.router.finish(backend, time.monotonic() - started)
+        return backend, response.json()
+
+    async def aclose(self) -> None:
+        """Close pooled connections of the async clients"""
+        for clients in self._async_clients.values():
+            for client in clients:
+                await client.aclose()
+        self._async_clients = {}
+        self._client_cycles = {}
+        self._semaphore = None
+
+    def warm_up(self) -> None:
+        """Do the one-time work of a first request ahead of time, including the connection pools"""
+        super().warm_up()
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        for backend in self.router.backends:
+            if backend.api_key:
+                self._get_async_client(backend)
+
+    def _get_async_client(self, backend: Optional[LLMBackend] = None) -> 'httpx.AsyncClient':
+        """Pick the next pooled async client of a backend (the primary by default), creating its pools on first use"""
+        backend = backend or self.router.primary
+        cycle = self._client_cycles.get(backend.name)
+        if cycle is None:
+            import httpx
+            shard_connections = -(-self.max_connections // self.pool_shards)
+            ssl_context = self._ssl_context()
+
+            async def observe(response, backend=backend):
+                self.router.observe_headers(backend, response.headers)
+
+            clients = self._async_clients[backend.name] = [
+                httpx.AsyncClient(
+                    base_url=backend.base_url,
+                    headers={"Authorization": f"Bearer {backend.api_key}"},
+                    timeout=self.timeout,
+                    limits=self._pool_limits(shard_connections),
+                    verify=ssl_context,
+                    event_hooks={'response': [observe]}
+                )
+                for _ in range(self.pool_shards)
+            ]
+            cycle = self._client_cycles[backend.name] = itertools.cycle(clients)
+        return next(cycle)
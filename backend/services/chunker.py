@@ -0,0 +1,214 @@
+"""
+Split large source files into reviewable chunks at definition boundaries
+"""
+
+import re
+from typing import Dict, Iterator, List, Optional, Tuple
+from . import python_analyzer
+
+# Lines that start a function, method, class or similar definition
+_DEFINITION_PATTERNS = {
+    'python': r'(?:async\s+def|def|class)\s',
+    'javascript': r'(?:export\s+)?(?:default\s+)?(?:async\s+)?(?:function\b|class\s)'
+                  r'|(?:export\s+)?(?:const|let|var)\s+\w+\s*=\s*(?:async\s+)?(?:function\b|\([^)]*\)\s*=>|\w+\s*=>)',
+    'typescript': r'(?:export\s+)?(?:default\s+)?(?:declare\s+)?(?:abstract\s+)?(?:async\s+)?'
+                  r'(?:function\b|class\s|interface\s|enum\s|type\s+\w+\s*=)'
+                  r'|(?:export\s+)?(?:const|let|var)\s+\w+\s*(?::[^=]+)?=\s*(?:async\s+)?(?:function\b|\([^)]*\)\s*(?::[^=]+)?=>)',
+    'java': r'(?:(?:public|private|protected|static|final|abstract|synchronized|default)\s+)*'
+            r'(?:class|interface|enum|record|@interface)\s'
+            r'|(?:(?:public|private|protected|static|final|abstract|synchronized)\s+)+[\w<>\[\],.? ]+\s+\w+\s*\(',
+    'cpp': r'(?:template\s*<.*>\s*)?(?:class|struct|namespace|enum)\s'
+           r'|(?:[\w:<>,*&~]+\s+)+[\w:~]+\s*\([^;]*$',
+    'csharp': r'(?:(?:public|private|protected|internal|static|sealed|abstract|partial|async|override|virtual)\s+)*'
+              r'(?:class|struct|interface|enum|record|namespace)\s'
+              r'|(?:(?:public|private|protected|internal|static|async|override|virtual|abstract)\s+)+[\w<>\[\],.? ]+\s+\w+\s*\(',
+    'go': r'(?:func|type)\s',
+    'rust': r'(?:pub(?:\([\w:]+\))?\s+)?(?:async\s+)?(?:unsafe\s+)?(?:fn|struct|enum|trait|impl|mod)\b',
+    'php': r'(?:(?:public|private|protected|static|abstract|final)\s+)*(?:function|class|interface|trait)\s',
+    'ruby': r'(?:def|class|module)\s'
+}
+
+# Lines that belong to the definition below them (decorators, annotations, doc comments)
+_ATTACHED_LINE = re.compile(r'\s*(?:@|#|//|/\*|\*|\[\w)')
+
+# Lines that bring names into scope, kept as shared context for every chunk
+_IMPORT_LINE = re.compile(
+    r'\s*(?:import\s|from\s+\S+\s+import\s|package\s|using\s|use\s|#include\b|require(?:_once)?\b'
+    r'|const\s+\w+\s*=\s*require\(|namespace\s)'
+)
+
+_COMMENT_PREFIX = {'python': '#', 'ruby': '#'}
+
+_compiled_patterns: Dict[str, re.Pattern] = {}
+
+
+def _definition_pattern(language: str) -> re.Pattern:
+    pattern = _compiled_patterns.get(language)
+    if pattern is None:
+        source = _DEFINITION_PATTERNS.get(language, _DEFINITION_PATTERNS['javascript'])
+        # Only top-level definitions and members one level deep are boundaries
+        pattern = re.compile(r'(?:[ ]{0,4}|\t?)(?:' + source + ')')
+        _compiled_patterns[language] = pattern
+    return pattern
+
+
+def _iter_lines(code: str) -> Iterator[Tuple[int, int]]:
+    """Yield (start, end) offsets of every line, end including the newline"""
+    start = 0
+    length = len(code)
+    while start < length:
+        end = code.find('\n', start)
+        end = length if end == -1 else end + 1
+        yield start, end
+        start = end
+
+
+def iter_chunks(code: str, language: str, max_chars: int) -> Iterator[Dict]:
+    """
+    Lazily split code into chunks of at most `max_chars` characters
+
+    A chunk ends before the last definition that fits, keeping decorators and
+    comments attached to it; without one it ends at the last blank line, and
+    only then mid-block. A single line longer than `max_chars` is split.
+    Definitions in Python code that parses come from its syntax tree, so a
+    `def` inside a string is not taken for one.
+
+    Args:
+        code: Source code to split
+        language: Programming language
+        max_chars: Maximum chunk size in characters
+
+    Yields:
+        Dictionaries with index, start_line, end_line (1-based, inclusive) and code
+    """
+    definition = _definition_pattern(language)
+    definition_lines = python_analyzer.definition_starts(code) if language == 'python' else None
+
+    index = 0
+    chunk_start, chunk_line = 0, 1
+    boundary: Optional[Tuple[int, int]] = None
+    blank: Optional[Tuple[int, int]] = None
+    attached: Optional[Tuple[int, int]] = None
+    line_no = 0
+
+    for start, end in _iter_lines(code):
+        line_no += 1
+
+        while end - chunk_start > max_chars:
+            cut = boundary or blank
+            if cut is None or cut[0] <= chunk_start:
+                if start > chunk_start:
+                    cut = (start, line_no)
+                else:
+                    # One line longer than a whole chunk
+                    cut = (chunk_start + max_chars, line_no)
+            yield _make_chunk(code, index, chunk_start, cut[0], chunk_line)
+            index += 1
+            chunk_start, chunk_line = cut
+            boundary = blank = None
+            if attached is not None and attached[0] < chunk_start:
+                attached = None
+
+        line = code[start:end]
+        if line_no in definition_lines if definition_lines is not None else definition.match(line):
+            candidate = attached or (start, line_no)
+            if candidate[0] > chunk_start:
+                boundary = candidate
+            attached = None
+        elif _ATTACHED_LINE.match(line):
+            if attached is None:
+                attached = (start, line_no)
+        else:
+            attached = None
+            if not line.strip() and start > chunk_start:
+                blank = (start, line_no)
+
+    if chunk_start < len(code) or index == 0:
+        yield _make_chunk(code, index, chunk_start, len(code), chunk_line)
+
+
+def definition_spans(code: str, language: str) -> List[Tuple[int, int]]:
+    """
+    Split code into spans that each hold one definition
+
+    Spans start where iter_chunks may cut a chunk: at a definition, with the
+    decorators and comments attached to it. Lines before the first
+    definition form a span of their own.
+
+    Args:
+        code: Source code to split
+        language: Programming language
+
+    Returns:
+        Consecutive (start_line, end_line) spans, 1-based and inclusive, covering every line
+    """
+    definition = _definition_pattern(language)
+    definition_lines = python_analyzer.definition_starts(code) if language == 'python' else None
+
+    starts = [1]
+    attached: Optional[int] = None
+    line_no = 0
+    for start, end in _iter_lines(code):
+        line_no += 1
+        line = code[start:end]
+        if line_no in definition_lines if definition_lines is not None else definition.match(line):
+            candidate = attached or line_no
+            if candidate > starts[-1]:
+                starts.append(candidate)
+            attached = None
+        elif _ATTACHED_LINE.match(line):
+            if attached is None:
+                attached = line_no
+        else:
+            attached = None
+
+    last_line = code.count('\n') + 1
+    return [(start, end - 1) for start, end in zip(starts, starts[1:] + [last_line + 1])]
+
+
+def _make_chunk(code: str, index: int, start: int, end: int, start_line: int) -> Dict:
+    text = code[start:end]
+    # The newline ending the file starts an empty last line, as in code.split('\n')
+    newlines = text.count('\n') if end == len(code) else text.count('\n', 0, len(text) - 1)
+    return {
+        "index": index,
+        "start_line": start_line,
+        "end_line": start_line + newlines,
+        "code": text
+    }
+
+
+def context_header(code: str, language: str, max_chars: int, scan_lines: int = 200) -> str:
+    """
+    Collect import and package lines from the top of a file
+
+    The header is prepended to every chunk after the first so the model
+    knows which names are in scope without seeing the whole file.
+
+    Args:
+        code: Source code of the whole file
+        language: Programming language
+        max_chars: Maximum header size in characters
+        scan_lines: Number of leading lines to scan
+
+    Returns:
+        Header text, empty if there is nothing to add
+    """
+    lines = []
+    size = 0
+    for line_no, (start, end) in enumerate(_iter_lines(code)):
+        if line_no >= scan_lines:
+            break
+        line = code[start:end].rstrip()
+        if _IMPORT_LINE.match(line) and line not in lines:
+            if size + len(line) + 1 > max_chars:
+                break
+            lines.append(line)
+            size += len(line) + 1
+
+    if not lines:
+        return ''
+
+    prefix = _COMMENT_PREFIX.get(language, '//')
+    lines.append(f"{prefix} ... excerpt from a larger file, imports above are for context ...")
+    return '\n'.join(lines) + '\n'
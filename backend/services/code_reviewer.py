@@ -2,37 +2,364 @@
 Code Reviewer Service
 """
 
-from typing import Dict, List
+import asyncio
+import contextvars
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, as_completed, wait
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
 from .ai_service import AIService
+from .findings_store import LOCATED_FIELDS, FindingsStore, finding_line
+from .review_history import ReviewHistory
+from . import chunker
+from . import diffing
+from . import metrics_engine
+from . import review_tiers
+from .review_tiers import TierPolicy
+from .telemetry import REVIEW_TIER_SECONDS, REVIEW_TIERS, stage
 
 class CodeReviewer:
-    def __init__(self, ai_service: AIService):
-        """Initialize code reviewer with AI service"""
+    def __init__(self, ai_service: AIService, findings_store: Optional[FindingsStore] = None,
+                 history: Optional[ReviewHistory] = None):
+        """
+        Initialize code reviewer with AI service
+        
+        Args:
+            ai_service: AI service performing the reviews
+            findings_store: Store of reviewed versions for incremental re-review (optional)
+            history: Store recording every completed review (optional)
+        """
         self.ai_service = ai_service
+        self.findings_store = findings_store
+        self.history = history
+        self.diff_context_lines = int(os.getenv('REVIEW_DIFF_CONTEXT_LINES', '3'))
+        self.max_chunk_chars = int(os.getenv('REVIEW_CHUNK_MAX_CHARS', '8000'))
+        self.chunk_concurrency = int(os.getenv('REVIEW_CHUNK_CONCURRENCY', '4'))
+        self.chunk_context_chars = int(os.getenv('REVIEW_CHUNK_CONTEXT_CHARS', '500'))
+        self.tiers = TierPolicy.from_env()
     
-    def review_code(self, code: str, language: str) -> Dict:
+    def llm_demand(self, code: str, language: str, tier: Optional[str] = None) -> int:
         """
-        Perform comprehensive code review
+        LLM slots a review of the code needs at once, for admission control
+        
+        Metrics-only reviews and whole-file reviews the cache already holds
+        need none. Files longer than max_chunk_chars are not scanned twice;
+        unless the metrics tier was asked for they need one slot per chunk
+        reviewed at once.
         
         Args:
             code: Source code to review
             language: Programming language
+            tier: Tier asked for, as passed to review_code
             
         Returns:
-            Dictionary containing review results
+            Number of slots, 0 when the review makes no LLM call
         """
-        # Get AI review
-        ai_review = self.ai_service.review_code(code, language)
+        if (tier or self.tiers.default_tier) == review_tiers.METRICS:
+            return 0
+        if len(code) > self.max_chunk_chars:
+            return max(1, min(self.chunk_concurrency, -(-len(code) // self.max_chunk_chars)))
         
+        metrics = metrics_engine.with_syntax_metrics(
+            metrics_engine.build_metrics(metrics_engine.scan_code(code, language)), code, language)
+        selected, _ = self.tiers.select(tier, metrics, language)
+        if selected == review_tiers.METRICS:
+            return 0
+        return 0 if self.ai_service.is_cached(code, language, selected == review_tiers.LIGHT) else 1
+    
+    def review_code(self, code: str, language: str, tier: Optional[str] = None) -> Dict:
+        """
+        Perform comprehensive code review
+        
+        Local metrics come first and decide the tier of the review: metrics
+        only, a brief review by the light model or the full review.
+        
+        Args:
+            code: Source code to review
+            language: Programming language
+            tier: "metrics", "light", "full", or "auto" to decide from the metrics (defaults to REVIEW_DEFAULT_TIER)
+            
+        Returns:
+            Dictionary containing review results and the "tier" chosen
+        """
+        started = time.perf_counter()
         # Get code metrics
-        metrics = self.analyze_code_metrics(code, language)
+        with stage('metrics'):
+            counts = metrics_engine.scan_code(code, language)
+            metrics = metrics_engine.with_syntax_metrics(metrics_engine.build_metrics(counts), code, language)
+        selected, reason = self.tiers.select(tier, metrics, language)
+        
+        ai_started = time.perf_counter()
+        # Get AI review, chunk by chunk for large files
+        with stage('ai_review'):
+            if selected == review_tiers.METRICS:
+                ai_review = review_tiers.metrics_review(metrics, language)
+                chunk_reviews = []
+            elif len(code) > self.max_chunk_chars:
+                header = chunker.context_header(code, language, self.chunk_context_chars)
+                chunk_reviews = self._review_regions(
+                    chunker.iter_chunks(code, language, self.max_chunk_chars), language, header,
+                    selected == review_tiers.LIGHT)
+                ai_review = self._merge_chunk_reviews(chunk_reviews)
+            else:
+                ai_review = self.ai_service.review_code(code, language, selected == review_tiers.LIGHT)
+                chunk_reviews = [({"start_line": 1, "end_line": code.count('\n') + 1, "characters": len(code)}, ai_review)]
+        
+        reviewed = time.perf_counter()
+        
+        # A metrics-only review has no findings for a later diff review to reuse
+        if selected != review_tiers.METRICS:
+            self._remember(code, language, chunk_reviews, counts)
         
         # Combine results
-        return {
-            "ai_review": ai_review,
-            "metrics": metrics,
-            "summary": self._create_summary(ai_review, metrics)
+        result = self._combine_results(ai_review, metrics)
+        self._finish_tier(result, tier, selected, reason, started)
+        self._record(code, language, result, 'review', started, reviewed - ai_started)
+        return result
+    
+    def review_diff(self, base_code: str, code: str, language: str) -> Dict:
+        """
+        Re-review only the parts of a file that changed since a previous version
+        
+        Changed hunks plus a few lines of context are sent to the AI. Findings
+        of regions and definitions the diff leaves untouched are reused from
+        the stored review of the base version; every other line is reviewed
+        again, so without a stored base the whole file is. Metrics are derived
+        from the base version's counters and the changed lines.
+        
+        Args:
+            base_code: Previously reviewed version of the file
+            code: New version of the file
+            language: Programming language
+            
+        Returns:
+            Dictionary containing review results and a "diff" summary
+        """
+        started = time.perf_counter()
+        base_lines = base_code.split('\n')
+        new_lines = code.split('\n')
+        with stage('diff'):
+            opcodes = diffing.diff_opcodes(base_lines, new_lines)
+        
+        base_entry = None
+        if self.findings_store is not None:
+            base_entry = self.findings_store.get(FindingsStore.make_key(base_code, language))
+        
+        # Metrics from the base counters and the changed lines only
+        with stage('metrics'):
+            counts = None
+            if base_entry is not None and base_entry['counts'] is not None:
+                counts = metrics_engine.update_counts(base_entry['counts'], base_lines, new_lines, opcodes, language)
+            if counts is not None:
+                metrics_mode = "incremental"
+            else:
+                # No base counters, or the change touches a comment or literal spanning lines
+                counts = metrics_engine.scan_code(code, language)
+                metrics_mode = "full"
+            # The syntax tree is not incremental; it is parsed from the new version
+            metrics = metrics_engine.with_syntax_metrics(metrics_engine.build_metrics(counts), code, language)
+        
+        # Reuse findings of untouched regions, review the changed hunks and every line not reused
+        reused = diffing.remap_regions(base_entry['regions'], opcodes) if base_entry is not None else []
+        hunks = diffing.changed_hunks(opcodes, len(new_lines), self.diff_context_lines)
+        review_ranges = diffing.review_ranges(hunks, reused, len(new_lines))
+        header = chunker.context_header(code, language, self.chunk_context_chars)
+        ai_started = time.perf_counter()
+        with stage('ai_review'):
+            reviewed = self._review_regions(self._hunk_regions(new_lines, review_ranges, language), language, header)
+        ai_finished = time.perf_counter()
+        
+        region_reviews = [
+            ({"start_line": region['start_line'], "end_line": region['end_line'],
+              "characters": region['characters'], "score": region.get('score'), "reused": True}, region)
+            for region in reused
+        ]
+        region_reviews += [(dict(info, reused=False), review) for info, review in reviewed]
+        region_reviews.sort(key=lambda item: item[0]['start_line'])
+        
+        ai_review = self._merge_chunk_reviews(region_reviews)
+        ai_review["regions"] = ai_review.pop("chunks")
+        
+        self._remember(code, language, region_reviews, counts)
+        
+        result = self._combine_results(ai_review, metrics)
+        result["diff"] = {
+            "base_found": base_entry is not None,
+            "changed_hunks": len(hunks),
+            "reviewed_lines": sum(end - start for start, end in review_ranges),
+            "reused_regions": len(reused),
+            "unreviewed_lines": len(new_lines) - self._covered_lines(region_reviews),
+            "metrics_mode": metrics_mode
         }
+        self._record(code, language, result, 'diff', started, ai_finished - ai_started)
+        return result
+    
+    async def review_code_async(self, code: str, language: str, tier: Optional[str] = None) -> Dict:
+        """
+        Perform comprehensive code review with an async AI service
+        
+        Args:
+            code: Source code to review
+            language: Programming language
+            tier: Tier of the review, as for review_code
+            
+        Returns:
+            Dictionary containing review results and the "tier" chosen
+        """
+        started = time.perf_counter()
+        with stage('metrics'):
+            counts = metrics_engine.scan_code(code, language)
+            metrics = metrics_engine.with_syntax_metrics(metrics_engine.build_metrics(counts), code, language)
+        selected, reason = self.tiers.select(tier, metrics, language)
+        ai_started = time.perf_counter()
+        with stage('ai_review'):
+            if selected == review_tiers.METRICS:
+                ai_review = review_tiers.metrics_review(metrics, language)
+                chunk_reviews = []
+            elif len(code) > self.max_chunk_chars:
+                header = chunker.context_header(code, language, self.chunk_context_chars)
+                chunk_reviews = await self._review_regions_async(
+                    chunker.iter_chunks(code, language, self.max_chunk_chars), language, header,
+                    selected == review_tiers.LIGHT)
+                ai_review = self._merge_chunk_reviews(chunk_reviews)
+            else:
+                ai_review = await self.ai_service.review_code_async(code, language, selected == review_tiers.LIGHT)
+                chunk_reviews = [({"start_line": 1, "end_line": code.count('\n') + 1, "characters": len(code)}, ai_review)]
+        reviewed = time.perf_counter()
+        
+        if selected != review_tiers.METRICS:
+            self._remember(code, language, chunk_reviews, counts)
+        
+        result = self._combine_results(ai_review, metrics)
+        self._finish_tier(result, tier, selected, reason, started)
+        self._record(code, language, result, 'review', started, reviewed - ai_started)
+        return result
+    
+    def review_code_stream(self, code: str, language: str, tier: Optional[str] = None) -> Iterator[Tuple[str, Any]]:
+        """
+        Perform code review and yield partial results as they become available
+        
+        Args:
+            code: Source code to review
+            language: Programming language
+            tier: "metrics", "light", "full", or "auto" to decide from the metrics (defaults to REVIEW_DEFAULT_TIER)
+            
+        Yields:
+            ("metrics", metrics) first, then the "token" and "field" events of
+            AIService.stream_review, and finally ("done", result) with the
+            same dictionary review_code returns; a metrics-only review, and
+            a file longer than max_chunk_chars, reviewed in chunks that are
+            not streamed, have no events in between
+        """
+        started = time.perf_counter()
+        # Local metrics are ready long before the model's first token
+        metrics = self.analyze_code_metrics(code, language)
+        yield "metrics", metrics
+        selected, reason = self.tiers.select(tier, metrics, language)
+        
+        if selected == review_tiers.METRICS:
+            result = self._combine_results(review_tiers.metrics_review(metrics, language), metrics)
+            self._finish_tier(result, tier, selected, reason, started)
+            self._record(code, language, result, 'stream', started)
+            yield "done", result
+            return
+        
+        if len(code) > self.max_chunk_chars:
+            ai_started = time.perf_counter()
+            with stage('ai_review'):
+                header = chunker.context_header(code, language, self.chunk_context_chars)
+                chunk_reviews = self._review_regions(
+                    chunker.iter_chunks(code, language, self.max_chunk_chars), language, header,
+                    selected == review_tiers.LIGHT)
+                ai_review = self._merge_chunk_reviews(chunk_reviews)
+            reviewed = time.perf_counter()
+            self._remember(code, language, chunk_reviews, None)
+            result = self._combine_results(ai_review, metrics)
+            self._finish_tier(result, tier, selected, reason, started)
+            self._record(code, language, result, 'stream', started, reviewed - ai_started)
+            yield "done", result
+            return
+        
+        for event, data in self.ai_service.stream_review(code, language, selected == review_tiers.LIGHT):
+            if event == "review":
+                result = self._combine_results(data, metrics)
+                self._finish_tier(result, tier, selected, reason, started)
+                self._record(code, language, result, 'stream', started)
+                yield "done", result
+            else:
+                yield event, data
+    
+    def review_batch(self, items: List[Dict], max_workers: int = 4) -> List[Dict]:
+        """
+        Review several code items concurrently on a bounded worker pool
+        
+        Args:
+            items: List of dictionaries with id, code, language and optionally tier
+            max_workers: Maximum number of reviews running at once
+            
+        Returns:
+            List of per-item results in input order; a failing item is
+            reported in its own result instead of failing the batch
+        """
+        if not items:
+            return []
+        
+        results: List[Dict] = [{} for _ in items]
+        workers = max(1, min(max_workers, len(items)))
+        
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='review-batch') as executor:
+            # Each item runs in a copy of the caller's context so its stages reach the caller's timings
+            futures = {
+                executor.submit(contextvars.copy_context().run, self.review_code, item['code'], item['language'],
+                                item.get('tier')): index
+                for index, item in enumerate(items)
+            }
+            
+            for future in as_completed(futures):
+                index = futures[future]
+                item_id = items[index].get('id', index)
+                try:
+                    results[index] = {"id": item_id, "success": True, "data": future.result()}
+                except Exception as e:
+                    results[index] = {"id": item_id, "success": False, "error": str(e)}
+        
+        return results
+    
+    def review_files(self, files: Iterator[Dict], tier: Optional[str] = None,
+                     max_workers: int = 4) -> Iterator[Dict]:
+        """
+        Review files as they arrive and yield each result as soon as it is ready
+        
+        Files are consumed lazily and at most max_workers of them are in
+        flight, so memory stays bounded however many files there are.
+        
+        Args:
+            files: Dictionaries with path, language and code; entries without
+                code (skipped or failed files) are passed through unchanged
+            tier: Review tier of every file (optional)
+            max_workers: Maximum number of reviews running at once
+        
+        Yields:
+            Per-file results with path, success and data or error, in the
+            order they finish; passed-through entries as they arrive
+        """
+        pending: Dict[Future, str] = {}
+        
+        with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix='review-files') as executor:
+            for file in files:
+                if 'code' not in file:
+                    yield file
+                    continue
+                if len(pending) >= max_workers:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield self._collect_file(pending.pop(future), future)
+                
+                pending[executor.submit(contextvars.copy_context().run, self.review_code, file['code'],
+                                        file['language'], tier)] = file['path']
+            
+            for future in as_completed(pending):
+                yield self._collect_file(pending[future], future)
     
     def analyze_code_metrics(self, code: str, language: str) -> Dict:
         """
@@ -45,87 +372,260 @@ class CodeReviewer:
         Returns:
             Dictionary containing code metrics
         """
-        lines = code.split('\n')
-        non_empty_lines = [line for line in lines if line.strip()]
-        
-        # Basic metrics
-        metrics = {
-            "total_lines": len(lines),
-            "code_lines": len(non_empty_lines),
-            "comment_lines": len([line for line in lines if line.strip().startswith('#') or line.strip().startswith('//')]),
-            "blank_lines": len([line for line in lines if not line.strip()]),
-            "characters": len(code),
-            "words": len(code.split())
-        }
+        with stage('metrics'):
+            return metrics_engine.analyze(code, language)
+    
+    def _review_regions(self, regions: Iterator[Dict], language: str, header: str,
+                        light: bool = False) -> List[Tuple[Dict, Optional[Dict]]]:
+        """
+        Review code regions in parallel
         
-        # Language-specific analysis
-        if language == 'python':
-            metrics.update(self._analyze_python_code(code))
-        elif language in ['javascript', 'typescript']:
-            metrics.update(self._analyze_js_code(code))
-        elif language == 'java':
-            metrics.update(self._analyze_java_code(code))
-        else:
-            metrics.update(self._analyze_generic_code(code))
+        Regions are consumed lazily and at most chunk_concurrency of them are
+        in flight, so memory stays bounded however large the file is.
+        
+        Args:
+            regions: Regions with index, start_line, end_line and code
+            language: Programming language
+            header: Import context prepended to regions not starting at line 1
+            light: Whether the regions get brief reviews by the light model
+            
+        Returns:
+            List of (region info, review) ordered by start line; review is None
+            for regions whose review failed
+        """
+        chunk_reviews: List[Tuple[Dict, Optional[Dict]]] = []
+        pending: Dict[Future, Dict] = {}
         
-        # Complexity analysis
-        complexity = self.ai_service.analyze_complexity(code, language)
-        metrics.update(complexity)
+        with ThreadPoolExecutor(max_workers=self.chunk_concurrency, thread_name_prefix='review-chunk') as executor:
+            for chunk in regions:
+                if len(pending) >= self.chunk_concurrency:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        chunk_reviews.append(self._collect_chunk(pending.pop(future), future, header))
+                
+                # A region starting at line 1 already has the file's imports
+                text = chunk['code'] if chunk['start_line'] == 1 else header + chunk['code']
+                info = {
+                    "index": chunk['index'],
+                    "start_line": chunk['start_line'],
+                    "end_line": chunk['end_line'],
+                    "characters": len(chunk['code'])
+                }
+                pending[executor.submit(contextvars.copy_context().run,
+                                        self.ai_service.review_code, text, language, light)] = info
+            
+            for future in as_completed(pending):
+                chunk_reviews.append(self._collect_chunk(pending[future], future, header))
         
-        return metrics
+        chunk_reviews.sort(key=lambda item: item[0]['start_line'])
+        return chunk_reviews
     
-    def _analyze_python_code(self, code: str) -> Dict:
-        """Analyze Python-specific metrics"""
-        return {
-            "functions": code.count('def '),
-            "classes": code.count('class '),
-            "imports": code.count('import ') + code.count('from '),
-            "docstrings": code.count('"""') // 2 + code.count("'''") // 2,
-            "type_hints": code.count(': ') - code.count('def ') - code.count('class '),
-            "exceptions": code.count('except ') + code.count('raise '),
-            "async_functions": code.count('async def '),
-            "list_comprehensions": code.count('[') - code.count(']') + code.count('for ') // 2
-        }
+    async def _review_regions_async(self, regions: Iterator[Dict], language: str, header: str,
+                                    light: bool = False) -> List[Tuple[Dict, Optional[Dict]]]:
+        """
+        Review code regions concurrently with the async AI service
+        
+        Like _review_regions, regions are consumed lazily and at most
+        chunk_concurrency of them are in flight.
+        
+        Args:
+            regions: Regions with index, start_line, end_line and code
+            language: Programming language
+            header: Import context prepended to regions not starting at line 1
+            light: Whether the regions get brief reviews by the light model
+            
+        Returns:
+            List of (region info, review) ordered by start line; review is None
+            for regions whose review failed
+        """
+        chunk_reviews: List[Tuple[Dict, Optional[Dict]]] = []
+        pending: Dict[asyncio.Task, Dict] = {}
+        
+        for chunk in regions:
+            if len(pending) >= self.chunk_concurrency:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    chunk_reviews.append(self._collect_chunk(pending.pop(task), task, header))
+            
+            text = chunk['code'] if chunk['start_line'] == 1 else header + chunk['code']
+            info = {
+                "index": chunk['index'],
+                "start_line": chunk['start_line'],
+                "end_line": chunk['end_line'],
+                "characters": len(chunk['code'])
+            }
+            pending[asyncio.ensure_future(self.ai_service.review_code_async(text, language, light))] = info
+        
+        if pending:
+            await asyncio.wait(pending)
+        for task, info in pending.items():
+            chunk_reviews.append(self._collect_chunk(info, task, header))
+        
+        chunk_reviews.sort(key=lambda item: item[0]['start_line'])
+        return chunk_reviews
     
-    def _analyze_js_code(self, code: str) -> Dict:
-        """Analyze JavaScript/TypeScript-specific metrics"""
-        return {
-            "functions": code.count('function ') + code.count('=>'),
-            "classes": code.count('class '),
-            "imports": code.count('import ') + code.count('require('),
-            "exports": code.count('export '),
-            "const_declarations": code.count('const '),
-            "let_declarations": code.count('let '),
-            "var_declarations": code.count('var '),
-            "async_functions": code.count('async '),
-            "arrow_functions": code.count('=>'),
-            "template_literals": code.count('`')
-        }
+    def _hunk_regions(self, lines: List[str], hunks: List[Tuple[int, int]], language: str) -> Iterator[Dict]:
+        """Turn line ranges into review regions, splitting ranges larger than a chunk"""
+        index = 0
+        for start, end in hunks:
+            text = '\n'.join(lines[start:end])
+            for chunk in chunker.iter_chunks(text, language, self.max_chunk_chars):
+                chunk['index'] = index
+                chunk['start_line'] += start
+                chunk['end_line'] += start
+                index += 1
+                yield chunk
+    
+    def _remember(self, code: str, language: str, chunk_reviews: List[Tuple[Dict, Optional[Dict]]],
+                  counts: Optional[Dict]) -> None:
+        """Store the findings and metric counters of a reviewed version"""
+        if self.findings_store is None:
+            return
+        
+        lines = code.split('\n')
+        spans = chunker.definition_spans(code, language)
+        regions = []
+        for info, review in chunk_reviews:
+            # Fallback reviews carry no findings worth reusing
+            if review is None or review.get('fallback') or review.get('cache', {}).get('status') == 'bypass':
+                continue
+            parts = []
+            for span_start, span_end in spans:
+                start, end = max(span_start, info['start_line']), min(span_end, info['end_line'])
+                if start <= end:
+                    parts.append((start, end, sum(len(line) + 1 for line in lines[start - 1:end])))
+            regions.append(FindingsStore.make_region(
+                info['start_line'], info['end_line'], info['characters'], review, parts))
+        
+        self.findings_store.put(FindingsStore.make_key(code, language), regions, counts)
     
-    def _analyze_java_code(self, code: str) -> Dict:
-        """Analyze Java-specific metrics"""
+    def _finish_tier(self, result: Dict, requested: Optional[str], selected: str, reason: str,
+                     started: float) -> None:
+        """Add the tier to a review result and count the review and its duration under it"""
+        requested = requested or self.tiers.default_tier
+        result["tier"] = {"requested": requested, "selected": selected, "reason": reason}
+        duration = time.perf_counter() - started
+        self.tiers.record(selected, duration)
+        REVIEW_TIERS.inc(requested=requested, tier=selected)
+        REVIEW_TIER_SECONDS.observe(duration, tier=selected)
+    
+    def _record(self, code: str, language: str, result: Dict, kind: str, started: float,
+                ai_seconds: Optional[float] = None) -> None:
+        """Record a finished review in the history, split into AI and local time when known"""
+        if self.history is None:
+            return
+        duration = time.perf_counter() - started
+        timings = None
+        if ai_seconds is not None:
+            timings = {"ai_review": round(ai_seconds * 1000, 3), "local": round((duration - ai_seconds) * 1000, 3)}
+        self.history.record(code, language, result, kind, duration, timings)
+    
+    @staticmethod
+    def _covered_lines(chunk_reviews: List[Tuple[Dict, Optional[Dict]]]) -> int:
+        """Count the lines covered by at least one reviewed region"""
+        covered = 0
+        last_end = 0
+        for info, review in chunk_reviews:
+            if review is None:
+                continue
+            start = max(info['start_line'], last_end + 1)
+            if info['end_line'] >= start:
+                covered += info['end_line'] - start + 1
+            last_end = max(last_end, info['end_line'])
+        return covered
+    
+    def _collect_chunk(self, info: Dict, future: Union[Future, 'asyncio.Task'],
+                       header: str = '') -> Tuple[Dict, Optional[Dict]]:
+        """Get the review of a chunk, recording errors instead of raising"""
+        try:
+            review = future.result()
+        except Exception as e:
+            info["error"] = str(e)
+            return info, None
+        
+        # The raw model output of every chunk would grow with the file
+        review.pop('ai_response', None)
+        # Findings name lines of the text sent: the chunk, after the header unless it starts the file
+        offset = info['start_line'] - 1
+        if info['start_line'] != 1:
+            offset -= header.count('\n')
+        if offset:
+            for name in LOCATED_FIELDS:
+                if isinstance(review.get(name), list):
+                    review[name] = [diffing.shift_finding(item, offset) for item in review[name]]
+        info["score"] = review.get('score')
+        if 'cache' in review:
+            info["cache"] = review['cache']['status']
+        if review.get('fallback'):
+            info["fallback"] = True
+        return info, review
+    
+    def _collect_file(self, path: str, future: Future) -> Dict:
+        """Get the review of an uploaded file, reporting errors instead of raising"""
+        try:
+            result = future.result()
+        except Exception as e:
+            return {"path": path, "success": False, "error": str(e)}
+        return {"path": path, "success": True, "data": result}
+    
+    def _merge_chunk_reviews(self, chunk_reviews: List[Tuple[Dict, Optional[Dict]]]) -> Dict:
+        """Merge per-chunk reviews into a single review of the whole file"""
+        merged: Dict[str, List] = {"issues": [], "security": [], "best_practices": [], "improvements": []}
+        seen: Dict[str, set] = {key: set() for key in merged}
+        assessments = []
+        performance = []
+        weighted_score = 0.0
+        total_weight = 0
+        tokens: Dict[str, int] = {}
+        
+        for info, review in chunk_reviews:
+            if review is None:
+                continue
+            
+            label = f"Lines {info['start_line']}-{info['end_line']}"
+            
+            for name, count in review.get('tokens', {}).items():
+                if count is not None:
+                    tokens[name] = tokens.get(name, 0) + count
+            
+            score = review.get('score')
+            if isinstance(score, (int, float)):
+                weighted_score += score * info['characters']
+                total_weight += info['characters']
+            
+            for key in merged:
+                for item in review.get(key, []):
+                    marker = str(item)
+                    if marker in seen[key]:
+                        continue
+                    seen[key].add(marker)
+                    if key in LOCATED_FIELDS and finding_line(item) is None:
+                        item = f"{label}: {item}"
+                    merged[key].append(item)
+            
+            if review.get('quality_assessment'):
+                assessments.append(f"{label}: {review['quality_assessment']}")
+            if review.get('performance'):
+                performance.append(f"{label}: {review['performance']}")
+        
         return {
-            "methods": code.count('public ') + code.count('private ') + code.count('protected '),
-            "classes": code.count('class '),
-            "interfaces": code.count('interface '),
-            "imports": code.count('import '),
-            "packages": code.count('package '),
-            "annotations": code.count('@'),
-            "try_blocks": code.count('try {'),
-            "catch_blocks": code.count('catch '),
-            "finally_blocks": code.count('finally {'),
-            "static_methods": code.count('static ')
+            "score": round(weighted_score / total_weight, 1) if total_weight else 5,
+            "quality_assessment": "\n".join(assessments),
+            "issues": merged["issues"],
+            "performance": "\n".join(performance),
+            "security": merged["security"],
+            "best_practices": merged["best_practices"],
+            "improvements": merged["improvements"],
+            "tokens": tokens,
+            "chunks": [info for info, _ in chunk_reviews]
         }
     
-    def _analyze_generic_code(self, code: str) -> Dict:
-        """Analyze generic code metrics"""
+    def _combine_results(self, ai_review: Dict, metrics: Dict) -> Dict:
+        """Combine AI review and metrics into a review result"""
         return {
-            "functions": code.count('function ') + code.count('def ') + code.count('func '),
-            "classes": code.count('class '),
-            "comments": code.count('//') + code.count('/*') + code.count('#'),
-            "strings": code.count('"') // 2 + code.count("'") // 2,
-            "numbers": len([word for word in code.split() if word.replace('.', '').replace('-', '').isdigit()]),
-            "variables": code.count('var ') + code.count('let ') + code.count('const ') + code.count('int ') + code.count('string ')
+            "ai_review": ai_review,
+            "metrics": metrics,
+            "summary": self._create_summary(ai_review, metrics)
         }
     
     def _create_summary(self, ai_review: Dict, metrics: Dict) -> Dict:
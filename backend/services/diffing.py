@@ -0,0 +1,215 @@
+"""
+Line diff helpers for incremental re-review
+"""
+
+import difflib
+import re
+from typing import Any, Dict, List, Optional, Tuple
+from .findings_store import LOCATED_FIELDS, finding_line
+
+_HUNK_HEADER = re.compile(r'@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@')
+
+Opcode = Tuple[str, int, int, int, int]
+
+# Line numbers of a "Line 12:" or "Lines 12-14:" tag
+_LINE_TAG = re.compile(r'(\s*\[?lines?\s+)(\d+)(?:(\s*-\s*)(\d+))?', re.IGNORECASE)
+
+
+def diff_opcodes(base_lines: List[str], new_lines: List[str]) -> List[Opcode]:
+    """Compute difflib opcodes turning base_lines into new_lines"""
+    return difflib.SequenceMatcher(None, base_lines, new_lines, autojunk=False).get_opcodes()
+
+
+def changed_hunks(opcodes: List[Opcode], new_line_count: int, context: int) -> List[Tuple[int, int]]:
+    """
+    Group changes into hunks of the new version with surrounding context
+    
+    Args:
+        opcodes: Opcodes from diff_opcodes
+        new_line_count: Number of lines in the new version
+        context: Unchanged lines kept around every change
+    
+    Returns:
+        Sorted, non-overlapping 0-based [start, end) line ranges of the new version
+    """
+    hunks: List[Tuple[int, int]] = []
+    for tag, _, _, j1, j2 in opcodes:
+        if tag == 'equal':
+            continue
+        # A pure deletion still gets its surrounding lines reviewed
+        start = max(0, j1 - context)
+        end = min(new_line_count, max(j2, j1 + 1) + context)
+        if hunks and start <= hunks[-1][1]:
+            hunks[-1] = (hunks[-1][0], max(hunks[-1][1], end))
+        else:
+            hunks.append((start, end))
+    return hunks
+
+
+def review_ranges(hunks: List[Tuple[int, int]], reused: List[Dict], line_count: int) -> List[Tuple[int, int]]:
+    """
+    Line ranges of the new version that need a review
+    
+    Args:
+        hunks: Changed hunks from changed_hunks
+        reused: Regions from remap_regions
+        line_count: Number of lines in the new version
+    
+    Returns:
+        Sorted, non-overlapping 0-based [start, end) ranges: the hunks and every line no reused region covers
+    """
+    ranges = list(hunks)
+    covered = 0
+    for region in sorted(reused, key=lambda region: region['start_line']):
+        if region['start_line'] - 1 > covered:
+            ranges.append((covered, region['start_line'] - 1))
+        covered = max(covered, region['end_line'])
+    if covered < line_count:
+        ranges.append((covered, line_count))
+    
+    merged: List[Tuple[int, int]] = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def remap_regions(regions: List[Dict], opcodes: List[Opcode]) -> List[Dict]:
+    """
+    Carry reviewed regions of the base version over to the new version
+    
+    A region is reused only when it lies entirely inside one unchanged block;
+    its line numbers are shifted to where that block sits in the new version.
+    Of a region the change touches, the definition parts it keeps in "parts"
+    that lie inside an unchanged block are reused instead, each with the
+    findings naming its lines.
+    
+    Args:
+        regions: Regions with 1-based inclusive start_line and end_line
+        opcodes: Opcodes from diff_opcodes
+    
+    Returns:
+        Copies of the untouched regions and parts with updated line numbers
+    """
+    equal_blocks = [(i1, i2, j1 - i1) for tag, i1, i2, j1, _ in opcodes if tag == 'equal']
+    
+    def shift_of(region: Dict) -> Optional[int]:
+        for i1, i2, shift in equal_blocks:
+            if i1 <= region['start_line'] - 1 and region['end_line'] <= i2:
+                return shift
+        return None
+    
+    reused = []
+    for region in regions:
+        shift = shift_of(region)
+        if shift is not None:
+            reused.append(_shifted(region, shift))
+            continue
+        for part in region.get('parts', []):
+            shift = shift_of(part)
+            if shift is not None:
+                reused.append(_shifted(part, shift))
+    return reused
+
+
+def _shifted(region: Dict, shift: int) -> Dict:
+    """Copy of a region moved by `shift` lines, with its parts and line-tagged findings"""
+    moved = dict(region, start_line=region['start_line'] + shift, end_line=region['end_line'] + shift)
+    if shift:
+        for name in LOCATED_FIELDS:
+            if name in moved:
+                moved[name] = [shift_finding(item, shift) for item in moved[name]]
+        if 'parts' in moved:
+            moved['parts'] = [_shifted(part, shift) for part in moved['parts']]
+    return moved
+
+
+def shift_finding(finding: Any, shift: int) -> Any:
+    """Renumber the lines a finding starts with, e.g. "Line 3: ..." to "Line 5: ..." for a shift of 2"""
+    if finding_line(finding) is None:
+        return finding
+    match = _LINE_TAG.match(finding)
+    tag = match.group(1) + str(int(match.group(2)) + shift)
+    if match.group(4):
+        tag += match.group(3) + str(int(match.group(4)) + shift)
+    return tag + finding[match.end():]
+
+
+def _split_lines(text: str) -> List[str]:
+    """
+    Split text into lines at newlines only, as the diff format counts them
+    
+    Unlike str.splitlines(), form feeds, vertical tabs, file and group
+    separators, NEL and the Unicode line and paragraph separators stay
+    inside their line.
+    """
+    lines = [line + '\n' for line in text.split('\n')]
+    lines[-1] = lines[-1][:-1]
+    return lines if lines[-1] else lines[:-1]
+
+
+def apply_unified_diff(base: str, diff: str) -> str:
+    """
+    Apply a unified diff to the base version
+    
+    Args:
+        base: Base version of the file
+        diff: Unified diff against the base version
+    
+    Returns:
+        The new version of the file
+    
+    Raises:
+        ValueError: If the diff is malformed or does not match the base
+    """
+    base_lines = _split_lines(base)
+    result: List[str] = []
+    pos = 0
+    in_hunk = False
+    last_added = False
+    
+    for line in _split_lines(diff):
+        line = line.rstrip('\n')
+        if line.endswith('\r'):
+            line = line[:-1]
+        header = _HUNK_HEADER.match(line)
+        if header:
+            old_start = int(header.group(1))
+            old_count = 1 if header.group(2) is None else int(header.group(2))
+            # A hunk that only inserts names the line after which it inserts
+            target = old_start if old_count == 0 else old_start - 1
+            if target < pos or target > len(base_lines):
+                raise ValueError("Diff hunks are out of order or beyond the base code")
+            result.extend(base_lines[pos:target])
+            pos = target
+            in_hunk = True
+            continue
+        
+        if not in_hunk:
+            # File headers and other preamble
+            continue
+        
+        if line.startswith('\\'):
+            # "\ No newline at end of file" refers to the previous line
+            if last_added and result:
+                result[-1] = result[-1].rstrip('\n')
+            continue
+        
+        marker, text = line[:1], line[1:]
+        if marker in (' ', '-', ''):
+            if pos >= len(base_lines) or base_lines[pos].rstrip('\r\n') != text:
+                raise ValueError(f"Diff does not apply to base code at line {pos + 1}")
+            if marker != '-':
+                result.append(base_lines[pos])
+            pos += 1
+            last_added = False
+        elif marker == '+':
+            result.append(text + '\n')
+            last_added = True
+        else:
+            raise ValueError(f"Malformed diff line: {line[:40]}")
+    
+    result.extend(base_lines[pos:])
+    return ''.join(result)
@@ -0,0 +1,116 @@
+"""
+Store of per-region review findings for incremental re-review
+"""
+
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+# Review fields kept for every region
+REGION_FIELDS = ("score", "quality_assessment", "issues", "performance",
+                 "security", "best_practices", "improvements")
+
+# Review fields whose entries point at a line of the file
+LOCATED_FIELDS = ("issues", "security", "improvements")
+
+# "Line 12: ..." or "Lines 12-14: ..." at the start of a finding
+_LINE_TAG = re.compile(r'\s*\[?lines?\s+(\d+)', re.IGNORECASE)
+
+
+def finding_line(finding: Any) -> Optional[int]:
+    """Line number a finding starts with, None if it names no line"""
+    match = _LINE_TAG.match(finding) if isinstance(finding, str) else None
+    return int(match.group(1)) if match else None
+
+
+class FindingsStore:
+    def __init__(self, max_entries: int = 256):
+        """
+        Initialize the findings store
+
+        Each entry describes one reviewed version of a file: the reviewed
+        line regions with their findings, and the raw metric counters so the
+        next version's metrics can be derived from the diff alone.
+
+        Args:
+            max_entries: Maximum number of file versions kept (LRU)
+        """
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> 'FindingsStore':
+        """Build a store from environment variables"""
+        return cls(max_entries=int(os.getenv('REVIEW_FINDINGS_MAX_ENTRIES', '256')))
+
+    @staticmethod
+    def make_key(code: str, language: str) -> str:
+        """Content hash identifying a version of a file"""
+        digest = hashlib.sha256(language.encode('utf-8'))
+        digest.update(b'\0')
+        digest.update(code.encode('utf-8'))
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Get the stored entry of a file version"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: str, regions: Optional[List[Dict]], counts: Optional[Dict]) -> None:
+        """
+        Store the findings and counters of a file version
+
+        Args:
+            key: Key from make_key
+            regions: Reviewed regions, None to keep previously stored regions
+            counts: Raw metric counters from metrics_engine.scan_code
+        """
+        with self._lock:
+            entry = self._entries.pop(key, {"regions": [], "counts": None})
+            if regions is not None:
+                entry["regions"] = regions
+            if counts is not None:
+                entry["counts"] = counts
+            self._entries[key] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    @staticmethod
+    def make_region(start_line: int, end_line: int, characters: int, review: Dict,
+                    parts: Optional[List[Tuple[int, int, int]]] = None) -> Dict:
+        """
+        Build a region entry from a review of those lines
+
+        A region spanning several definitions also keeps one part per
+        definition with the findings that name one of its lines, so the
+        findings of definitions a later change leaves untouched can be reused
+        on their own.
+
+        Args:
+            start_line: First line of the region (1-based)
+            end_line: Last line of the region (inclusive)
+            characters: Size of the region in characters
+            review: Review of the region
+            parts: (start_line, end_line, characters) of every definition in the region (optional)
+
+        Returns:
+            Region entry
+        """
+        region = {"start_line": start_line, "end_line": end_line, "characters": characters}
+        region.update({name: review[name] for name in REGION_FIELDS if name in review})
+        if parts and len(parts) > 1:
+            region["parts"] = []
+            for start, end, size in parts:
+                part = {"start_line": start, "end_line": end, "characters": size, "score": review.get('score')}
+                for name in LOCATED_FIELDS:
+                    part[name] = [item for item in review.get(name) or []
+                                  if start <= (finding_line(item) or 0) <= end]
+                region["parts"].append(part)
+        return region
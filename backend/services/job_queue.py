@@ -0,0 +1,180 @@
+"""
+Background review jobs on a bounded worker pool
+"""
+
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+# Job states; finished jobs are kept until their TTL expires
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while the queue is at its depth limit"""
+
+
+class _Job:
+    def __init__(self, payload: Dict[str, Any]):
+        self.id = uuid.uuid4().hex
+        self.payload = payload
+        self.status = QUEUED
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.done = threading.Event()
+
+
+class JobQueue:
+    def __init__(self, handler: Callable[[Dict[str, Any]], Dict[str, Any]], workers: int = 4,
+                 max_queued: int = 100, ttl: float = 3600, max_jobs: int = 1000):
+        """
+        Initialize the job queue
+
+        Submitting only records the job and hands it to the pool, so the
+        request thread returns at once; clients poll or long-poll for the
+        result.
+
+        Args:
+            handler: Function turning a job payload into its result
+            workers: Number of jobs run at the same time
+            max_queued: Jobs waiting for a worker beyond which submissions are rejected
+            ttl: Seconds a finished job's result is kept
+            max_jobs: Maximum number of jobs kept, oldest finished jobs dropped first
+        """
+        self.handler = handler
+        self.workers = workers
+        self.max_queued = max_queued
+        self.ttl = ttl
+        self.max_jobs = max_jobs
+
+        self._jobs: "OrderedDict[str, _Job]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='review-job')
+
+        self.queued = 0
+        self.running = 0
+        self.counts = {"submitted": 0, "rejected": 0, "succeeded": 0, "failed": 0, "expired": 0}
+
+    @classmethod
+    def from_env(cls, handler: Callable[[Dict[str, Any]], Dict[str, Any]]) -> 'JobQueue':
+        """Build a job queue from environment variables"""
+        return cls(
+            handler,
+            workers=int(os.getenv('REVIEW_JOB_WORKERS', '4')),
+            max_queued=int(os.getenv('REVIEW_JOB_QUEUE_DEPTH', '100')),
+            ttl=float(os.getenv('REVIEW_JOB_TTL', '3600')),
+            max_jobs=int(os.getenv('REVIEW_JOB_MAX_JOBS', '1000'))
+        )
+
+    def submit(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Queue a job
+
+        Args:
+            payload: Input handed to the handler
+
+        Returns:
+            Snapshot of the queued job
+
+        Raises:
+            QueueFullError: If max_queued jobs are already waiting
+        """
+        with self._lock:
+            self._expire()
+            if self.queued >= self.max_queued:
+                self.counts["rejected"] += 1
+                raise QueueFullError(f"Review job queue is full ({self.max_queued} jobs waiting)")
+            job = _Job(payload)
+            self._jobs[job.id] = job
+            self.queued += 1
+            self.counts["submitted"] += 1
+            snapshot = self._snapshot(job)
+        self._executor.submit(self._run, job)
+        return snapshot
+
+    def get(self, job_id: str, wait: float = 0) -> Optional[Dict[str, Any]]:
+        """
+        Get a job, optionally waiting for it to finish
+
+        Args:
+            job_id: Id returned by submit
+            wait: Seconds to wait for an unfinished job before answering
+
+        Returns:
+            Snapshot of the job, or None if it is unknown or expired
+        """
+        with self._lock:
+            self._expire()
+            job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        if wait > 0:
+            job.done.wait(wait)
+        with self._lock:
+            return self._snapshot(job)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self.counts, queued=self.queued, running=self.running, stored=len(self._jobs),
+                        workers=self.workers, max_queued=self.max_queued)
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
+
+    def _run(self, job: _Job) -> None:
+        with self._lock:
+            self.queued -= 1
+            self.running += 1
+            job.status = RUNNING
+            job.started_at = time.time()
+        try:
+            result, error, status = self.handler(job.payload), None, SUCCEEDED
+        except Exception as e:
+            result, error, status = None, str(e), FAILED
+        with self._lock:
+            self.running -= 1
+            self.counts[status] += 1
+            job.result, job.error, job.status = result, error, status
+            job.finished_at = time.time()
+        job.done.set()
+
+    def _expire(self) -> None:
+        """Drop finished jobs past their TTL, then the oldest finished jobs over max_jobs"""
+        cutoff = time.time() - self.ttl
+        over = len(self._jobs) - self.max_jobs
+        for job_id, job in list(self._jobs.items()):
+            if job.finished_at is not None and (job.finished_at < cutoff or over > 0):
+                del self._jobs[job_id]
+                self.counts["expired"] += 1
+                over -= 1
+
+    @staticmethod
+    def _snapshot(job: _Job) -> Dict[str, Any]:
+        snapshot = {
+            "job_id": job.id,
+            "status": job.status,
+            "created_at": _iso(job.created_at),
+            "started_at": _iso(job.started_at),
+            "finished_at": _iso(job.finished_at)
+        }
+        if job.status == SUCCEEDED:
+            snapshot["result"] = job.result
+        elif job.status == FAILED:
+            snapshot["error"] = job.error
+        return snapshot
+
+
+def _iso(timestamp: Optional[float]) -> Optional[str]:
+    if timestamp is None:
+        return None
+    return time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(timestamp)) + f".{int(timestamp % 1 * 1000):03d}Z"
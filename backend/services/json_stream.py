@@ -0,0 +1,362 @@
+"""
+Incremental JSON object parser for streamed AI responses
+"""
+
+import json
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Characters that change parser state outside and inside strings; everything
+# else is skipped by the regex engine instead of a Python-level loop
+_STRUCTURAL = re.compile(r'[{}\[\]",:]')
+_STRING_SPECIAL = re.compile(r'["\\]')
+
+_TRAILING_COMMA = re.compile(r',\s*([}\]])')
+
+# Where a JSON object with string keys can start; skips braces in prose
+_OBJECT_START = re.compile(r'\{\s*"')
+# A brace at the end of the input that may still turn out to start an object
+_PENDING_START = re.compile(r'\{\s*\Z')
+_MAX_DECODE_ATTEMPTS = 8
+_decoder = json.JSONDecoder()
+
+_CLOSERS = {'{': '}', '[': ']'}
+
+
+def extract_object(text: str, keys: Optional[Iterable[str]] = None) -> Tuple[Dict[str, Any], bool, List[str]]:
+    """
+    Find and decode the first JSON object in a complete text
+
+    Well-formed objects are decoded by the C decoder, which stops at the
+    closing brace and ignores prose after it. An object it rejects, usually
+    because the output was cut off, goes through IncrementalJSONParser to
+    keep every field that is complete; such an object is never reported
+    complete, and every repair the parser made is listed in the errors.
+
+    Args:
+        text: Text containing a JSON object, possibly surrounded by prose
+        keys: Expected keys; objects that have none of them are skipped
+
+    Returns:
+        Tuple of (fields, whether the object was complete and valid, errors)
+    """
+    wanted = set(keys) if keys is not None else None
+    for attempt, match in enumerate(_OBJECT_START.finditer(text)):
+        if attempt >= _MAX_DECODE_ATTEMPTS:
+            break
+        try:
+            value, _ = _decoder.raw_decode(text, match.start())
+        except ValueError:
+            parser = IncrementalJSONParser()
+            parser.feed(text[match.start():])
+            parser.finish()
+            if parser.fields and (wanted is None or wanted & parser.fields.keys()):
+                return parser.fields, not parser.truncated and not parser.errors, parser.errors
+            continue
+        if isinstance(value, dict) and (wanted is None or wanted & value.keys()):
+            return value, True, []
+    return {}, False, []
+
+
+class IncrementalJSONParser:
+    """
+    Parse the first JSON object of a text stream one chunk at a time
+
+    Every top-level field is reported as soon as its value is complete, so a
+    caller can act on "score" before the model has finished writing
+    "improvements". Prose before and after the object is skipped: like
+    extract_object, an object starts at a brace followed by a quoted key,
+    and a candidate that turns out not to be JSON before its first field is
+    complete is dropped and scanning resumes after its brace. Consumed input
+    is dropped so the buffer only holds the field currently being written,
+    or the candidate object until its first field.
+    """
+
+    def __init__(self):
+        self.fields: Dict[str, Any] = {}
+        self.done = False
+        self.truncated = False
+        self.errors: List[str] = []
+
+        self._text = ''
+        self._pos = 0
+        # Open brackets, the object itself first
+        self._stack: List[str] = []
+        # Offset of the candidate object's opening brace
+        self._start = 0
+        self._in_string = False
+        self._string_start = 0
+        self._expect = 'key'
+        self._key: Optional[str] = None
+        self._key_end = 0
+        self._value_start: Optional[int] = None
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """
+        Consume the next chunk of text
+
+        Args:
+            chunk: Text received from the stream
+
+        Returns:
+            List of (key, value) pairs completed by this chunk
+        """
+        if self.done:
+            return []
+
+        self._text += chunk
+        completed = self._scan()
+        self._compact()
+        return completed
+
+    def finish(self) -> List[Tuple[str, Any]]:
+        """
+        Signal the end of the input
+
+        When the text stops inside the object, as with a response cut off at
+        max_tokens, the field being written is closed and kept if it decodes;
+        fields that had not started are lost.
+
+        Returns:
+            List with the recovered (key, value) pair, if any
+        """
+        if self.done:
+            return []
+        self.done = True
+        if not self._stack:
+            return []
+
+        self.truncated = True
+        self.errors.append("Input ended inside the object")
+        if self._expect != 'value' or self._key is None:
+            return []
+
+        value = _close_truncated(self._text[self._value_start:])
+        if value is _INVALID:
+            self.errors.append(f"Truncated value for {self._key!r}")
+            return []
+        self.fields[self._key] = value
+        return [(self._key, value)]
+
+    @property
+    def started(self) -> bool:
+        """Whether the opening brace of the object has been seen"""
+        return bool(self._stack) or bool(self.fields)
+
+    def _scan(self) -> List[Tuple[str, Any]]:
+        completed = []
+        text = self._text
+
+        while not self.done:
+            if self._in_string:
+                match = _STRING_SPECIAL.search(text, self._pos)
+                if match is None:
+                    self._pos = len(text)
+                    break
+                index = match.start()
+                if text[index] == '\\':
+                    if index + 1 >= len(text):
+                        # Wait for the escaped character
+                        self._pos = index
+                        break
+                    self._pos = index + 2
+                    continue
+                self._in_string = False
+                self._pos = index + 1
+                if len(self._stack) == 1 and self._expect == 'key':
+                    self._key = self._decode(text[self._string_start:self._pos])
+                    if self._key is None and self._restart():
+                        continue
+                    self._key_end = self._pos
+                    self._expect = 'colon'
+                continue
+
+            if not self._stack:
+                # Skip prose until the object starts
+                match = _OBJECT_START.search(text, self._pos)
+                if match is None:
+                    pending = _PENDING_START.search(text, self._pos)
+                    self._pos = pending.start() if pending is not None else len(text)
+                    break
+                self._stack.append('{')
+                self._start = match.start()
+                self._expect = 'key'
+                self._pos = match.start() + 1
+                continue
+
+            match = _STRUCTURAL.search(text, self._pos)
+            if match is None:
+                self._pos = len(text)
+                break
+            index = match.start()
+            char = text[index]
+            self._pos = index + 1
+
+            if len(self._stack) == 1 and not self._valid_at_top(char, text, index) and self._restart():
+                continue
+
+            if char == '"':
+                self._in_string = True
+                self._string_start = index
+            elif char in '{[':
+                self._stack.append(char)
+            elif char in '}]':
+                if len(self._stack) == 1:
+                    if char == '}':
+                        if self._expect == 'key':
+                            # Only a comma after the last field leaves a key expected here
+                            self.errors.append("Trailing comma after the last field")
+                        if not self._complete_field(text, index, completed) and self._restart():
+                            continue
+                        self._stack.pop()
+                        self.done = True
+                    continue
+                self._stack.pop()
+            elif len(self._stack) == 1:
+                if char == ':' and self._expect == 'colon':
+                    self._value_start = index + 1
+                    self._expect = 'value'
+                elif char == ',':
+                    if not self._complete_field(text, index, completed) and self._restart():
+                        continue
+
+        return completed
+
+    def _valid_at_top(self, char: str, text: str, index: int) -> bool:
+        """Whether a structural character may appear at the object's top level here"""
+        if char == '"':
+            return self._expect != 'colon'
+        if char == ':':
+            # Only whitespace may separate a key from its colon
+            return self._expect == 'colon' and not text[self._key_end:index].strip()
+        if char in ',}':
+            return self._expect != 'colon'
+        if char == ']':
+            return False
+        return self._expect == 'value'
+
+    def _restart(self) -> bool:
+        """
+        Drop a candidate object that is not JSON and resume after its brace
+
+        Returns:
+            False, keeping the object, when one of its fields was already reported
+        """
+        if self.fields:
+            return False
+        self._pos = self._start + 1
+        self._stack = []
+        self._in_string = False
+        self._expect = 'key'
+        self._key = None
+        self._value_start = None
+        self.errors = []
+        return True
+
+    def _complete_field(self, text: str, end: int, completed: List[Tuple[str, Any]]) -> bool:
+        """Decode the value that ends at `end` and record the field; False if it is not valid JSON"""
+        valid = True
+        if self._expect == 'value' and self._key is not None:
+            raw = text[self._value_start:end].strip()
+            try:
+                value = json.loads(raw)
+            except ValueError:
+                # Models sometimes leave a trailing comma before a closing bracket
+                try:
+                    value = json.loads(_TRAILING_COMMA.sub(r'\1', raw))
+                except ValueError:
+                    self.errors.append(f"Invalid value for {self._key!r}")
+                    valid = False
+                else:
+                    # Kept, but the object no longer counts as valid
+                    self.errors.append(f"Trailing comma in value for {self._key!r}")
+                    self.fields[self._key] = value
+                    completed.append((self._key, value))
+            else:
+                self.fields[self._key] = value
+                completed.append((self._key, value))
+        self._key = None
+        self._value_start = None
+        self._expect = 'key'
+        return valid
+
+    def _compact(self) -> None:
+        """Drop input that no pending key or value refers to any more"""
+        keep = self._pos
+        if self._stack and not self.fields:
+            # The candidate may still be dropped and rescanned after its brace
+            keep = min(keep, self._start + 1)
+        if self._value_start is not None:
+            keep = min(keep, self._value_start)
+        if self._in_string:
+            keep = min(keep, self._string_start)
+        if keep > 0:
+            self._text = self._text[keep:]
+            self._pos -= keep
+            self._start -= keep
+            self._key_end -= keep
+            if self._value_start is not None:
+                self._value_start -= keep
+            if self._in_string:
+                self._string_start -= keep
+
+    def _decode(self, raw: str) -> Optional[str]:
+        try:
+            return json.loads(raw)
+        except ValueError:
+            self.errors.append("Invalid key")
+            return None
+
+
+_INVALID = object()
+
+
+def _close_truncated(raw: str) -> Any:
+    """
+    Decode a value cut off mid-way by closing what is still open
+
+    Args:
+        raw: Text of the value up to the end of the input
+
+    Returns:
+        The decoded value, or _INVALID if it cannot be repaired
+    """
+    candidates = [raw, raw.rstrip().rstrip(',')]
+    # Drop an element or key that was cut off before its value
+    cut = raw.rfind(',')
+    if cut > 0:
+        candidates.append(raw[:cut])
+    for candidate in candidates:
+        try:
+            return json.loads(_close_open(candidate))
+        except ValueError:
+            continue
+    return _INVALID
+
+
+def _close_open(text: str) -> str:
+    """Append the quote and brackets that text leaves open"""
+    stack = []
+    pos = 0
+    while True:
+        match = _STRUCTURAL.search(text, pos)
+        if match is None:
+            break
+        char = match.group()
+        pos = match.end()
+        if char == '"':
+            # Skip to the closing quote
+            while True:
+                special = _STRING_SPECIAL.search(text, pos)
+                if special is None:
+                    if text.endswith('\\') and (len(text) - len(text.rstrip('\\'))) % 2:
+                        text = text[:-1]
+                    return text + '"' + ''.join(_CLOSERS[b] for b in reversed(stack))
+                pos = special.end() + (1 if special.group() == '\\' else 0)
+                if special.group() == '"':
+                    break
+        elif char in '{[':
+            stack.append(char)
+        elif char in '}]' and stack:
+            stack.pop()
+    return text + ''.join(_CLOSERS[b] for b in reversed(stack))
@@ -0,0 +1,195 @@
+"""
+Table-driven lexer separating comments and string literals from code
+
+Every language has a table of token rules (comments, strings, raw strings,
+heredocs, ...) compiled into one alternation, so a file is lexed in a single
+left-to-right regex scan. Unterminated multi-line tokens run to the end of
+the text instead of being retried at every later position, which keeps the
+cost per byte bounded.
+"""
+
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+# Token kinds counted by the metrics engine
+KINDS = ('comment', 'string', 'docstring', 'template')
+
+# Rules are (kind, first characters, pattern). A token starts at its
+# quote or comment marker; string prefixes (r, b, u8, @, ...) are checked
+# by lookbehind and stay with the code, which lets the scan skip every
+# position not holding a first character. In a pattern, {end} names the
+# optional group holding the terminator of a token that may span lines (a
+# token without it ran to the end of the text), and {id} names a delimiter
+# captured for a backreference. Patterns run with re.DOTALL and re.MULTILINE.
+_LINE_COMMENT = ('comment', '/', r'//[^\n]*')
+_HASH_COMMENT = ('comment', '#', r'#[^\n]*')
+_BLOCK_COMMENT = ('comment', '/', r'/\*[^*]*(?:\*+[^*/][^*]*)*(?P<{end}>\*+/)?')
+_DOUBLE_QUOTED = ('string', '"', r'"(?:[^"\\\n]|\\.)*"?')
+_SINGLE_QUOTED = ('string', "'", r"'(?:[^'\\\n]|\\.)*'?")
+# One character or one escape, so lifetimes and digit separators are not taken for literals
+_CHAR_LITERAL = ('string', "'", r"'(?:[^'\\\n]|\\[^\n]{1,10}?)'")
+_MULTILINE_DOUBLE = ('string', '"', r'"(?:[^"\\]|\\.)*(?P<{end}>")?')
+_MULTILINE_SINGLE = ('string', "'", r"'(?:[^'\\]|\\.)*(?P<{end}>')?")
+_TRIPLE_DOUBLE = r'"""(?:\\.|(?!""")[^\\])*(?P<{end}>""")?'
+
+_RULES: Dict[str, List[Tuple[str, str, str]]] = {
+    'python': [
+        _HASH_COMMENT,
+        ('docstring', '"', _TRIPLE_DOUBLE),
+        ('docstring', "'", r"'''(?:\\.|(?!''')[^\\])*(?P<{end}>''')?"),
+        _DOUBLE_QUOTED, _SINGLE_QUOTED,
+    ],
+    'javascript': [
+        _LINE_COMMENT, _BLOCK_COMMENT, _DOUBLE_QUOTED, _SINGLE_QUOTED,
+        ('template', '`', r'`(?:[^`\\]|\\.)*(?P<{end}>`)?'),
+    ],
+    'java': [
+        _LINE_COMMENT, _BLOCK_COMMENT,
+        ('string', '"', _TRIPLE_DOUBLE),
+        _DOUBLE_QUOTED, _CHAR_LITERAL,
+    ],
+    'cpp': [
+        _LINE_COMMENT, _BLOCK_COMMENT,
+        ('string', '"', r'(?<=R)"(?P<{id}>[^()\\\s]{0,16})\((?:(?!\)(?P={id})").)*(?P<{end}>\)(?P={id})")?'),
+        _DOUBLE_QUOTED, _CHAR_LITERAL,
+    ],
+    'csharp': [
+        _LINE_COMMENT, _BLOCK_COMMENT,
+        ('string', '"', _TRIPLE_DOUBLE),
+        ('string', '"', r'(?:(?<=@)|(?<=@\$))"(?:[^"]|"")*(?P<{end}>")?'),
+        _DOUBLE_QUOTED, _CHAR_LITERAL,
+    ],
+    'go': [
+        _LINE_COMMENT, _BLOCK_COMMENT,
+        ('string', '`', r'`[^`]*(?P<{end}>`)?'),
+        _DOUBLE_QUOTED, _CHAR_LITERAL,
+    ],
+    'rust': [
+        _LINE_COMMENT, _BLOCK_COMMENT,
+        ('string', '#"', r'(?<=r)(?P<{id}>#*)"(?:(?!"(?P={id})).)*(?P<{end}>"(?P={id}))?'),
+        _MULTILINE_DOUBLE, _CHAR_LITERAL,
+    ],
+    'php': [
+        _LINE_COMMENT,
+        ('comment', '#', r'#(?!\[)[^\n]*'),
+        _BLOCK_COMMENT,
+        ('string', '<', r'<<<[ \t]*(?P<{id}q>["\']?)(?P<{id}>[A-Za-z_]\w*)(?P={id}q)'
+                        r'(?:(?!\n[ \t]*(?P={id})\b).)*(?P<{end}>\n[ \t]*(?P={id})\b)?'),
+        _MULTILINE_DOUBLE, _MULTILINE_SINGLE,
+    ],
+    'ruby': [
+        ('comment', '=', r'^=begin\b(?:(?!\n=end\b).)*(?P<{end}>\n=end\b[^\n]*)?'),
+        _HASH_COMMENT,
+        # Heredoc bodies start on the next line; the rest of the opening line goes with the token
+        ('string', '<', r'<<[~-]?(?P<{id}q>["\'`]?)(?P<{id}>[A-Z_][A-Z0-9_]*)(?P={id}q)[^\n]*'
+                        r'(?:(?!\n[ \t]*(?P={id})\b).)*(?P<{end}>\n[ \t]*(?P={id})\b)?'),
+        ('string', '%', r'%[qQwWiI](?:\{[^}]*\}|\([^)]*\)|\[[^\]]*\]|<[^>]*>|\|[^|]*\|)'),
+        _MULTILINE_DOUBLE, _MULTILINE_SINGLE,
+    ],
+    'html': [
+        ('comment', '<', r'<!--(?:(?!-->).)*(?P<{end}>-->)?'),
+        _DOUBLE_QUOTED,
+    ],
+    'css': [_BLOCK_COMMENT, _DOUBLE_QUOTED, _SINGLE_QUOTED],
+    'default': [_LINE_COMMENT, _BLOCK_COMMENT, _DOUBLE_QUOTED, _SINGLE_QUOTED],
+}
+_RULES['typescript'] = _RULES['javascript']
+
+# Languages with a table of their own
+LANGUAGES = tuple(language for language in _RULES if language != 'default')
+
+
+class _Lexer:
+    def __init__(self, rules: List[Tuple[str, str, str]]):
+        alternatives = []
+        first_characters = set()
+        self.kinds: Dict[str, str] = {}
+        self.end_groups: Dict[str, str] = {}
+        for index, (kind, first, pattern) in enumerate(rules):
+            first_characters.update(first)
+            name = f"r{index}"
+            self.kinds[name] = kind
+            if '{end}' in pattern:
+                self.end_groups[name] = f"e{index}"
+            pattern = pattern.replace('{end}', f"e{index}").replace('{id}', f"d{index}")
+            alternatives.append(f"(?P<{name}>{pattern})")
+        # The leading lookahead lets the regex engine skip to candidate positions
+        starts = ''.join(sorted(re.escape(character) for character in first_characters))
+        self.pattern = re.compile(f"(?=[{starts}])(?:{'|'.join(alternatives)})", re.DOTALL | re.MULTILINE)
+
+
+_lexers: Dict[str, _Lexer] = {}
+
+
+def _lexer(language: str) -> _Lexer:
+    lexer = _lexers.get(language)
+    if lexer is None:
+        lexer = _lexers[language] = _Lexer(_RULES.get(language, _RULES['default']))
+    return lexer
+
+
+def lex(code: str, language: str) -> Dict[str, Any]:
+    """
+    Split code into code text, comments and string literals in one scan
+
+    Args:
+        code: Source code
+        language: Programming language
+
+    Returns:
+        Dictionary with
+            code: the text outside comments and literals, tokens replaced by NUL
+                so no keyword can be formed across them
+            tokens: number of tokens per kind
+            comment_lines: non-blank lines whose content starts inside a comment
+            spans: [first, last] 0-based line pairs of tokens spanning lines
+            open_line: first line of a token left open at the end, else None
+    """
+    lexer = _lexer(language)
+    kinds = lexer.kinds
+    end_groups = lexer.end_groups
+    comment_rules = {name for name, kind in kinds.items() if kind == 'comment'}
+    counts = dict.fromkeys(kinds, 0)
+    segments: List[str] = []
+    spans: List[List[int]] = []
+    comment_lines = 0
+    open_line: Optional[int] = None
+
+    position = 0
+    # Line numbers are counted incrementally from the last token that needed one
+    counted_to = 0
+    line = 0
+    for match in lexer.pattern.finditer(code):
+        start, end = match.span()
+        name = match.lastgroup
+        counts[name] += 1
+        segments.append(code[position:start])
+        position = end
+
+        is_comment = name in comment_rules
+        if is_comment and not code[code.rfind('\n', 0, start) + 1:start].strip():
+            comment_lines += 1
+        end_group = end_groups.get(name)
+        is_open = end_group is not None and match.start(end_group) < 0
+        newlines = code.count('\n', start, end)
+        if newlines or is_open:
+            line += code.count('\n', counted_to, start)
+            counted_to = start
+            if newlines:
+                spans.append([line, line + newlines])
+                if is_comment:
+                    comment_lines += sum(1 for part in code[start:end].split('\n')[1:] if part.strip())
+            if is_open:
+                open_line = line
+
+    tokens = dict.fromkeys(KINDS, 0)
+    for name, count in counts.items():
+        tokens[kinds[name]] += count
+    segments.append(code[position:])
+    return {
+        "code": '\0'.join(segments),
+        "tokens": tokens,
+        "comment_lines": comment_lines,
+        "spans": spans,
+        "open_line": open_line
+    }
@@ -0,0 +1,375 @@
+"""
+Routing of LLM calls across several OpenAI-compatible backends
+"""
+
+import json
+import math
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+from .resilience import CircuitBreaker, CircuitOpenError, is_retryable, retry_after
+
+# Routing strategies
+LATENCY = "latency"
+ROUND_ROBIN = "round_robin"
+
+# Durations in OpenAI's x-ratelimit-reset-* headers, e.g. "1s", "6m0s", "20ms"
+_DURATION_PART = re.compile(r'(\d+(?:\.\d+)?)(ms|s|m|h)')
+_DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """Seconds of a rate limit reset duration, None if it cannot be read"""
+    if not value:
+        return None
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return sum(float(number) * _DURATION_UNITS[unit] for number, unit in parts)
+
+
+def _is_timeout(error: BaseException) -> bool:
+    import httpx
+    while error is not None:
+        if isinstance(error, (httpx.TimeoutException, TimeoutError)):
+            return True
+        error = error.__cause__
+    return False
+
+
+def _status(error: BaseException) -> Optional[int]:
+    while error is not None:
+        status = getattr(getattr(error, 'response', None), 'status_code', None)
+        if status is not None:
+            return status
+        error = error.__cause__
+    return None
+
+
+class LLMBackend:
+    def __init__(self, name: str, base_url: str, api_key: Optional[str], model: Optional[str] = None,
+                 context_tokens: Optional[int] = None, weight: float = 1.0, json_mode: bool = False,
+                 light_model: Optional[str] = None):
+        """
+        Initialize a backend: one OpenAI-compatible endpoint and model
+
+        Args:
+            name: Name used in responses, statistics and metrics
+            base_url: Base URL of the API, ending in /v1
+            api_key: API key sent to the endpoint
+            model: Model requested from the endpoint, None for the model the request was planned with
+            context_tokens: Context length of the model, None when any prompt fits
+            weight: Relative share of traffic at equal latency
+            json_mode: Whether to request JSON mode output
+            light_model: Model requested for light tier reviews, None for the same as other reviews
+        """
+        self.name = name
+        self.base_url = base_url
+        self.api_key = api_key
+        self.model = model
+        self.context_tokens = context_tokens
+        self.weight = weight
+        self.json_mode = json_mode
+        self.light_model = light_model
+        # Set by the router when circuit breaking is enabled
+        self.breaker: Optional[CircuitBreaker] = None
+
+        # Observed health, guarded by the router's lock
+        self.latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.observed_at = 0.0
+        self.in_flight = 0
+        self.cooldown_until = 0.0
+        self.limit_requests: Optional[int] = None
+        self.remaining_requests: Optional[int] = None
+        self.requests_reset_at = 0.0
+        self.remaining_tokens: Optional[int] = None
+        self.tokens_reset_at = 0.0
+        self.counts = {"requests": 0, "succeeded": 0, "failed": 0, "rate_limited": 0}
+
+    def model_for(self, light: bool) -> Optional[str]:
+        """Model this backend serves a review with, None for the one it was planned with"""
+        return self.light_model if light and self.light_model else self.model
+
+    def fits(self, tokens: int) -> bool:
+        return self.context_tokens is None or tokens <= self.context_tokens
+
+
+class LLMRouter:
+    def __init__(self, backends: Sequence[LLMBackend], strategy: str = LATENCY, alpha: float = 0.3,
+                 decay: float = 30.0, low_budget: float = 0.2, breaker_threshold: int = 0,
+                 breaker_reset_timeout: float = 30.0):
+        """
+        Initialize the router
+
+        Every attempt goes to the backend with the lowest expected cost:
+        its EWMA latency times the calls it already has in flight, raised by
+        its EWMA error rate and by a nearly spent rate limit budget, divided
+        by its weight. Backends that are cooling down after a 429, whose
+        budget is spent, or whose context is too small for the prompt are
+        skipped while others are available. Without new samples a backend's
+        latency and error rate decay back to the prior, so a degraded
+        backend is tried again once it has been left alone for a while.
+
+        Every backend has its own circuit breaker. Timeouts, connection
+        errors and retryable statuses other than 429 count as failures; a
+        backend whose circuit is open is never picked, and when every
+        backend's circuit is open the call fails fast.
+
+        Args:
+            backends: Backends to route between, the first one is the primary
+            strategy: "latency", or "round_robin" to ignore observed health
+            alpha: Weight of the newest sample in the moving averages
+            decay: Seconds without samples after which observations have mostly faded
+            low_budget: Remaining fraction of the request budget below which a backend is penalized
+            breaker_threshold: Consecutive failures that open a backend's circuit, 0 to disable
+            breaker_reset_timeout: Seconds before an open circuit lets a trial call through
+        """
+        if not backends:
+            raise ValueError("At least one LLM backend is required")
+        self.backends = list(backends)
+        self.strategy = strategy
+        self.alpha = alpha
+        self.decay = decay
+        self.low_budget = low_budget
+        if breaker_threshold > 0:
+            for backend in self.backends:
+                backend.breaker = CircuitBreaker(breaker_threshold, breaker_reset_timeout)
+        self._by_name = {backend.name: backend for backend in self.backends}
+        self._next = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, base_url: str, api_key: Optional[str], json_mode) -> 'LLMRouter':
+        """
+        Build the router from LLM_BACKENDS, or a single backend from the OPENAI_* settings
+
+        LLM_BACKENDS is a JSON list of objects with base_url and optionally
+        name, api_key (or api_key_env naming a variable holding it), model,
+        context_tokens, weight, json_mode ("auto", true or false) and
+        light_model.
+
+        Args:
+            base_url: Default base URL
+            api_key: Default API key
+            json_mode: Function resolving a json_mode setting for a base URL
+        """
+        config = os.getenv('LLM_BACKENDS')
+        if config:
+            backends = []
+            for index, item in enumerate(json.loads(config)):
+                backend_url = item.get('base_url', base_url)
+                backends.append(LLMBackend(
+                    name=item.get('name', f"backend{index}"),
+                    base_url=backend_url,
+                    api_key=os.getenv(item['api_key_env']) if 'api_key_env' in item else item.get('api_key', api_key),
+                    model=item.get('model'),
+                    context_tokens=item.get('context_tokens'),
+                    weight=float(item.get('weight', 1.0)),
+                    json_mode=json_mode(str(item.get('json_mode', 'auto')), backend_url),
+                    light_model=item.get('light_model')
+                ))
+        else:
+            backends = [LLMBackend("default", base_url, api_key,
+                                   json_mode=json_mode(os.getenv('OPENAI_JSON_MODE', 'auto'), base_url))]
+
+        return cls(
+            backends,
+            strategy=os.getenv('LLM_ROUTER_STRATEGY', LATENCY),
+            alpha=float(os.getenv('LLM_ROUTER_EWMA_ALPHA', '0.3')),
+            decay=float(os.getenv('LLM_ROUTER_DECAY', '30')),
+            breaker_threshold=int(os.getenv('LLM_BREAKER_FAILURE_THRESHOLD', '5')),
+            breaker_reset_timeout=float(os.getenv('LLM_BREAKER_RESET_TIMEOUT', '30'))
+        )
+
+    @property
+    def primary(self) -> LLMBackend:
+        return self.backends[0]
+
+    def select(self, tokens: int = 0, exclude: Sequence[str] = ()) -> LLMBackend:
+        """
+        Pick the backend for the next attempt
+
+        Args:
+            tokens: Prompt plus completion tokens the request needs
+            exclude: Names of backends that already failed this call
+
+        Returns:
+            The chosen backend, already counted as in flight; pass it to finish()
+
+        Raises:
+            CircuitOpenError: If the circuit of every backend that fits the request is open
+        """
+        with self._lock:
+            now = time.monotonic()
+            candidates = [backend for backend in self.backends if backend.fits(tokens)] or \
+                [max(self.backends, key=lambda backend: backend.context_tokens or 0)]
+            candidates = [backend for backend in candidates if backend.breaker is None or backend.breaker.ready()]
+            if not candidates:
+                raise CircuitOpenError("LLM backend circuits are open, failing fast")
+            fresh = [backend for backend in candidates if backend.name not in exclude] or candidates
+            available = [backend for backend in fresh if self._available(backend, tokens, now)] or fresh
+
+            if len(available) == 1:
+                backend = available[0]
+            elif self.strategy == ROUND_ROBIN:
+                backend = available[self._next % len(available)]
+                self._next += 1
+            else:
+                prior = self._prior()
+                backend = min(available, key=lambda backend: self._cost(backend, prior, now))
+
+            if backend.breaker is not None:
+                # Claims the trial call of a half-open circuit
+                backend.breaker.allow()
+            backend.in_flight += 1
+            backend.counts["requests"] += 1
+            if backend.remaining_requests is not None:
+                # Counted down locally until the next response reports the real budget
+                backend.remaining_requests -= 1
+            return backend
+
+    def finish(self, backend: LLMBackend, elapsed: float, error: Optional[BaseException] = None) -> None:
+        """
+        Record the outcome of an attempt
+
+        Args:
+            backend: Backend returned by select()
+            elapsed: Seconds the attempt took
+            error: Exception the attempt raised, None on success
+        """
+        if error is not None and not isinstance(error, Exception):
+            # Cancelled, e.g. the losing attempt of a hedged call: no outcome to record
+            with self._lock:
+                backend.in_flight -= 1
+                if backend.breaker is not None:
+                    backend.breaker.release()
+            return
+
+        status = _status(error) if error is not None else None
+        cooldown = retry_after(error) if status == 429 else None
+        # A rejected request says nothing about the backend's health, only about its rate limit
+        unhealthy = error is not None and status != 429 and is_retryable(error)
+        timed_out = error is not None and _is_timeout(error)
+
+        with self._lock:
+            now = time.monotonic()
+            backend.in_flight -= 1
+            if backend.breaker is not None:
+                if unhealthy:
+                    backend.breaker.record_failure()
+                elif error is None or (status is not None and status != 429):
+                    # The backend answered; a bad request is the caller's fault
+                    backend.breaker.record_success()
+                else:
+                    backend.breaker.release()
+            weight = self._fade(backend, now)
+            backend.error_rate *= weight
+            if backend.latency is not None:
+                prior = self._prior()
+                backend.latency = prior + (backend.latency - prior) * weight
+
+            if error is None or timed_out:
+                # A timeout shows the backend is at least this slow
+                backend.latency = elapsed if backend.latency is None else \
+                    backend.latency + self.alpha * (elapsed - backend.latency)
+            if error is None:
+                backend.counts["succeeded"] += 1
+            else:
+                backend.counts["failed"] += 1
+            if status == 429:
+                backend.counts["rate_limited"] += 1
+                backend.cooldown_until = now + (cooldown if cooldown is not None else 1.0)
+            elif error is None or unhealthy:
+                backend.error_rate += self.alpha * ((1.0 if unhealthy else 0.0) - backend.error_rate)
+            backend.observed_at = now
+
+    def observe_headers(self, backend: LLMBackend, headers: Any) -> None:
+        """Read the x-ratelimit-* headers of a response from the backend"""
+        limit = headers.get('x-ratelimit-limit-requests')
+        remaining = headers.get('x-ratelimit-remaining-requests')
+        remaining_tokens = headers.get('x-ratelimit-remaining-tokens')
+        if remaining is None and remaining_tokens is None:
+            return
+        now = time.monotonic()
+        with self._lock:
+            try:
+                if limit is not None:
+                    backend.limit_requests = int(limit)
+                if remaining is not None:
+                    backend.remaining_requests = int(remaining)
+                    backend.requests_reset_at = now + (parse_duration(headers.get('x-ratelimit-reset-requests')) or 0)
+                if remaining_tokens is not None:
+                    backend.remaining_tokens = int(remaining_tokens)
+                    backend.tokens_reset_at = now + (parse_duration(headers.get('x-ratelimit-reset-tokens')) or 0)
+            except ValueError:
+                pass
+
+    def get(self, name: str) -> Optional[LLMBackend]:
+        return self._by_name.get(name)
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """Observed state of every backend"""
+        with self._lock:
+            now = time.monotonic()
+            prior = self._prior()
+            return [
+                dict(
+                    backend.counts,
+                    name=backend.name,
+                    base_url=backend.base_url,
+                    model=backend.model,
+                    in_flight=backend.in_flight,
+                    latency_ms=round(backend.latency * 1000, 1) if backend.latency is not None else None,
+                    error_rate=round(backend.error_rate * self._fade(backend, now), 3),
+                    remaining_requests=backend.remaining_requests,
+                    remaining_tokens=backend.remaining_tokens,
+                    cooldown_s=round(max(0.0, backend.cooldown_until - now), 3),
+                    available=self._available(backend, 0, now),
+                    circuit=backend.breaker.state if backend.breaker is not None else None,
+                    cost=round(self._cost(backend, prior, now), 4)
+                )
+                for backend in self.backends
+            ]
+
+    def _available(self, backend: LLMBackend, tokens: int, now: float) -> bool:
+        """Whether the backend may be called now without a known 429 (lock held)"""
+        if backend.cooldown_until > now:
+            return False
+        if backend.remaining_requests is not None and backend.remaining_requests <= 0 \
+                and backend.requests_reset_at > now:
+            return False
+        if backend.remaining_tokens is not None and backend.remaining_tokens < tokens \
+                and backend.tokens_reset_at > now:
+            return False
+        return True
+
+    def _cost(self, backend: LLMBackend, prior: float, now: float) -> float:
+        """Expected cost of sending one more call to the backend (lock held)"""
+        weight = self._fade(backend, now)
+        latency = prior if backend.latency is None else prior + (backend.latency - prior) * weight
+        error_rate = min(0.95, backend.error_rate * weight)
+        cost = latency * (backend.in_flight + 1) / (1.0 - error_rate)
+
+        if backend.limit_requests and backend.remaining_requests is not None and backend.requests_reset_at > now:
+            budget = max(0, backend.remaining_requests) / backend.limit_requests
+            if budget < self.low_budget:
+                cost *= 1.0 + 4.0 * (self.low_budget - budget) / self.low_budget
+        return cost / backend.weight
+
+    def _prior(self) -> float:
+        """Latency assumed for a backend without samples: the best observed one, so new backends get tried (lock held)"""
+        observed = [backend.latency for backend in self.backends if backend.latency is not None]
+        return min(observed) if observed else 1.0
+
+    def _fade(self, backend: LLMBackend, now: float) -> float:
+        """Weight left to a backend's observations after the time without new ones"""
+        if not backend.observed_at:
+            return 1.0
+        return math.exp(-(now - backend.observed_at) / self.decay)
@@ -0,0 +1,143 @@
+"""
+Prompt compaction and token estimation
+"""
+
+import io
+import re
+import threading
+import tokenize
+from typing import List, Set
+
+# Average characters per token of source code with OpenAI's BPE encodings;
+# used when tiktoken or its encoding files are unavailable
+CHARS_PER_TOKEN = 3.5
+
+# Lines that must stay first: shebang, encoding declaration, PHP open tag
+_PREAMBLE_LINE = re.compile(r'#!|#.*coding[:=]|<\?php')
+
+# Comments that instruct tools rather than readers, kept as they are
+_DIRECTIVE = re.compile(
+    r'(?:#|//)\s*(?:type:|noqa|pragma|pylint:|rubocop:|frozen_string_literal|eslint|@ts-|nolint|go:|\+build)'
+)
+
+_LINE_COMMENT = {'python': '#', 'ruby': '#'}
+
+# Languages with /* ... */ block comments
+_BLOCK_COMMENTS = {'javascript', 'typescript', 'java', 'cpp', 'csharp', 'go', 'rust', 'php'}
+
+_encoding = None
+_encoding_loaded = False
+_encoding_lock = threading.Lock()
+
+
+def compact_code(code: str, language: str) -> str:
+    """
+    Remove content that costs prompt tokens without informing a review
+
+    Trailing whitespace is stripped and the text of comments standing on
+    lines of their own is dropped: a run of comment lines, license headers
+    included, keeps an empty comment marker on its first line and leaves
+    the other lines empty, and a run of empty lines encodes to a single
+    token. Every line keeps its number, so line numbers of hotspots and of
+    the model's findings point at the submitted code. Code, docstrings,
+    comments after code, tool directives and the file's preamble are kept.
+
+    Args:
+        code: Source code
+        language: Programming language
+
+    Returns:
+        Compacted source code
+    """
+    lines = [line.rstrip() for line in code.split('\n')]
+    comments = _comment_lines(code, lines, language)
+    marker = _LINE_COMMENT.get(language, '//')
+
+    in_run = False
+    for index, line in enumerate(lines):
+        if index in comments:
+            lines[index] = '' if in_run else line[:len(line) - len(line.lstrip())] + marker
+            in_run = True
+        elif line:
+            in_run = False
+    return '\n'.join(lines).rstrip('\n')
+
+
+def _comment_lines(code: str, lines: List[str], language: str) -> Set[int]:
+    """Indexes of the lines holding nothing but a comment that may be dropped"""
+    if language == 'python':
+        comments = _python_comment_lines(code, lines)
+    else:
+        comments = _scan_comment_lines(lines, language)
+
+    preamble = 0
+    while preamble < min(2, len(lines)) and _PREAMBLE_LINE.match(lines[preamble]):
+        preamble += 1
+    return {index for index in comments
+            if index >= preamble and not _DIRECTIVE.match(lines[index].lstrip())}
+
+
+def _python_comment_lines(code: str, lines: List[str]) -> Set[int]:
+    """Comment lines found by the tokenizer, so a '#' inside a string is not taken for one"""
+    comments = set()
+    try:
+        for token in tokenize.generate_tokens(io.StringIO(code).readline):
+            if token.type == tokenize.COMMENT and not lines[token.start[0] - 1][:token.start[1]].strip():
+                comments.add(token.start[0] - 1)
+    except (tokenize.TokenError, IndentationError, SyntaxError):
+        return _scan_comment_lines(lines, 'python')
+    return comments
+
+
+def _scan_comment_lines(lines: List[str], language: str) -> Set[int]:
+    """Comment lines found line by line: line comments and whole lines of block comments"""
+    prefixes = ('#', '//') if language == 'php' else (_LINE_COMMENT.get(language, '//'),)
+    blocks = language in _BLOCK_COMMENTS
+    comments = set()
+    in_block = False
+    for index, line in enumerate(lines):
+        stripped = line.lstrip()
+        if in_block or (blocks and stripped.startswith('/*')):
+            closing = stripped.find('*/', 0 if in_block else 2)
+            in_block = closing == -1
+            # A line going on with code after the comment is kept
+            if in_block or not stripped[closing + 2:].strip():
+                comments.add(index)
+        elif stripped.startswith(prefixes):
+            comments.add(index)
+    return comments
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of tokens a text takes up in a prompt
+
+    Uses tiktoken when it is installed and its encoding can be loaded, and
+    a characters-per-token ratio otherwise.
+
+    Args:
+        text: Prompt text
+
+    Returns:
+        Estimated token count
+    """
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return int(len(text) / CHARS_PER_TOKEN) + 1
+
+
+def _get_encoding():
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        # Concurrent first calls wait for the load instead of seeing no encoding
+        with _encoding_lock:
+            if not _encoding_loaded:
+                try:
+                    import tiktoken
+                    _encoding = tiktoken.get_encoding('cl100k_base')
+                except Exception:
+                    # Optional dependency; the encoding is downloaded on first use
+                    _encoding = None
+                _encoding_loaded = True
+    return _encoding
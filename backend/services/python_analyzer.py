@@ -0,0 +1,281 @@
+"""
+Syntax-tree analysis of Python code
+
+Python sources are parsed once with the standard library `ast` module and
+the tree is cached by content hash, so the metrics engine, the chunker and
+the prompt builder share one parse per file version.
+"""
+
+import ast
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set
+
+# McCabe's threshold above which a function is considered hard to test
+HOTSPOT_COMPLEXITY = 10
+
+# Statements that open a nested block
+_BLOCK_NODES = tuple(getattr(ast, name) for name in
+                     ('If', 'For', 'AsyncFor', 'While', 'With', 'AsyncWith', 'Try', 'TryStar', 'Match')
+                     if hasattr(ast, name))
+_DECISION_NODES = tuple(getattr(ast, name) for name in
+                        ('If', 'IfExp', 'For', 'AsyncFor', 'While', 'ExceptHandler', 'match_case')
+                        if hasattr(ast, name))
+_FUNCTION_NODES = (ast.FunctionDef, ast.AsyncFunctionDef)
+_SCOPE_NODES = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+_IMPORT_NODES = (ast.Import, ast.ImportFrom)
+
+# Fields holding only expression contexts and operators, never worth visiting
+_LEAF_FIELDS = frozenset(('ctx', 'op', 'ops'))
+_CHILD_FIELDS: Dict[type, tuple] = {}
+
+
+class ParsedSource:
+    """A parse tree and the results derived from it, computed on first use"""
+
+    def __init__(self, tree: ast.Module):
+        self.tree = tree
+        self._analysis: Optional[Dict[str, Any]] = None
+        self._definitions: Optional[Set[int]] = None
+        self._lock = threading.Lock()
+
+    def analysis(self) -> Dict[str, Any]:
+        with self._lock:
+            if self._analysis is None:
+                self._analysis = _analyze_tree(self.tree)
+            return self._analysis
+
+    def definition_starts(self) -> Set[int]:
+        with self._lock:
+            if self._definitions is None:
+                self._definitions = _definition_starts(self.tree)
+            return self._definitions
+
+
+class _ParseCache:
+    """LRU of parsed sources, bounded by entries and by total source size"""
+
+    def __init__(self, max_entries: int, max_chars: int):
+        self.max_entries = max_entries
+        self.max_chars = max_chars
+        self._entries: 'OrderedDict[str, tuple]' = OrderedDict()
+        self._chars = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: str, value: Any, size: int) -> None:
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = (value, size)
+            self._chars += size
+            while self._entries and (len(self._entries) > self.max_entries or self._chars > self.max_chars):
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._chars -= evicted_size
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "chars": self._chars, "hits": self.hits, "misses": self.misses}
+
+
+# A parse tree takes about 60 bytes per source character, so the cache and
+# the largest file analyzed are bounded by source size
+MAX_SOURCE_CHARS = int(os.getenv('PYTHON_AST_MAX_CHARS', '200000'))
+_cache = _ParseCache(int(os.getenv('PYTHON_AST_CACHE_ENTRIES', '32')),
+                     int(os.getenv('PYTHON_AST_CACHE_MAX_CHARS', '1000000')))
+
+# Cached for sources that do not parse, so they are not parsed again
+_UNPARSABLE = object()
+
+
+def parse(code: str) -> Optional[ParsedSource]:
+    """
+    Parse Python code, reusing the cached tree of identical code
+
+    Args:
+        code: Python source code
+
+    Returns:
+        The parsed source, or None if the code does not parse or is larger
+        than PYTHON_AST_MAX_CHARS
+    """
+    if len(code) > MAX_SOURCE_CHARS:
+        return None
+    key = hashlib.sha256(code.encode('utf-8', 'surrogatepass')).hexdigest()
+    parsed = _cache.get(key)
+    if parsed is None:
+        try:
+            parsed = ParsedSource(ast.parse(code))
+        except (SyntaxError, ValueError, RecursionError, MemoryError):
+            parsed = _UNPARSABLE
+        _cache.put(key, parsed, len(code))
+    return None if parsed is _UNPARSABLE else parsed
+
+
+def analyze(code: str) -> Optional[Dict[str, Any]]:
+    """
+    Compute Python metrics from the syntax tree
+
+    Counts only real syntax, so keywords inside strings and comments are
+    ignored. Cyclomatic complexity follows McCabe: one plus every branch
+    point (if, loops, except, case, conditional expressions, comprehension
+    clauses and each extra operand of and/or) in a function's own body.
+
+    Args:
+        code: Python source code
+
+    Returns:
+        Dictionary of metrics, or None if the code cannot be parsed
+    """
+    parsed = parse(code)
+    return parsed.analysis() if parsed is not None else None
+
+
+def definition_starts(code: str) -> Optional[Set[int]]:
+    """
+    Lines where a top-level definition or a class member starts
+
+    A decorated definition starts at its first decorator.
+
+    Args:
+        code: Python source code
+
+    Returns:
+        Set of 1-based line numbers, or None if the code cannot be parsed
+    """
+    parsed = parse(code)
+    return parsed.definition_starts() if parsed is not None else None
+
+
+def hotspots(code: str, threshold: int = HOTSPOT_COMPLEXITY, limit: int = 5) -> List[Dict[str, Any]]:
+    """Most complex functions at or above `threshold`, empty if the code cannot be parsed"""
+    analysis = analyze(code)
+    if analysis is None:
+        return []
+    return [function for function in analysis['complex_functions']
+            if function['complexity'] >= threshold][:limit]
+
+
+def cache_stats() -> Dict[str, int]:
+    return _cache.stats()
+
+
+def _analyze_tree(tree: ast.Module) -> Dict[str, Any]:
+    counts = {"functions": 0, "classes": 0, "imports": 0, "docstrings": 0, "type_hints": 0,
+              "exceptions": 0, "async_functions": 0, "list_comprehensions": 0}
+    functions: List[Dict[str, Any]] = []
+
+    if ast.get_docstring(tree, clean=False) is not None:
+        counts["docstrings"] += 1
+
+    # One walk over the tree; each node carries the function whose own body
+    # it belongs to (None at module and class level) and its block depth there
+    stack: List[tuple] = [(child, None, 0) for child in _children(tree)]
+    while stack:
+        node, owner, depth = stack.pop()
+        kind = type(node)
+
+        if kind in _FUNCTION_NODES:
+            counts["functions"] += 1
+            if kind is ast.AsyncFunctionDef:
+                counts["async_functions"] += 1
+            args = node.args
+            counts["type_hints"] += (node.returns is not None) + sum(
+                arg.annotation is not None
+                for arg in args.posonlyargs + args.args + args.kwonlyargs + [args.vararg, args.kwarg]
+                if arg is not None)
+            if ast.get_docstring(node, clean=False) is not None:
+                counts["docstrings"] += 1
+            record = {"name": node.name, "line": node.lineno, "complexity": 1, "nesting_depth": 0}
+            functions.append(record)
+            stack.extend((child, record, 0) for child in _children(node))
+            continue
+        if kind is ast.ClassDef:
+            counts["classes"] += 1
+            if ast.get_docstring(node, clean=False) is not None:
+                counts["docstrings"] += 1
+            stack.extend((child, None, 0) for child in _children(node))
+            continue
+
+        if kind in _IMPORT_NODES:
+            counts["imports"] += 1
+        elif kind is ast.AnnAssign:
+            counts["type_hints"] += 1
+        elif kind is ast.Raise:
+            counts["exceptions"] += 1
+        elif kind is ast.ListComp:
+            counts["list_comprehensions"] += 1
+        if kind is ast.ExceptHandler:
+            counts["exceptions"] += 1
+
+        if owner is not None:
+            if kind in _DECISION_NODES:
+                owner["complexity"] += 1
+            elif kind is ast.BoolOp:
+                owner["complexity"] += len(node.values) - 1
+            elif kind is ast.comprehension:
+                owner["complexity"] += 1 + len(node.ifs)
+
+        children = _children(node)
+        if kind in _BLOCK_NODES:
+            # An elif chain stays at the depth of its if
+            if kind is ast.If and len(node.orelse) == 1 and type(node.orelse[0]) is ast.If:
+                stack.append((node.orelse[0], owner, depth))
+                children.remove(node.orelse[0])
+            depth += 1
+            if owner is not None and depth > owner["nesting_depth"]:
+                owner["nesting_depth"] = depth
+        stack.extend((child, owner, depth) for child in children)
+
+    complexities = [function["complexity"] for function in functions]
+    functions.sort(key=lambda function: (-function["complexity"], function["line"]))
+    counts.update({
+        "average_complexity": round(sum(complexities) / len(complexities), 2) if complexities else 0,
+        "max_complexity": max(complexities, default=0),
+        "max_nesting_depth": max((function["nesting_depth"] for function in functions), default=0),
+        "complex_functions": functions[:10],
+        "analyzer": "ast"
+    })
+    return counts
+
+
+def _children(node: ast.AST) -> List[ast.AST]:
+    """Child nodes, skipping fields that only hold contexts and operators"""
+    fields = _CHILD_FIELDS.get(type(node))
+    if fields is None:
+        fields = _CHILD_FIELDS[type(node)] = tuple(name for name in node._fields if name not in _LEAF_FIELDS)
+    children = []
+    for name in fields:
+        value = getattr(node, name, None)
+        if type(value) is list:
+            children.extend(item for item in value if isinstance(item, ast.AST))
+        elif isinstance(value, ast.AST):
+            children.append(value)
+    return children
+
+
+def _definition_starts(tree: ast.Module) -> Set[int]:
+    starts: Set[int] = set()
+    for node in tree.body:
+        if isinstance(node, _SCOPE_NODES):
+            starts.add(_first_line(node))
+            if isinstance(node, ast.ClassDef):
+                starts.update(_first_line(member) for member in node.body if isinstance(member, _SCOPE_NODES))
+    return starts
+
+
+def _first_line(node: ast.AST) -> int:
+    return min([node.lineno] + [decorator.lineno for decorator in node.decorator_list])
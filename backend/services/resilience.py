@@ -0,0 +1,355 @@
+"""
+Timeouts, retries, hedging and circuit breaking for LLM calls
+"""
+
+import asyncio
+import contextvars
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Awaitable, Callable, Dict, Optional
+from .admission import spare_llm_call, spare_llm_call_async
+
+# HTTP statuses worth another attempt: timeouts, conflicts, rate limits, server errors
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream that is currently failing"""
+
+
+def is_retryable(error: BaseException) -> bool:
+    """
+    Decide whether a failed LLM call may succeed when attempted again
+
+    Timeouts, connection errors and retryable HTTP statuses qualify. SDK
+    exceptions are recognised through the httpx error they were raised from.
+    """
+    # Imported here so that loading this module does not load httpx; by the
+    # time a call has failed the client has imported it anyway
+    import httpx
+    while error is not None:
+        if isinstance(error, (httpx.TimeoutException, httpx.TransportError, TimeoutError, ConnectionError)):
+            return True
+        status = getattr(getattr(error, 'response', None), 'status_code', None)
+        if status is not None:
+            return status in RETRYABLE_STATUS or status >= 500
+        error = error.__cause__
+    return False
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """Seconds the upstream asked us to wait, from a Retry-After header"""
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None)
+    if not headers:
+        return None
+    try:
+        return float(headers.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        """
+        Initialize the circuit breaker
+
+        After `failure_threshold` consecutive failures the circuit opens and
+        calls fail fast. Once `reset_timeout` seconds have passed a single
+        trial call is let through; its outcome closes or reopens the circuit.
+
+        Args:
+            failure_threshold: Consecutive failures that open the circuit
+            reset_timeout: Seconds before a trial call is allowed
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def ready(self) -> bool:
+        """Whether allow() would let a call through now, without claiming the trial call"""
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open":
+                return time.monotonic() - self._opened_at >= self.reset_timeout
+            return not self._trial_in_flight
+
+    def allow(self) -> bool:
+        """Whether a call may go to the upstream now"""
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = "half_open"
+            if self.state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def release(self) -> None:
+        """Record a call that says nothing about the upstream's health, freeing the trial call"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+
+class ResilientCaller:
+    def __init__(self, attempt_timeout: float = 60.0, deadline: float = 120.0, max_retries: int = 2,
+                 base_delay: float = 0.5, max_delay: float = 8.0, hedge: bool = False,
+                 hedge_min_samples: int = 20):
+        """
+        Initialize the resilience layer around an upstream call
+
+        Args:
+            attempt_timeout: Timeout of a single attempt in seconds
+            deadline: Total time budget of a call including retries
+            max_retries: Attempts after the first one on retryable errors
+            base_delay: Backoff before the first retry, doubled per retry
+            max_delay: Upper bound of a single backoff
+            hedge: Send a duplicate request when an attempt outlives the p95 latency and
+                the request has a spare LLM slot for it
+            hedge_min_samples: Latency samples needed before hedging starts
+        """
+        self.attempt_timeout = attempt_timeout
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.hedge = hedge
+        self.hedge_min_samples = hedge_min_samples
+        self.counts = {"calls": 0, "retries": 0, "failures": 0, "short_circuited": 0,
+                       "hedges": 0, "hedge_wins": 0, "hedges_skipped": 0}
+        self._latencies: deque = deque(maxlen=200)
+        self._lock = threading.Lock()
+        self._hedge_executor: Optional[ThreadPoolExecutor] = None
+        self._hedge_workers = int(os.getenv('LLM_HEDGE_MAX_WORKERS', '64'))
+
+    @classmethod
+    def from_env(cls, default_timeout: float = 60.0) -> 'ResilientCaller':
+        """Build the resilience layer from environment variables"""
+        return cls(
+            attempt_timeout=float(os.getenv('LLM_ATTEMPT_TIMEOUT', default_timeout)),
+            deadline=float(os.getenv('LLM_DEADLINE', default_timeout * 2)),
+            max_retries=int(os.getenv('LLM_MAX_RETRIES', '2')),
+            base_delay=float(os.getenv('LLM_RETRY_BASE_DELAY', '0.5')),
+            max_delay=float(os.getenv('LLM_RETRY_MAX_DELAY', '8')),
+            hedge=os.getenv('LLM_HEDGE_ENABLED', 'false').lower() == 'true',
+            hedge_min_samples=int(os.getenv('LLM_HEDGE_MIN_SAMPLES', '20'))
+        )
+
+    def call(self, func: Callable[[float], Any], hedge: bool = True) -> Any:
+        """
+        Call the upstream with timeouts, retries and hedging
+
+        The circuit breakers are kept per backend by the router; `func`
+        raises CircuitOpenError when every backend's circuit is open.
+
+        Args:
+            func: Performs one attempt, given its timeout in seconds
+            hedge: Whether attempts may be hedged (off for streaming calls)
+
+        Returns:
+            Result of the first successful attempt
+
+        Raises:
+            CircuitOpenError: If the circuit of every backend is open
+            Exception: The last attempt's error once retries are exhausted
+        """
+        deadline = time.monotonic() + self.deadline
+        self._count("calls")
+        attempt = 0
+        while True:
+            timeout = self._before_attempt(deadline)
+            started = time.monotonic()
+            try:
+                if hedge and self._hedge_delay() is not None:
+                    result = self._hedged(func, timeout)
+                else:
+                    result = func(timeout)
+            except Exception as e:
+                delay = self._after_failure(e, attempt, deadline)
+                time.sleep(delay)
+                attempt += 1
+                continue
+            self._after_success(time.monotonic() - started)
+            return result
+
+    async def call_async(self, func: Callable[[float], Awaitable[Any]], hedge: bool = True) -> Any:
+        """Coroutine version of call; hedged attempts race as tasks and the loser is cancelled"""
+        deadline = time.monotonic() + self.deadline
+        self._count("calls")
+        attempt = 0
+        while True:
+            timeout = self._before_attempt(deadline)
+            started = time.monotonic()
+            try:
+                if hedge and self._hedge_delay() is not None:
+                    result = await self._hedged_async(func, timeout)
+                else:
+                    result = await func(timeout)
+            except Exception as e:
+                delay = self._after_failure(e, attempt, deadline)
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            self._after_success(time.monotonic() - started)
+            return result
+
+    def stats(self) -> Dict[str, Any]:
+        """Return counters and the current p95 latency"""
+        with self._lock:
+            stats: Dict[str, Any] = dict(self.counts)
+        p95 = self._p95()
+        stats["p95_ms"] = round(p95 * 1000, 1) if p95 is not None else None
+        return stats
+
+    def _before_attempt(self, deadline: float) -> float:
+        """Return the timeout of the next attempt"""
+        return max(0.001, min(self.attempt_timeout, deadline - time.monotonic()))
+
+    def _after_failure(self, error: Exception, attempt: int, deadline: float) -> float:
+        """Record a failed attempt and return the backoff, or re-raise when giving up"""
+        if isinstance(error, CircuitOpenError):
+            self._count("short_circuited")
+            raise error
+        retryable = is_retryable(error)
+        self._count("failures")
+
+        if not retryable or attempt >= self.max_retries:
+            raise error
+
+        # Full jitter keeps retrying clients from synchronizing
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        retry_after_delay = retry_after(error)
+        if retry_after_delay is not None:
+            delay = max(delay, min(retry_after_delay, self.max_delay))
+        if time.monotonic() + delay >= deadline:
+            raise error
+        self._count("retries")
+        return delay
+
+    def _after_success(self, latency: float) -> None:
+        with self._lock:
+            self._latencies.append(latency)
+
+    def _hedge_delay(self) -> Optional[float]:
+        """Seconds after which an attempt is hedged, None when hedging is off"""
+        if not self.hedge:
+            return None
+        with self._lock:
+            if len(self._latencies) < self.hedge_min_samples:
+                return None
+        return self._p95()
+
+    def _p95(self) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._latencies)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+
+    def _hedged(self, func: Callable[[float], Any], timeout: float) -> Any:
+        """
+        Run an attempt, starting a duplicate if it outlives the p95 latency
+
+        The duplicate needs a slot of its own: it is sent only if the request
+        has a spare one, which stays taken until the slower attempt, left to
+        finish in the background, is done. Both attempts run in a copy of the
+        caller's context, so stage timings and the request's slots carry over.
+        """
+        if self._hedge_executor is None:
+            with self._lock:
+                if self._hedge_executor is None:
+                    self._hedge_executor = ThreadPoolExecutor(max_workers=self._hedge_workers,
+                                                              thread_name_prefix='llm-hedge')
+        primary = self._hedge_executor.submit(contextvars.copy_context().run, func, timeout)
+        done, _ = wait([primary], timeout=self._hedge_delay())
+        if done:
+            return primary.result()
+
+        release = spare_llm_call()
+        if release is None:
+            self._count("hedges_skipped")
+            return primary.result()
+
+        self._count("hedges")
+        backup = self._hedge_executor.submit(contextvars.copy_context().run, func, timeout)
+        pending = {primary, backup}
+        error = None
+        try:
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future.exception() is None:
+                        if future is backup:
+                            self._count("hedge_wins")
+                        # The slower request cannot be interrupted and finishes in the background
+                        return future.result()
+                    error = future.exception()
+            raise error
+        finally:
+            _release_when_done(pending, release)
+
+    async def _hedged_async(self, func: Callable[[float], Awaitable[Any]], timeout: float) -> Any:
+        primary = asyncio.ensure_future(func(timeout))
+        done, _ = await asyncio.wait({primary}, timeout=self._hedge_delay())
+        if done:
+            return primary.result()
+
+        release = await spare_llm_call_async()
+        if release is None:
+            self._count("hedges_skipped")
+            return await primary
+
+        self._count("hedges")
+        backup = asyncio.ensure_future(func(timeout))
+        pending = {primary, backup}
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is backup:
+                            self._count("hedge_wins")
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+            _release_when_done(pending, release)
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.counts[name] += 1
+
+
+def _release_when_done(pending: set, release: Callable[[], None]) -> None:
+    """Release the hedge's slot once the attempt still running, if any, has finished"""
+    if not pending:
+        release()
+        return
+    next(iter(pending)).add_done_callback(lambda _: release())
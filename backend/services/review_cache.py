@@ -0,0 +1,360 @@
+"""
+Content-addressed cache for AI code reviews
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class ReviewCache:
+    def __init__(self, ttl: float = 3600, max_entries: int = 1024,
+                 max_bytes: int = 64 * 1024 * 1024, db_path: Optional[str] = None):
+        """
+        Initialize the review cache
+        
+        Args:
+            ttl: Time-to-live of an entry in seconds
+            max_entries: Maximum number of entries kept in memory
+            max_bytes: Maximum total payload size kept in memory
+            db_path: Path of the SQLite file for the persistent tier (optional)
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.db_path = db_path
+        
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        
+        self._db = None
+        self._db_lock = threading.Lock()
+        if db_path:
+            self._db = self._open_db(db_path)
+    
+    @classmethod
+    def from_env(cls) -> Optional['ReviewCache']:
+        """Build a cache from environment variables, or None when disabled"""
+        if os.getenv('REVIEW_CACHE_ENABLED', 'true').lower() in ('0', 'false', 'no'):
+            return None
+        
+        return cls(
+            ttl=float(os.getenv('REVIEW_CACHE_TTL', '3600')),
+            max_entries=int(os.getenv('REVIEW_CACHE_MAX_ENTRIES', '1024')),
+            max_bytes=int(os.getenv('REVIEW_CACHE_MAX_BYTES', str(64 * 1024 * 1024))),
+            db_path=os.getenv('REVIEW_CACHE_DB') or None
+        )
+    
+    @staticmethod
+    def make_key(code: str, language: str, model: str, prompt_version: str, temperature: float) -> str:
+        """
+        Build the content-addressed key of a review
+        
+        Args:
+            code: Source code under review
+            language: Programming language
+            model: Model name used for the review
+            prompt_version: Version of the prompt template
+            temperature: Sampling temperature
+        
+        Returns:
+            Hex digest identifying the review
+        """
+        digest = hashlib.sha256()
+        for part in (language, model, prompt_version, repr(float(temperature)), code):
+            data = part.encode('utf-8')
+            # Length-prefix every part so field boundaries can't be forged
+            digest.update(f"{len(data)}:".encode('ascii'))
+            digest.update(data)
+        return digest.hexdigest()
+    
+    def get(self, key: str) -> Optional[Tuple[Dict, str]]:
+        """
+        Look up a cached review
+        
+        Args:
+            key: Cache key from make_key
+        
+        Returns:
+            Tuple of (review, tier) where tier is "memory" or "disk", or None on a miss
+        """
+        now = time.time()
+        
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry['expires_at'] > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return json.loads(entry['payload']), 'memory'
+                self._remove(key)
+        
+        if self._db is not None:
+            row = self._db_get(key)
+            if row is not None:
+                language, model, created_at, expires_at, payload = row
+                if expires_at > now:
+                    with self._lock:
+                        self._insert(key, payload, language, model, created_at, expires_at)
+                        self.hits += 1
+                        self.disk_hits += 1
+                    return json.loads(payload), 'disk'
+                self._db_delete(key)
+        
+        with self._lock:
+            self.misses += 1
+        return None
+    
+    def set(self, key: str, review: Dict, language: str = '', model: str = '') -> None:
+        """
+        Store a review in the cache
+        
+        Args:
+            key: Cache key from make_key
+            review: Review result to store
+            language: Programming language (kept for inspection)
+            model: Model name (kept for inspection)
+        """
+        payload = json.dumps(review)
+        created_at = time.time()
+        expires_at = created_at + self.ttl
+        
+        with self._lock:
+            self._insert(key, payload, language, model, created_at, expires_at)
+        
+        if self._db is not None:
+            with self._db_lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO review_cache "
+                    "(key, language, model, created_at, expires_at, payload) VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, language, model, created_at, expires_at, payload)
+                )
+                self._db.commit()
+    
+    def invalidate(self, key: str) -> bool:
+        """
+        Remove a single entry from every tier
+        
+        Returns:
+            True if the entry existed
+        """
+        with self._lock:
+            found = key in self._entries
+            if found:
+                self._remove(key)
+        
+        if self._db is not None:
+            found = self._db_delete(key) or found
+        
+        return found
+    
+    def clear(self) -> int:
+        """
+        Remove every entry from every tier
+        
+        Returns:
+            Number of entries removed
+        """
+        with self._lock:
+            keys = set(self._entries)
+            self._entries.clear()
+            self._bytes = 0
+        
+        if self._db is not None:
+            with self._db_lock:
+                keys.update(row[0] for row in self._db.execute("SELECT key FROM review_cache"))
+                self._db.execute("DELETE FROM review_cache")
+                self._db.commit()
+        
+        return len(keys)
+    
+    def entries(self, limit: int = 100) -> List[Dict[str, Any]]:
+        """
+        List cached entries for inspection, most recently used first
+        
+        Args:
+            limit: Maximum number of entries to return
+        
+        Returns:
+            List of entry metadata dictionaries
+        """
+        now = time.time()
+        result = []
+        seen = set()
+        
+        with self._lock:
+            for key in reversed(self._entries):
+                if len(result) >= limit:
+                    break
+                entry = self._entries[key]
+                seen.add(key)
+                result.append(self._describe(key, entry['language'], entry['model'], entry['created_at'],
+                                             entry['expires_at'], len(entry['payload']), 'memory', now))
+        
+        if self._db is not None and len(result) < limit:
+            with self._db_lock:
+                rows = self._db.execute(
+                    "SELECT key, language, model, created_at, expires_at, LENGTH(payload) "
+                    "FROM review_cache ORDER BY created_at DESC LIMIT ?",
+                    (limit + len(seen),)
+                ).fetchall()
+            for key, language, model, created_at, expires_at, size in rows:
+                if len(result) >= limit:
+                    break
+                if key in seen:
+                    continue
+                result.append(self._describe(key, language, model, created_at, expires_at, size, 'disk', now))
+        
+        return result
+    
+    def contains(self, key: str) -> bool:
+        """Whether a review is cached and not expired, without counting a hit or touching LRU order"""
+        now = time.time()
+        
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry['expires_at'] > now:
+                return True
+        
+        if self._db is not None:
+            row = self._db_get(key)
+            return row is not None and row[3] > now
+        return False
+    
+    def get_entry(self, key: str) -> Optional[Dict[str, Any]]:
+        """Get metadata and payload of a single entry without touching LRU order"""
+        now = time.time()
+        
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                info = self._describe(key, entry['language'], entry['model'], entry['created_at'],
+                                      entry['expires_at'], len(entry['payload']), 'memory', now)
+                info['review'] = json.loads(entry['payload'])
+                return info
+        
+        if self._db is not None:
+            row = self._db_get(key)
+            if row is not None:
+                language, model, created_at, expires_at, payload = row
+                info = self._describe(key, language, model, created_at, expires_at, len(payload), 'disk', now)
+                info['review'] = json.loads(payload)
+                return info
+        
+        return None
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        with self._lock:
+            stats = {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "persistent": self._db is not None
+            }
+        
+        if self._db is not None:
+            with self._db_lock:
+                stats["disk_entries"] = self._db.execute("SELECT COUNT(*) FROM review_cache").fetchone()[0]
+        
+        return stats
+    
+    def reopen(self) -> None:
+        """
+        Open a new connection to the persistent tier
+        
+        SQLite connections must not be used across fork(); a worker process
+        forked from a parent that built the cache calls this first.
+        """
+        if self.db_path:
+            with self._db_lock:
+                self._db = self._open_db(self.db_path)
+    
+    def _insert(self, key: str, payload: str, language: str, model: str,
+                created_at: float, expires_at: float) -> None:
+        """Insert an entry into the memory tier and evict as needed (lock held)"""
+        if key in self._entries:
+            self._remove(key)
+        
+        # Payloads larger than the whole budget only live on disk
+        if len(payload) > self.max_bytes:
+            return
+        
+        self._entries[key] = {
+            "payload": payload,
+            "language": language,
+            "model": model,
+            "created_at": created_at,
+            "expires_at": expires_at
+        }
+        self._bytes += len(payload)
+        
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+    
+    def _remove(self, key: str) -> None:
+        """Remove an entry from the memory tier (lock held)"""
+        entry = self._entries.pop(key)
+        self._bytes -= len(entry['payload'])
+    
+    def _open_db(self, db_path: str) -> sqlite3.Connection:
+        """Open the persistent tier and drop expired rows"""
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        db = sqlite3.connect(db_path, check_same_thread=False)
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS review_cache ("
+            "key TEXT PRIMARY KEY, language TEXT, model TEXT, "
+            "created_at REAL, expires_at REAL, payload TEXT)"
+        )
+        db.execute("DELETE FROM review_cache WHERE expires_at <= ?", (time.time(),))
+        db.commit()
+        return db
+    
+    def _db_get(self, key: str) -> Optional[Tuple]:
+        with self._db_lock:
+            return self._db.execute(
+                "SELECT language, model, created_at, expires_at, payload FROM review_cache WHERE key = ?",
+                (key,)
+            ).fetchone()
+    
+    def _db_delete(self, key: str) -> bool:
+        with self._db_lock:
+            cursor = self._db.execute("DELETE FROM review_cache WHERE key = ?", (key,))
+            self._db.commit()
+            return cursor.rowcount > 0
+    
+    @staticmethod
+    def _describe(key: str, language: str, model: str, created_at: float, expires_at: float,
+                  size: int, tier: str, now: float) -> Dict[str, Any]:
+        return {
+            "key": key,
+            "language": language,
+            "model": model,
+            "created_at": created_at,
+            "expires_at": expires_at,
+            "expires_in": max(0.0, expires_at - now),
+            "size": size,
+            "tier": tier
+        }
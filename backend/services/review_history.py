@@ -0,0 +1,337 @@
+"""
+Persistent history of completed reviews
+"""
+
+import hashlib
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+# Filters accepted by query() and stats(), with the SQL condition each adds
+FILTERS = {
+    "language": "language = ?",
+    "content_hash": "content_hash = ?",
+    "kind": "kind = ?",
+    "min_score": "score >= ?",
+    "max_score": "score <= ?",
+    "since": "created_at >= ?",
+    "until": "created_at < ?",
+}
+
+_COLUMNS = ("id", "created_at", "content_hash", "language", "kind", "score", "quality_level", "total_lines",
+            "complexity", "main_issues", "improvements_needed", "model", "cache", "duration_ms", "timings")
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS reviews ("
+    "id INTEGER PRIMARY KEY AUTOINCREMENT, created_at REAL NOT NULL, content_hash TEXT NOT NULL, "
+    "language TEXT NOT NULL, kind TEXT NOT NULL, score REAL, quality_level TEXT, total_lines INTEGER, "
+    "complexity REAL, main_issues INTEGER, improvements_needed INTEGER, model TEXT, cache TEXT, "
+    "duration_ms REAL, timings TEXT)",
+    # Every listing is newest first, so each index ends with the row id
+    "CREATE INDEX IF NOT EXISTS reviews_hash ON reviews (content_hash, id)",
+    "CREATE INDEX IF NOT EXISTS reviews_language ON reviews (language, id)",
+    "CREATE INDEX IF NOT EXISTS reviews_score ON reviews (score, id)",
+    "CREATE INDEX IF NOT EXISTS reviews_created ON reviews (created_at)",
+)
+
+
+class ReviewHistory:
+    def __init__(self, db_path: str, batch_size: int = 200, flush_interval: float = 1.0,
+                 max_pending: int = 10000, retention_days: float = 0):
+        """
+        Initialize the review history
+
+        Recording a review only puts a row on an in-memory queue; a
+        background thread writes queued rows in batches, one transaction
+        per batch. The database runs in WAL mode, so queries on their own
+        connections are not blocked by the writer.
+
+        Args:
+            db_path: Path of the SQLite file
+            batch_size: Maximum number of rows written per transaction
+            flush_interval: Longest a recorded row waits before it is written, in seconds
+            max_pending: Rows queued beyond which new rows are dropped
+            retention_days: Age after which rows are deleted, 0 to keep them
+        """
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.retention_days = retention_days
+
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_pending)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._writer: Optional[threading.Thread] = None
+        self._writer_pid: Optional[int] = None
+
+        self.recorded = 0
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self.write_errors = 0
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        db = self._connect()
+        for statement in _SCHEMA:
+            db.execute(statement)
+        db.commit()
+        db.close()
+
+    @classmethod
+    def from_env(cls) -> Optional['ReviewHistory']:
+        """Build a review history from environment variables, or None unless REVIEW_HISTORY_DB is set"""
+        db_path = os.getenv('REVIEW_HISTORY_DB')
+        if not db_path:
+            return None
+
+        return cls(
+            db_path=db_path,
+            batch_size=int(os.getenv('REVIEW_HISTORY_BATCH_SIZE', '200')),
+            flush_interval=float(os.getenv('REVIEW_HISTORY_FLUSH_INTERVAL', '1.0')),
+            max_pending=int(os.getenv('REVIEW_HISTORY_MAX_PENDING', '10000')),
+            retention_days=float(os.getenv('REVIEW_HISTORY_RETENTION_DAYS', '0'))
+        )
+
+    def record(self, code: str, language: str, result: Dict[str, Any], kind: str = 'review',
+               duration: Optional[float] = None, timings: Optional[Dict[str, float]] = None) -> bool:
+        """
+        Queue a completed review for writing
+
+        The content hash and the row are built on the writer thread, so the
+        request only pays for the queue put.
+
+        Args:
+            code: Reviewed source code
+            language: Programming language
+            result: Review result from CodeReviewer
+            kind: How the review was produced ("review", "diff", "stream")
+            duration: Review duration in seconds (optional)
+            timings: Stage durations in milliseconds (optional)
+
+        Returns:
+            False if the queue was full and the review was dropped
+        """
+        self._ensure_writer()
+        try:
+            self._queue.put_nowait((time.time(), code, language, result, kind, duration, timings))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+        with self._lock:
+            self.recorded += 1
+        return True
+
+    def flush(self, timeout: float = 10) -> bool:
+        """
+        Wait until every row queued so far is written
+
+        Returns:
+            True if the rows were written within the timeout
+        """
+        self._ensure_writer()
+        done = threading.Event()
+        self._queue.put(done, timeout=timeout)
+        return done.wait(timeout)
+
+    def query(self, filters: Optional[Dict[str, Any]] = None, limit: int = 50,
+              cursor: Optional[int] = None) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """
+        List recorded reviews, newest first
+
+        Pages are keyed by row id rather than offset, so a page costs the
+        same however deep it is and rows written in between don't shift it.
+
+        Args:
+            filters: Values for the keys of FILTERS (optional)
+            limit: Maximum number of rows returned
+            cursor: next_cursor of the previous page (optional)
+
+        Returns:
+            Tuple of (rows, next_cursor), next_cursor None on the last page
+        """
+        conditions, params = self._where(filters)
+        if cursor is not None:
+            conditions.append("id < ?")
+            params.append(cursor)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        rows = self._db().execute(
+            f"SELECT {', '.join(_COLUMNS)} FROM reviews{where} ORDER BY id DESC LIMIT ?",
+            params + [limit + 1]
+        ).fetchall()
+
+        next_cursor = rows[limit - 1][0] if len(rows) > limit else None
+        return [self._describe(row) for row in rows[:limit]], next_cursor
+
+    def get(self, entry_id: int) -> Optional[Dict[str, Any]]:
+        """Get a single recorded review"""
+        row = self._db().execute(f"SELECT {', '.join(_COLUMNS)} FROM reviews WHERE id = ?", (entry_id,)).fetchone()
+        return self._describe(row) if row is not None else None
+
+    def stats(self, filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Aggregate recorded reviews per language
+
+        Args:
+            filters: Values for the keys of FILTERS (optional)
+
+        Returns:
+            Dictionary with totals and per-language count, average score and duration
+        """
+        conditions, params = self._where(filters)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        rows = self._db().execute(
+            f"SELECT language, COUNT(*), AVG(score), AVG(duration_ms) FROM reviews{where} "
+            "GROUP BY language ORDER BY COUNT(*) DESC",
+            params
+        ).fetchall()
+
+        languages = [
+            {"language": language, "reviews": count,
+             "average_score": round(score, 2) if score is not None else None,
+             "average_duration_ms": round(duration, 1) if duration is not None else None}
+            for language, count, score, duration in rows
+        ]
+        return {"reviews": sum(item["reviews"] for item in languages), "languages": languages}
+
+    def writer_stats(self) -> Dict[str, Any]:
+        """Counters of the background writer"""
+        with self._lock:
+            return {
+                "recorded": self.recorded,
+                "written": self.written,
+                "dropped": self.dropped,
+                "batches": self.batches,
+                "write_errors": self.write_errors,
+                "pending": self._queue.qsize()
+            }
+
+    def reopen(self) -> None:
+        """
+        Forget connections and the writer inherited across fork()
+
+        Neither SQLite connections nor threads survive fork(); both are
+        created again on first use in the new process.
+        """
+        self._local = threading.local()
+        self._writer = None
+        self._writer_pid = None
+        self._queue = queue.Queue(maxsize=self.max_pending)
+
+    def _ensure_writer(self) -> None:
+        pid = os.getpid()
+        if self._writer_pid == pid:
+            return
+        with self._lock:
+            if self._writer_pid != pid:
+                self._writer = threading.Thread(target=self._write_loop, name='review-history', daemon=True)
+                self._writer.start()
+                self._writer_pid = pid
+
+    def _write_loop(self) -> None:
+        db = self._connect()
+        pruned_at = 0.0
+        while True:
+            items = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            # Gather a batch, waiting at most flush_interval for the first row of it
+            while len(items) < self.batch_size and not isinstance(items[-1], threading.Event):
+                remaining = deadline - time.monotonic()
+                try:
+                    items.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            rows = [self._row(*item) for item in items if not isinstance(item, threading.Event)]
+            if rows:
+                try:
+                    with db:
+                        db.executemany(
+                            f"INSERT INTO reviews ({', '.join(_COLUMNS[1:])}) "
+                            f"VALUES ({', '.join('?' * (len(_COLUMNS) - 1))})",
+                            rows
+                        )
+                    with self._lock:
+                        self.written += len(rows)
+                        self.batches += 1
+                except sqlite3.Error as e:
+                    print(f"⚠️  Warning: Failed to write {len(rows)} review history rows: {e}")
+                    with self._lock:
+                        self.write_errors += 1
+
+            if self.retention_days and time.time() - pruned_at > 3600:
+                pruned_at = time.time()
+                try:
+                    with db:
+                        db.execute("DELETE FROM reviews WHERE created_at < ?",
+                                   (pruned_at - self.retention_days * 86400,))
+                except sqlite3.Error as e:
+                    print(f"⚠️  Warning: Failed to prune review history: {e}")
+
+            for item in items:
+                if isinstance(item, threading.Event):
+                    item.set()
+
+    @staticmethod
+    def _row(created_at: float, code: str, language: str, result: Dict[str, Any], kind: str,
+             duration: Optional[float], timings: Optional[Dict[str, float]]) -> Tuple:
+        summary = result.get('summary', {})
+        ai_review = result.get('ai_review', {})
+        cache = ai_review.get('cache')
+        return (
+            created_at,
+            hashlib.sha256(code.encode('utf-8')).hexdigest(),
+            language,
+            kind,
+            summary.get('overall_score'),
+            summary.get('quality_level'),
+            result.get('metrics', {}).get('total_lines'),
+            summary.get('complexity'),
+            summary.get('main_issues'),
+            summary.get('improvements_needed'),
+            ai_review.get('model'),
+            cache.get('status') if isinstance(cache, dict) else None,
+            round(duration * 1000, 3) if duration is not None else None,
+            json.dumps(timings) if timings else None
+        )
+
+    @staticmethod
+    def _where(filters: Optional[Dict[str, Any]]) -> Tuple[List[str], List[Any]]:
+        conditions, params = [], []
+        for name, value in (filters or {}).items():
+            if value is None:
+                continue
+            if name not in FILTERS:
+                raise ValueError(f"Unknown filter: {name}")
+            conditions.append(FILTERS[name])
+            params.append(value)
+        return conditions, params
+
+    def _db(self) -> sqlite3.Connection:
+        """Connection of the calling thread, opened on first use"""
+        pid = os.getpid()
+        db = getattr(self._local, 'db', None)
+        if db is None or self._local.pid != pid:
+            db = self._local.db = self._connect()
+            self._local.pid = pid
+        return db
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self.db_path, timeout=5)
+        db.execute("PRAGMA journal_mode=WAL")
+        # Durable across application crashes; only a power loss may lose the last batches
+        db.execute("PRAGMA synchronous=NORMAL")
+        return db
+
+    @staticmethod
+    def _describe(row: Tuple) -> Dict[str, Any]:
+        entry = dict(zip(_COLUMNS, row))
+        entry["timings"] = json.loads(entry["timings"]) if entry["timings"] else None
+        return entry
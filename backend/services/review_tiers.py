@@ -0,0 +1,172 @@
+"""
+Review tiers: local metrics only, a light model review or the full review
+"""
+
+import os
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from .python_analyzer import HOTSPOT_COMPLEXITY
+
+# Tiers, cheapest first; AUTO picks one from the code's metrics
+AUTO = "auto"
+METRICS = "metrics"
+LIGHT = "light"
+FULL = "full"
+TIERS = (METRICS, LIGHT, FULL)
+
+# Nesting depth beyond which a function is reported by a metrics-only review
+DEEP_NESTING = 4
+
+
+def code_lines(metrics: Dict[str, Any]) -> int:
+    """Lines holding code rather than only comments or whitespace"""
+    return max(0, metrics.get('non_empty_lines', 0) - metrics.get('comment_lines', 0))
+
+
+class TierPolicy:
+    def __init__(self, default_tier: str = AUTO, metrics_max_lines: int = 10, metrics_max_complexity: int = 3,
+                 light_max_lines: int = 80, light_max_complexity: int = HOTSPOT_COMPLEXITY, samples: int = 500):
+        """
+        Initialize the tier policy
+
+        With "auto" the tier follows from the local metrics: code with no
+        more than metrics_max_lines lines of code and no function above
+        metrics_max_complexity gets a metrics-only review, code within the
+        light limits a light model review, and everything else the full
+        review. The complexity is the highest cyclomatic complexity of a
+        function where the syntax tree is available and the counter-based
+        complexity score otherwise. Python code that doesn't parse always
+        goes to a model.
+
+        Args:
+            default_tier: Tier of requests that don't ask for one
+            metrics_max_lines: Lines of code up to which a metrics-only review is enough
+            metrics_max_complexity: Complexity up to which a metrics-only review is enough
+            light_max_lines: Lines of code up to which a light review is enough
+            light_max_complexity: Complexity up to which a light review is enough
+            samples: Latest review durations kept per tier for the statistics
+        """
+        self.default_tier = default_tier
+        self.metrics_max_lines = metrics_max_lines
+        self.metrics_max_complexity = metrics_max_complexity
+        self.light_max_lines = light_max_lines
+        self.light_max_complexity = light_max_complexity
+
+        self._lock = threading.Lock()
+        self._durations: Dict[str, Deque[float]] = {tier: deque(maxlen=samples) for tier in TIERS}
+        self.counts = {tier: 0 for tier in TIERS}
+
+    @classmethod
+    def from_env(cls) -> 'TierPolicy':
+        """Build the tier policy from environment variables"""
+        return cls(
+            default_tier=os.getenv('REVIEW_DEFAULT_TIER', AUTO),
+            metrics_max_lines=int(os.getenv('REVIEW_TIER_METRICS_MAX_LINES', '10')),
+            metrics_max_complexity=int(os.getenv('REVIEW_TIER_METRICS_MAX_COMPLEXITY', '3')),
+            light_max_lines=int(os.getenv('REVIEW_TIER_LIGHT_MAX_LINES', '80')),
+            light_max_complexity=int(os.getenv('REVIEW_TIER_LIGHT_MAX_COMPLEXITY', str(HOTSPOT_COMPLEXITY)))
+        )
+
+    def select(self, requested: Optional[str], metrics: Dict[str, Any], language: str) -> Tuple[str, str]:
+        """
+        Choose the tier of a review
+
+        Args:
+            requested: Tier asked for, None or "auto" to decide from the metrics
+            metrics: Local metrics of the code
+            language: Programming language
+
+        Returns:
+            Tuple of (tier, reason)
+        """
+        requested = requested or self.default_tier
+        if requested in TIERS:
+            return requested, "requested"
+
+        lines = code_lines(metrics)
+        if lines == 0:
+            return METRICS, "no code besides comments and blank lines"
+        if language == 'python' and metrics.get('analyzer') != 'ast':
+            return FULL, "code does not parse"
+
+        complexity = metrics.get('max_complexity', metrics.get('complexity_score', 0))
+        if lines <= self.metrics_max_lines and complexity <= self.metrics_max_complexity:
+            return METRICS, f"{lines} lines of code, complexity {complexity}"
+        if lines <= self.light_max_lines and complexity <= self.light_max_complexity:
+            return LIGHT, f"{lines} lines of code, complexity {complexity}"
+        return FULL, f"{lines} lines of code, complexity {complexity}"
+
+    def record(self, tier: str, seconds: float) -> None:
+        """Count a finished review of a tier and its duration"""
+        with self._lock:
+            self.counts[tier] += 1
+            self._durations[tier].append(seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        """Reviews per tier and their latency over the latest samples"""
+        with self._lock:
+            tiers = {}
+            for tier in TIERS:
+                durations = sorted(self._durations[tier])
+                tiers[tier] = {
+                    "reviews": self.counts[tier],
+                    "p50_ms": self._percentile_ms(durations, 0.5),
+                    "p95_ms": self._percentile_ms(durations, 0.95)
+                }
+        total = sum(self.counts.values())
+        for tier in TIERS:
+            tiers[tier]["share"] = round(tiers[tier]["reviews"] / total, 3) if total else 0.0
+        return {
+            "default_tier": self.default_tier,
+            "thresholds": {
+                "metrics_max_lines": self.metrics_max_lines,
+                "metrics_max_complexity": self.metrics_max_complexity,
+                "light_max_lines": self.light_max_lines,
+                "light_max_complexity": self.light_max_complexity
+            },
+            "tiers": tiers
+        }
+
+    @staticmethod
+    def _percentile_ms(durations: List[float], fraction: float) -> Optional[float]:
+        if not durations:
+            return None
+        return round(durations[min(len(durations) - 1, int(len(durations) * fraction))] * 1000, 1)
+
+
+def metrics_review(metrics: Dict[str, Any], language: str) -> Dict[str, Any]:
+    """
+    Review built from the local metrics alone, in the shape of an AI review
+
+    Args:
+        metrics: Local metrics of the code
+        language: Programming language
+
+    Returns:
+        Dictionary with the fields of an AI review; model is None
+    """
+    issues = []
+    improvements = []
+    for function in metrics.get('complex_functions', []):
+        if function['complexity'] > HOTSPOT_COMPLEXITY:
+            issues.append(f"Function {function['name']} (line {function['line']}) has cyclomatic complexity "
+                          f"{function['complexity']}")
+        if function['nesting_depth'] > DEEP_NESTING:
+            improvements.append(f"Reduce the nesting depth of {function['name']} (line {function['line']}), "
+                                f"currently {function['nesting_depth']}")
+
+    lines = code_lines(metrics)
+    return {
+        "score": max(1, min(10, 10 - metrics.get('complexity_score', 0) // 2 - len(issues))),
+        "quality_assessment": f"Local metrics only: {lines} lines of {language} code, "
+                              f"{metrics.get('function_count', 0)} functions or classes. "
+                              "Request the light or full tier for a model review.",
+        "issues": issues,
+        "performance": "",
+        "security": [],
+        "best_practices": [],
+        "improvements": improvements,
+        "model": None
+    }
@@ -0,0 +1,106 @@
+"""
+Coalescing of concurrent identical calls
+"""
+
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+
+class _Call:
+    """A call in flight that later callers wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Run at most one call per key at a time
+
+    A caller arriving while a call with the same key is in flight waits for
+    it and receives its result (or exception) instead of starting another.
+    Results are shared, not copied; callers that mutate them must copy first.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self._tasks: Dict[str, asyncio.Future] = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key: str, func: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Call func, or wait for the in-flight call with the same key
+
+        Args:
+            key: Identity of the call
+            func: Function performing the call
+
+        Returns:
+            Tuple of (result, whether it was shared from another caller's call)
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executed += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = func()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    async def do_async(self, key: str, func: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        Await func, or the in-flight call with the same key
+
+        The call runs as its own task, so a caller that is cancelled (for
+        example because its client disconnected) does not cancel it for the
+        other callers waiting on it.
+
+        Args:
+            key: Identity of the call
+            func: Coroutine function performing the call
+
+        Returns:
+            Tuple of (result, whether it was shared from another caller's call)
+        """
+        task = self._tasks.get(key)
+        shared = task is not None
+        with self._lock:
+            if shared:
+                self.coalesced += 1
+            else:
+                self.executed += 1
+        if not shared:
+            task = self._tasks[key] = asyncio.ensure_future(func())
+            task.add_done_callback(lambda _: self._tasks.pop(key, None))
+        return await asyncio.shield(task), shared
+
+    def stats(self) -> Dict[str, int]:
+        """Return call counters; "coalesced" is the number of calls saved"""
+        with self._lock:
+            return {
+                "in_flight": len(self._calls) + len(self._tasks),
+                "executed": self.executed,
+                "coalesced": self.coalesced
+            }
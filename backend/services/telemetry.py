@@ -0,0 +1,247 @@
+"""
+Stage timers and Prometheus-format metrics
+"""
+
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+# Latency buckets in seconds, from cache hits to slow LLM round trips
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Tuple[str, ...], values: LabelValues, extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = 'untyped'
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in values]
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [per-bucket counts..., +Inf count], sum
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = ([0] * (len(self.buckets) + 1), [0.0])
+            entry[0][index] += 1
+            entry[1][0] += value
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = sorted((key, (list(counts), total[0])) for key, (counts, total) in self._values.items())
+        lines = []
+        for key, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class CallbackMetric(_Metric):
+    """Metric read from existing state when scraped"""
+
+    def __init__(self, name: str, help_text: str, kind: str = 'gauge', labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, help_text, labelnames)
+        self.kind = kind
+        self._functions: List[Tuple[LabelValues, Callable[[], Optional[float]]]] = []
+
+    def set_function(self, func: Callable[[], Optional[float]], **labels: str) -> None:
+        """Report the value func returns for the given labels; None values are skipped"""
+        key = self._key(labels)
+        with self._lock:
+            self._functions = [(k, f) for k, f in self._functions if k != key] + [(key, func)]
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            functions = list(self._functions)
+        lines = []
+        for key, func in functions:
+            value = func()
+            if value is not None:
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, help_text, labelnames))
+
+    def histogram(self, name: str, help_text: str, labelnames: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, labelnames, buckets))
+
+    def callback(self, name: str, help_text: str, kind: str = 'gauge',
+                 labelnames: Tuple[str, ...] = ()) -> CallbackMetric:
+        return self._register(CallbackMetric(name, help_text, kind, labelnames))
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    def _register(self, metric: _Metric) -> _Metric:
+        # Registering twice returns the existing metric, so modules can be reloaded
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    'review_stage_duration_seconds', 'Latency of review pipeline stages', ('stage',))
+REVIEWS = REGISTRY.counter(
+    'ai_reviews_total', 'AI reviews by cache status (hit, miss, bypass)', ('cache_status',))
+MOCK_REVIEWS = REGISTRY.counter(
+    'ai_mock_reviews_total', 'Mock reviews returned instead of an AI answer')
+LLM_TOKENS = REGISTRY.counter(
+    'llm_tokens_total', 'Tokens billed by the LLM API', ('kind',))
+LLM_IN_FLIGHT = REGISTRY.callback(
+    'llm_in_flight_calls', 'LLM calls currently in flight', 'gauge', ('path',))
+REVIEW_TIERS = REGISTRY.counter(
+    'review_tiers_total', 'Reviews by requested and selected tier', ('requested', 'tier'))
+REVIEW_TIER_SECONDS = REGISTRY.histogram(
+    'review_tier_duration_seconds', 'Review latency by selected tier', ('tier',))
+HTTP_REQUESTS = REGISTRY.counter(
+    'http_requests_total', 'HTTP requests by endpoint, method and status', ('endpoint', 'method', 'status'))
+HTTP_DURATION = REGISTRY.histogram(
+    'http_request_duration_seconds', 'HTTP request latency by endpoint', ('endpoint',))
+
+
+class Timings:
+    """Stage durations of one request, summed when a stage runs more than once"""
+
+    def __init__(self):
+        self._stages: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self._stages[stage] = self._stages.get(stage, 0.0) + seconds
+
+    def as_dict(self) -> Dict[str, float]:
+        """Stage durations in milliseconds"""
+        with self._lock:
+            return {stage: round(seconds * 1000, 3) for stage, seconds in self._stages.items()}
+
+
+_current_timings: contextvars.ContextVar = contextvars.ContextVar('review_timings', default=None)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time a pipeline stage into the stage histogram and the request's timings"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, stage=name)
+        timings = _current_timings.get()
+        if timings is not None:
+            timings.add(name, elapsed)
+
+
+@contextmanager
+def collect_timings(enabled: bool = True) -> Iterator[Optional[Timings]]:
+    """
+    Collect the stage durations of the code run inside the block
+
+    Work handed to other threads is included when it runs in a copy of the
+    current context (see contextvars.copy_context).
+
+    Args:
+        enabled: Whether to collect, so callers need no separate code path
+
+    Yields:
+        The Timings being collected, None when disabled
+    """
+    if not enabled:
+        yield None
+        return
+    timings = Timings()
+    token = _current_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _current_timings.reset(token)
+
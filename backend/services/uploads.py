@@ -0,0 +1,119 @@
+"""
+Read reviewable source files from an uploaded file or project archive
+"""
+
+import os
+import tarfile
+import zipfile
+from typing import BinaryIO, Callable, Dict, Iterator, Optional, Tuple
+
+from utils.validators import (EXCLUDED_DIRECTORIES, MAX_FILE_SIZE, TAR_EXTENSIONS, ZIP_EXTENSIONS,
+                              language_for_filename, validate_file_upload)
+
+
+def archive_format(filename: str) -> Optional[str]:
+    """"zip" or "tar" for an archive name, None for a single file"""
+    name = filename.lower()
+    if name.endswith(ZIP_EXTENSIONS):
+        return "zip"
+    if name.endswith(TAR_EXTENSIONS):
+        return "tar"
+    return None
+
+
+def check_archive(stream: BinaryIO, filename: str) -> Optional[str]:
+    """
+    Check that an uploaded archive can be read, before its files are streamed
+
+    Args:
+        stream: Uploaded file, seekable
+        filename: Name of the uploaded file
+
+    Returns:
+        Error message, None for readable archives and single files
+    """
+    kind = archive_format(filename)
+    if kind is None:
+        return None
+    valid = zipfile.is_zipfile(stream) if kind == "zip" else tarfile.is_tarfile(stream)
+    stream.seek(0)
+    return None if valid else f"Invalid {kind} archive: {filename}"
+
+
+def iter_upload_files(stream: BinaryIO, filename: str, max_files: int) -> Iterator[Dict]:
+    """
+    Yield the files of an upload one at a time
+
+    A single file is yielded as it is. The entries of a zip or tar archive
+    with a reviewable extension, outside EXCLUDED_DIRECTORIES, are read one
+    after another, so only one entry is held in memory at a time however
+    large the archive is. Tar archives are read as a stream; zip archives
+    need a seekable stream for their central directory. At most
+    MAX_FILE_SIZE + 1 bytes are read from any entry, whatever size its
+    header claims, so oversized entries are rejected by
+    validate_file_upload without being decompressed in full.
+
+    Args:
+        stream: Uploaded file
+        filename: Name of the uploaded file
+        max_files: Files of an archive after which the rest is not read
+
+    Yields:
+        Dictionaries with path and, for reviewable files, language and code;
+        files that cannot be reviewed carry "skipped", or success False and
+        an "error", instead
+    """
+    kind = archive_format(filename)
+    if kind is None:
+        yield _read_file(filename, stream)
+        return
+
+    entries = _zip_entries(stream) if kind == "zip" else _tar_entries(stream)
+    reviewable = 0
+    for path, open_entry in entries:
+        # Like the repository scan, other files are left out without a result
+        if not language_for_filename(path) or _excluded(path):
+            continue
+        if reviewable >= max_files:
+            yield {"path": path, "skipped": f"More than {max_files} files, the rest of the archive is not reviewed"}
+            return
+        reviewable += 1
+        with open_entry() as entry:
+            file = _read_file(path, entry)
+        yield file
+
+
+def _excluded(path: str) -> bool:
+    """Whether an archive entry lies in a directory that is never reviewed"""
+    return any(part in EXCLUDED_DIRECTORIES for part in path.split('/')[:-1])
+
+
+def _zip_entries(stream: BinaryIO) -> Iterator[Tuple[str, Callable[[], BinaryIO]]]:
+    """(path, open) of the regular files of a zip archive"""
+    with zipfile.ZipFile(stream) as archive:
+        for info in archive.infolist():
+            if not info.is_dir():
+                yield info.filename, lambda info=info: archive.open(info)
+
+
+def _tar_entries(stream: BinaryIO) -> Iterator[Tuple[str, Callable[[], BinaryIO]]]:
+    """(path, open) of the regular files of a tar archive, read as a stream"""
+    with tarfile.open(fileobj=stream, mode='r|*') as archive:
+        for member in archive:
+            if member.isfile():
+                yield member.name, lambda member=member: archive.extractfile(member)
+
+
+def _read_file(path: str, stream: BinaryIO) -> Dict:
+    """Read and validate one file, decoding it as UTF-8 text"""
+    data = stream.read(MAX_FILE_SIZE + 1)
+    validation = validate_file_upload(data, os.path.basename(path))
+    if not validation['valid']:
+        return {"path": path, "success": False, "error": validation['message']}
+    try:
+        code = data.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        return {"path": path, "success": False, "error": "File is not UTF-8 text"}
+    if not code.strip():
+        return {"path": path, "skipped": "Empty file"}
+    return {"path": path, "language": language_for_filename(path), "code": code}
@@ -2,8 +2,29 @@
 Response helper utilities
 """
 
-from typing import Any, Dict, Optional
-from flask import jsonify
+import json
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Callable, Dict, Optional, Tuple
+from werkzeug.datastructures import MIMEAccept
+from werkzeug.http import parse_accept_header
+
+try:
+    import orjson
+except ImportError:
+    # Optional dependency; the standard json module is used instead
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    # Optional dependency; responses are always JSON without it
+    msgpack = None
+
+JSON_MIMETYPE = 'application/json'
+MSGPACK_MIMETYPE = 'application/msgpack'
+# Also accepted in Accept headers; older clients use the unregistered name
+_MSGPACK_MIMETYPES = (MSGPACK_MIMETYPE, 'application/x-msgpack')
 
 def create_response(success: bool, message: str, data: Optional[Any] = None) -> Dict[str, Any]:
     """
@@ -60,6 +81,19 @@ def create_success_response(message: str, data: Optional[Any] = None) -> Dict[st
     """
     return create_response(True, message, data)
 
+def format_sse(event: str, data: Any) -> str:
+    """
+    Format a Server-Sent Events message
+    
+    Args:
+        event: Event name
+        data: JSON-serializable event payload
+        
+    Returns:
+        SSE message string
+    """
+    return f"event: {event}\ndata: {encode_json(data).decode('utf-8')}\n\n"
+
 def get_current_timestamp() -> str:
     """
     Get current timestamp in ISO format
@@ -67,9 +101,120 @@ def get_current_timestamp() -> str:
     Returns:
         Current timestamp string
     """
-    from datetime import datetime
     return datetime.utcnow().isoformat() + "Z"
 
+def encode_json(data: Any, sort_keys: bool = False, default: Optional[Callable[[Any], Any]] = None) -> bytes:
+    """
+    Serialize data as compact UTF-8 JSON
+    
+    Uses orjson when it is installed, and the standard json module for
+    values orjson rejects (such as integers wider than 64 bits).
+    
+    Args:
+        data: JSON-serializable value
+        sort_keys: Whether to sort object keys
+        default: Function converting values of other types (optional)
+    
+    Returns:
+        Encoded JSON
+    """
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_SORT_KEYS if sort_keys else 0)
+        try:
+            return orjson.dumps(data, default=default, option=option)
+        except TypeError:
+            pass
+    return json.dumps(data, sort_keys=sort_keys, default=default, ensure_ascii=False,
+                      separators=(',', ':')).encode('utf-8')
+
+def encode_response(payload: Any, accept: Optional[str] = None, fields: Optional[str] = None,
+                    sort_keys: bool = False, default: Optional[Callable[[Any], Any]] = None) -> Tuple[bytes, str]:
+    """
+    Encode an API response in the format the client asked for
+    
+    Args:
+        payload: Response dictionary from create_response
+        accept: Accept header of the request (optional); MessagePack is used
+            when it is preferred over JSON and msgpack is installed
+        fields: Field selection applied to the response data (optional), see select_fields
+        sort_keys: Whether to sort JSON object keys
+        default: Function converting values of other types (optional)
+    
+    Returns:
+        Tuple of (body, mimetype)
+    """
+    if fields and isinstance(payload, dict) and payload.get('data') is not None:
+        payload = dict(payload, data=select_fields(payload['data'], fields))
+    
+    if accept and msgpack is not None and 'msgpack' in accept and _prefers_msgpack(accept):
+        return msgpack.packb(payload, default=default), MSGPACK_MIMETYPE
+    
+    return encode_json(payload, sort_keys, default), JSON_MIMETYPE
+
+@lru_cache(maxsize=64)
+def _prefers_msgpack(accept: str) -> bool:
+    # Clients send the same few Accept headers, and parsing one takes ~20us
+    accepted = parse_accept_header(accept, MIMEAccept)
+    return accepted.best_match((JSON_MIMETYPE,) + _MSGPACK_MIMETYPES) in _MSGPACK_MIMETYPES
+
+def select_fields(data: Any, fields: str) -> Any:
+    """
+    Keep or drop fields of response data
+    
+    Paths are dotted keys such as "ai_review.ai_response" and reach into
+    every element of a list, so "results.review.metrics" applies to each
+    item of a batch. Fields that are not selected are left out without
+    copying the rest of the data.
+    
+    Args:
+        data: Response data
+        fields: Comma-separated paths; paths starting with "-" are left out,
+            and when other paths are given only those are kept
+    
+    Returns:
+        Data with the selection applied
+    """
+    include: Dict[str, Any] = {}
+    exclude: Dict[str, Any] = {}
+    for path in fields.split(','):
+        path = path.strip()
+        tree = include
+        if path.startswith('-'):
+            path, tree = path[1:], exclude
+        parts = [part for part in path.split('.') if part]
+        if not parts:
+            continue
+        for part in parts[:-1]:
+            node = tree.get(part)
+            if node is True:
+                break
+            tree = tree.setdefault(part, {})
+        else:
+            tree[parts[-1]] = True
+    
+    return _select(data, include or None, exclude or None)
+
+def _select(value: Any, include: Optional[Dict[str, Any]], exclude: Optional[Dict[str, Any]]) -> Any:
+    if isinstance(value, list):
+        return [_select(item, include, exclude) for item in value]
+    if not isinstance(value, dict):
+        return value
+    
+    selected = {}
+    for key, item in value.items():
+        key_exclude = exclude.get(key) if exclude else None
+        if key_exclude is True:
+            continue
+        key_include = None
+        if include is not None:
+            if key not in include:
+                continue
+            if include[key] is not True:
+                key_include = include[key]
+        selected[key] = item if key_include is None and key_exclude is None \
+            else _select(item, key_include, key_exclude)
+    return selected
+
 def format_code_metrics(metrics: Dict[str, Any]) -> Dict[str, Any]:
     """
     Format code metrics for response
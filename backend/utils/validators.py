@@ -2,14 +2,42 @@
 Input validation utilities
 """
 
-from typing import Dict, Any
+import os
+from typing import Dict, Any, Optional
 
-def validate_code_input(data: Dict[str, Any]) -> Dict[str, Any]:
+# Maximum code length sent to the AI in a single request
+MAX_CODE_LENGTH = 10000
+
+# Review tiers a request may ask for
+REVIEW_TIERS = ('auto', 'metrics', 'light', 'full')
+
+# Maximum size of an uploaded file in bytes
+MAX_FILE_SIZE = 1024 * 1024
+
+# Reviewable file extensions and the language they are reviewed as
+EXTENSION_LANGUAGES = {
+    '.py': 'python', '.js': 'javascript', '.ts': 'typescript', '.java': 'java',
+    '.cpp': 'cpp', '.cc': 'cpp', '.cxx': 'cpp', '.cs': 'csharp', '.go': 'go',
+    '.rs': 'rust', '.php': 'php', '.rb': 'ruby', '.html': 'html', '.css': 'css'
+}
+ALLOWED_EXTENSIONS = tuple(EXTENSION_LANGUAGES)
+
+# Directories that never hold reviewable first-party code
+EXCLUDED_DIRECTORIES = ('.git', '.hg', '.svn', 'node_modules', '__pycache__', '.venv', 'venv',
+                        '.tox', '.mypy_cache', '.pytest_cache', 'dist', 'build', 'target', 'vendor')
+
+# Project archives whose reviewable entries are reviewed one by one
+ZIP_EXTENSIONS = ('.zip',)
+TAR_EXTENSIONS = ('.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tbz2', '.tar.xz', '.txz')
+ARCHIVE_EXTENSIONS = ZIP_EXTENSIONS + TAR_EXTENSIONS
+
+def validate_code_input(data: Dict[str, Any], max_length: int = MAX_CODE_LENGTH) -> Dict[str, Any]:
     """
     Validate code review input data
     
     Args:
         data: Input data dictionary
+        max_length: Maximum code length in characters
         
     Returns:
         Dictionary with validation result
@@ -27,8 +55,8 @@ def validate_code_input(data: Dict[str, Any]) -> Dict[str, Any]:
     if not code.strip():
         return {"valid": False, "message": "Code cannot be empty"}
     
-    if len(code) > 10000:
-        return {"valid": False, "message": "Code is too long (max 10,000 characters)"}
+    if len(code) > max_length:
+        return {"valid": False, "message": f"Code is too long (max {max_length:,} characters)"}
     
     # Validate language if provided
     if 'language' in data:
@@ -44,8 +72,104 @@ def validate_code_input(data: Dict[str, Any]) -> Dict[str, Any]:
         if language.lower() not in supported_languages:
             return {"valid": False, "message": f"Unsupported language: {language}"}
     
+    # null means the same as leaving the tier out
+    if data.get('tier') is not None and data['tier'] not in REVIEW_TIERS:
+        return {"valid": False, "message": f"Tier must be one of: {', '.join(REVIEW_TIERS)}"}
+    
+    return {"valid": True, "message": "Input is valid"}
+
+def validate_diff_input(data: Dict[str, Any], max_length: int = MAX_CODE_LENGTH) -> Dict[str, Any]:
+    """
+    Validate incremental review input data
+    
+    Args:
+        data: Input data dictionary with base_code and either code or diff
+        max_length: Maximum code length in characters
+        
+    Returns:
+        Dictionary with validation result
+    """
+    if not data:
+        return {"valid": False, "message": "No data provided"}
+    
+    if not isinstance(data.get('base_code'), str):
+        return {"valid": False, "message": "Base code must be a string"}
+    
+    if len(data['base_code']) > max_length:
+        return {"valid": False, "message": f"Base code is too long (max {max_length:,} characters)"}
+    
+    if ('code' in data) == ('diff' in data):
+        return {"valid": False, "message": "Provide either code or diff"}
+    
+    if 'diff' in data and not isinstance(data['diff'], str):
+        return {"valid": False, "message": "Diff must be a string"}
+    
+    return {"valid": True, "message": "Input is valid"}
+
+def validate_batch_input(data: Dict[str, Any], max_items: int) -> Dict[str, Any]:
+    """
+    Validate the envelope of a batch review request
+    
+    Individual items are validated separately with validate_code_input so
+    that one bad item does not reject the whole batch.
+    
+    Args:
+        data: Input data dictionary
+        max_items: Maximum number of items per batch
+        
+    Returns:
+        Dictionary with validation result
+    """
+    if not data:
+        return {"valid": False, "message": "No data provided"}
+    
+    items = data.get('items')
+    if not isinstance(items, list):
+        return {"valid": False, "message": "Items must be a list"}
+    
+    if not items:
+        return {"valid": False, "message": "Items cannot be empty"}
+    
+    if len(items) > max_items:
+        return {"valid": False, "message": f"Too many items (max {max_items})"}
+    
+    if 'concurrency' in data:
+        concurrency = data['concurrency']
+        if not isinstance(concurrency, int) or isinstance(concurrency, bool) or concurrency < 1:
+            return {"valid": False, "message": "Concurrency must be a positive integer"}
+    
     return {"valid": True, "message": "Input is valid"}
 
+def validate_upload_input(filename: Optional[str], form: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Validate the form of a file or archive upload
+    
+    The content is validated per file with validate_file_upload as the
+    upload is read.
+    
+    Args:
+        filename: Name of the uploaded file, None when no file was sent
+        form: Other form fields
+        
+    Returns:
+        Dictionary with validation result
+    """
+    if not filename:
+        return {"valid": False, "message": "No file provided"}
+    
+    if not is_supported_filename(filename) and not filename.lower().endswith(ARCHIVE_EXTENSIONS):
+        return {"valid": False, "message": f"Unsupported file type: {filename}"}
+    
+    if form.get('tier') and form['tier'] not in REVIEW_TIERS:
+        return {"valid": False, "message": f"Tier must be one of: {', '.join(REVIEW_TIERS)}"}
+    
+    if 'concurrency' in form:
+        concurrency = form['concurrency']
+        if not concurrency.isdigit() or int(concurrency) < 1:
+            return {"valid": False, "message": "Concurrency must be a positive integer"}
+    
+    return {"valid": True, "message": "Upload is valid"}
+
 def validate_file_upload(file_data: bytes, filename: str) -> Dict[str, Any]:
     """
     Validate uploaded file
@@ -64,17 +188,29 @@ def validate_file_upload(file_data: bytes, filename: str) -> Dict[str, Any]:
         return {"valid": False, "message": "No filename provided"}
     
     # Check file size (max 1MB)
-    if len(file_data) > 1024 * 1024:
+    if len(file_data) > MAX_FILE_SIZE:
         return {"valid": False, "message": "File too large (max 1MB)"}
     
     # Check file extension
-    allowed_extensions = [
-        '.py', '.js', '.ts', '.java', '.cpp', '.cc', '.cxx',
-        '.cs', '.go', '.rs', '.php', '.rb', '.html', '.css'
-    ]
-    
-    file_extension = filename.lower()
-    if not any(file_extension.endswith(ext) for ext in allowed_extensions):
+    if not is_supported_filename(filename):
         return {"valid": False, "message": f"Unsupported file type: {filename}"}
     
-    return {"valid": True, "message": "File is valid"} 
\ No newline at end of file
+    return {"valid": True, "message": "File is valid"} 
+
+def is_supported_filename(filename: str) -> bool:
+    """Check whether a file name has one of the allowed extensions"""
+    return filename.lower().endswith(ALLOWED_EXTENSIONS)
+
+
+def language_for_filename(filename: str) -> Optional[str]:
+    """
+    Guess the review language of a file from its extension
+    
+    Args:
+        filename: Name or path of the file
+        
+    Returns:
+        Language id, None for unsupported files
+    """
+    extension = os.path.splitext(filename)[1].lower()
+    return EXTENSION_LANGUAGES.get(extension)
@@ -0,0 +1,17 @@
+"""
+WSGI entry point for production servers
+
+The app is built and warmed up at import, so a server that loads the app
+before forking (gunicorn's preload_app) shares that work with every worker.
+
+Run with:
+    gunicorn -c gunicorn.conf.py
+"""
+
+from app import create_app
+
+app = create_app(warm_up=True)
+
+def after_fork():
+    """Reopen resources a forked worker must not share with its parent"""
+    app.extensions['services'].after_fork()